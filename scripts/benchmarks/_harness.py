@@ -0,0 +1,59 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Serves the fake Messages API from ``service/tests/fake_llm.py`` on a local
+port so benchmarks exercise the real SDK and HTTP stack without spending
+API credits, and the static test pages for browser benchmarks.
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+import anthropic
+import uvicorn
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from service.core.executor import SkillExecutor
+from service.tests.fake_llm import create_app
+from service.tests.static_pages import serve_pages as _serve_pages
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_fake_llm(latency: float = 0.25, **kwargs) -> str:
+    """Start the fake LLM in a daemon thread and return its base URL."""
+    port = _free_port()
+    config = uvicorn.Config(
+        create_app(latency=latency, **kwargs),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def executor_for(base_url: str) -> SkillExecutor:
+    """A SkillExecutor whose sync and async clients point at the fake LLM."""
+    executor = SkillExecutor()
+    executor.anthropic_client = anthropic.Anthropic(api_key="bench", base_url=base_url)
+    executor.async_anthropic_client = anthropic.AsyncAnthropic(api_key="bench", base_url=base_url)
+    return executor
+
+
+def serve_pages() -> str:
+    """Serve ``service/tests/pages`` in a daemon thread and return its base URL."""
+    base_url, _ = _serve_pages()
+    return base_url
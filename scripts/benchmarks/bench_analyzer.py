@@ -0,0 +1,126 @@
+"""
+Micro-benchmark: single-pass OutputAnalyzer vs the three legacy parsers.
+
+The legacy functions are the ``_parse_sections``, ``_extract_alternatives``
+and ``_extract_recommendations`` methods SkillExecutor used before the
+analyzer, copied verbatim so the comparison stays reproducible.
+
+Usage:
+    python scripts/benchmarks/bench_analyzer.py [--repeat 20]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from service.core.analyzer import analyze_output
+
+
+def legacy_parse_sections(output: str) -> dict:
+    sections = {}
+    current_section = None
+    current_content = []
+
+    for line in output.split("\n"):
+        if line.startswith("## "):
+            if current_section:
+                sections[current_section] = "\n".join(current_content).strip()
+            current_section = line[3:].strip()
+            current_content = []
+        elif line.startswith("### ") and not current_section:
+            current_section = line[4:].strip()
+            current_content = []
+        elif current_section:
+            current_content.append(line)
+
+    if current_section:
+        sections[current_section] = "\n".join(current_content).strip()
+
+    return sections
+
+
+def legacy_extract_alternatives(output: str) -> list[str]:
+    alternatives = []
+    in_alternatives = False
+
+    for line in output.split("\n"):
+        lower = line.lower()
+        if "alternative" in lower and ("headline" in lower or "cta" in lower or "option" in lower):
+            in_alternatives = True
+            continue
+        if in_alternatives:
+            if line.startswith("- ") or line.startswith("* "):
+                alternatives.append(line[2:].strip())
+            elif line.startswith("1. ") or line.startswith("2. ") or line.startswith("3. "):
+                alternatives.append(line[3:].strip())
+            elif line.startswith("##"):
+                in_alternatives = False
+
+    return alternatives[:10]
+
+
+def legacy_extract_recommendations(output: str) -> list[str]:
+    recommendations = []
+    in_recommendations = False
+
+    for line in output.split("\n"):
+        lower = line.lower()
+        if any(term in lower for term in ["recommendation", "quick win", "action item", "next step"]):
+            in_recommendations = True
+            continue
+        if in_recommendations:
+            if line.startswith("- ") or line.startswith("* "):
+                recommendations.append(line[2:].strip())
+            elif line.startswith(("1. ", "2. ", "3. ", "4. ", "5. ")):
+                recommendations.append(line[3:].strip())
+            elif line.startswith("##"):
+                in_recommendations = False
+
+    return recommendations[:20]
+
+
+def legacy(output: str):
+    return (
+        legacy_parse_sections(output),
+        legacy_extract_alternatives(output),
+        legacy_extract_recommendations(output),
+    )
+
+
+def timed(fn, text: str, repeat: int) -> float:
+    """Best-of-``repeat`` wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    examples = {
+        path.name: path.read_text()
+        for path in sorted((ROOT / "examples").glob("*.md"))
+        if path.name != "README.md"
+    }
+    corpus = "\n\n".join(examples.values())
+    inputs = {**examples, f"synthetic ({len(corpus) * 50 // 1024} KB)": corpus * 50}
+
+    print(f"{'input':<40} {'legacy ms':>10} {'analyzer ms':>12} {'speedup':>8}")
+    for name, text in inputs.items():
+        before = timed(legacy, text, args.repeat)
+        after = timed(analyze_output, text, args.repeat)
+        print(f"{name:<40} {before:>10.2f} {after:>12.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Requests/sec per instance: blocking execute() vs execute_async().
+
+The "blocking" run reproduces the old /work handler, an ``async def`` that
+called the synchronous client and so held the event loop for every LLM
+call. The "async" run awaits ``execute_async`` the way /work does now.
+
+Usage:
+    python scripts/benchmarks/bench_async_executor.py [--requests 40] [--latency 0.25]
+"""
+
+import argparse
+import asyncio
+import time
+
+from _harness import executor_for, serve_fake_llm
+
+from service.api.schemas import SkillName, WorkRequest
+
+
+async def run_blocking(executor, request, n: int) -> float:
+    async def handler():
+        return executor.execute(request)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n)))
+    return n / (time.perf_counter() - started)
+
+
+async def run_async(executor, request, n: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(executor.execute_async(request) for _ in range(n)))
+    return n / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.25, help="Fake LLM latency in seconds")
+    args = parser.parse_args()
+
+    executor = executor_for(serve_fake_llm(latency=args.latency))
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+
+    blocking = asyncio.run(run_blocking(executor, request, args.requests))
+    concurrent = asyncio.run(run_async(executor, request, args.requests))
+
+    print(f"{args.requests} requests, {args.latency * 1000:.0f} ms fake LLM latency")
+    print(f"  blocking execute():  {blocking:8.1f} req/s")
+    print(f"  execute_async():     {concurrent:8.1f} req/s  ({concurrent / blocking:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Page captures/sec: a fresh Chromium per request vs the warm browser pool.
+
+The "launch" run reproduces the old capture_screenshot, which started
+Playwright and launched a browser for every request. The "pool" run goes
+through BrowserPool.capture the way /analyze-url does on a capture cache
+miss, which also extracts the page's text and outline. Both capture the
+static landing page from the test suite, so no network is involved.
+
+Requires Chromium (``playwright install chromium``).
+
+Usage:
+    python scripts/benchmarks/bench_browser_pool.py [--requests 20] [--concurrency 4]
+"""
+
+import argparse
+import asyncio
+import time
+
+from _harness import serve_pages
+
+from playwright.async_api import async_playwright
+
+from service.core.browser import VIEWPORT, BrowserPool
+
+
+async def capture_with_launch(url: str) -> bytes:
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        page = await browser.new_page(viewport=VIEWPORT)
+        await page.goto(url, wait_until="networkidle", timeout=15000)
+        screenshot = await page.screenshot(type="jpeg", quality=80)
+        await browser.close()
+        return screenshot
+
+
+async def run(capture, url: str, n: int, concurrency: int) -> tuple[float, float]:
+    """Returns captures/sec and mean latency in ms."""
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with gate:
+            started = time.perf_counter()
+            await capture(url)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - started
+    return n / elapsed, 1000 * sum(latencies) / len(latencies)
+
+
+async def main_async(args) -> None:
+    url = f"{serve_pages()}/landing.html"
+
+    launch_rate, launch_ms = await run(capture_with_launch, url, args.requests, args.concurrency)
+
+    pool = BrowserPool(size=args.browsers, contexts_per_browser=args.concurrency)
+    started = time.perf_counter()
+    await pool.start()
+    warmup = time.perf_counter() - started
+    try:
+        pool_rate, pool_ms = await run(pool.capture, url, args.requests, args.concurrency)
+    finally:
+        await pool.close()
+
+    print(f"{args.requests} captures, concurrency {args.concurrency}, {args.browsers} pooled browsers")
+    print(f"  launch per request: {launch_rate:6.2f} captures/s  {launch_ms:7.0f} ms mean")
+    print(f"  browser pool:       {pool_rate:6.2f} captures/s  {pool_ms:7.0f} ms mean"
+          f"  ({pool_rate / launch_rate:.1f}x, {warmup * 1000:.0f} ms one-time warmup)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--browsers", type=int, default=2)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: caller-side cost of logging a model response.
+
+Compares the ``print`` SkillExecutor used to make on every request with a
+synchronous JSON handler and with the queue handler from
+``service/core/log.py``, at DEBUG (payload written) and INFO (payload
+skipped). Output goes to os.devnull, so the numbers are formatting and
+hand-off cost, not terminal or Cloud Logging I/O.
+
+Usage:
+    python scripts/benchmarks/bench_logging.py [--calls 2000] [--kb 20]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from anthropic.types import TextBlock
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from service.core.log import JsonFormatter, configure_logging, log_payload, shutdown_logging
+
+
+def per_call(fn, calls: int) -> float:
+    """Mean wall time per call in microseconds."""
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--kb", type=int, default=20, help="Size of the fake model response")
+    args = parser.parse_args()
+
+    content = [TextBlock(type="text", text="## Headline\n\nShip faster with TaskFlow. " * (args.kb * 1024 // 42))]
+    devnull = open(os.devnull, "w")
+    logger = logging.getLogger("bench")
+    logger.propagate = False
+
+    def legacy():
+        print(f"DEBUG: Model response content: {content}", file=devnull)
+
+    def payload():
+        log_payload(logger, "Model response", content, model="claude-sonnet-4-5", skill="copywriting")
+
+    results = {"print (legacy)": per_call(legacy, args.calls)}
+
+    sync = logging.StreamHandler(devnull)
+    sync.setFormatter(JsonFormatter())
+    logger.addHandler(sync)
+    logger.setLevel(logging.DEBUG)
+    results["sync JSON handler, DEBUG"] = per_call(payload, args.calls)
+    logger.removeHandler(sync)
+
+    queued = configure_logging(level="DEBUG", stream=devnull)
+    logger.addHandler(queued)
+    results["queue handler, DEBUG"] = per_call(payload, args.calls)
+    started = time.perf_counter()
+    shutdown_logging()
+    drain_ms = (time.perf_counter() - started) * 1000
+
+    logger.setLevel(logging.INFO)
+    results["queue handler, INFO (payload skipped)"] = per_call(payload, args.calls)
+
+    print(f"{args.kb} KB response, {args.calls} calls")
+    print(f"{'path':<40} {'us/call':>10}")
+    for name, micros in results.items():
+        print(f"{name:<40} {micros:>10.1f}")
+    print(f"listener drain after DEBUG run: {drain_ms:.0f} ms (off the request path)")
+
+
+if __name__ == "__main__":
+    main()
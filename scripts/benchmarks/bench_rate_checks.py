@@ -0,0 +1,54 @@
+"""
+Micro-benchmark: latency of one request's rate checks.
+
+Each call checks a plan's minute (GCRA), hour and day (sliding window)
+limits together, as ``enforce_rate_limit`` does. Runs against the
+in-process checker, and against Redis with ``--redis-url`` (one Lua
+script call per check).
+
+Usage:
+    python scripts/benchmarks/bench_rate_checks.py [--calls 5000] [--redis-url redis://localhost:6379]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from service.core.limiter import MemoryRateChecker, RedisRateChecker
+
+
+def measure(checker, calls: int, users: int = 100) -> list[float]:
+    """Per-call latency in microseconds, spread over ``users`` on the enterprise plan."""
+    latencies = []
+    for i in range(calls):
+        started = time.perf_counter()
+        checker.check_plan("enterprise", f"bench-{i % users}", "work")
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--redis-url", help="Also benchmark Redis at this URL")
+    args = parser.parse_args()
+
+    checkers = {"memory": MemoryRateChecker()}
+    if args.redis_url:
+        checkers["redis"] = RedisRateChecker(url=args.redis_url)
+
+    print(f"{'backend':<10} {'p50 us':>10} {'p99 us':>10}")
+    for name, checker in checkers.items():
+        latencies = sorted(measure(checker, args.calls))
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{name:<10} {statistics.median(latencies):>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Jobs/sec per worker instance at different WORKER_CONCURRENCY settings.
+
+Feeds fake queue messages to the worker's JobRunner, which runs them
+against the fake Messages API from the test suite and an in-memory job
+store, so the numbers reflect the runner itself rather than Pub/Sub or
+Firestore. The old worker ran one job per callback, synchronously.
+
+Usage:
+    python scripts/benchmarks/bench_worker.py [--jobs 64] [--latency 0.25] [--concurrency 1 4 16]
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from _harness import executor_for, serve_fake_llm
+
+from service.worker import JobRunner
+
+
+class Message:
+    def __init__(self, i: int):
+        self.message_id = f"bench-{i}"
+        # Distinct tasks so the result cache doesn't serve repeats
+        self.data = json.dumps({
+            "job_id": f"job-{i}",
+            "request": {"skill": "copywriting", "task": f"Write headline #{i} for TaskFlow"},
+        }).encode("utf-8")
+        self.done = threading.Event()
+
+    def ack(self):
+        self.done.set()
+
+    def nack(self):
+        self.done.set()
+
+    def modify_ack_deadline(self, seconds):
+        pass
+
+
+class JobStore:
+    def save_brief(self, brief):
+        return brief["id"]
+
+
+def run(executor, jobs: int, concurrency: int, offset: int) -> float:
+    runner = JobRunner(executor=executor, db=JobStore(), concurrency=concurrency).start()
+    messages = [Message(offset + i) for i in range(jobs)]
+    started = time.perf_counter()
+    for message in messages:
+        runner.submit(message)
+    for message in messages:
+        message.done.wait()
+    elapsed = time.perf_counter() - started
+    asyncio.run_coroutine_threadsafe(executor.aclose(), runner.loop).result()
+    runner.stop()
+    return jobs / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.25, help="Fake LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    url = serve_fake_llm(latency=args.latency)
+    print(f"{args.jobs} jobs, {args.latency * 1000:.0f} ms fake LLM latency")
+    for i, concurrency in enumerate(args.concurrency):
+        # A fresh executor per run: its async client belongs to the runner's loop
+        rate = run(executor_for(url), args.jobs, concurrency, offset=i * args.jobs)
+        print(f"  concurrency {concurrency:>3}: {rate:8.1f} jobs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ from service.core.executor import get_executor
 from service.api.schemas import SkillName, WorkRequest
 from service.core.assets import get_asset_manager
 from service.core.models import ImageModels, VideoModels
+from service.core.quality import AssetEvaluation
 
 def log(msg):
     timestamp = time.strftime("%H:%M:%S")
@@ -53,26 +54,19 @@ class DogfoodLoop:
         2. **Era Fusion**: Mid-century elements (wood, brass, paper) blended with subtle futuristic data/holograms.
         3. **Composition**: Clean, uncluttered, suitable for a landing page hero (space for text).
         
-        Return JSON ONLY: {{ "status": "approved" | "rejected", "critique": "...", "refined_prompt": "..." }}
+        If rejected, include a refined prompt.
         """
         
         request = WorkRequest(
             skill=SkillName.MARKETING_PSYCHOLOGY,
             model="claude-sonnet-4-5-20250929",
-            task=eval_task
+            task=eval_task,
+            response_schema=AssetEvaluation,
         )
         
         try:
-            result = await asyncio.to_thread(self.executor.execute, request)
-            text = result.output
-            # Basic JSON extraction
-            start = text.find("{")
-            end = text.rfind("}") + 1
-            if start != -1 and end != -1:
-                 eval_data = json.loads(text[start:end])
-                 return eval_data
-            else:
-                 return {"status": "rejected", "critique": "JSON parse error", "refined_prompt": prompt}
+            result = await self.executor.execute_async(request)
+            return result.structured
         except Exception as e:
             return {"status": "rejected", "critique": f"Eval failed: {e}", "refined_prompt": prompt}
 
@@ -11,6 +11,7 @@ import fal_client
 from service.core.executor import get_executor
 from service.api.schemas import SkillName, WorkRequest
 from service.core.assets import get_asset_manager
+from service.core.quality import AssetEvaluation
 from dotenv import load_dotenv
 
 def log(msg):
@@ -57,21 +58,20 @@ class DogfoodLoop:
         2. High realism. NO neon, NO digital-glow, NO futurism.
         3. Sophistication. Does it look like a 1960s Madison Avenue agency?
         
-        Return JSON ONLY: {{'status': 'approved' | 'rejected', 'critique': '...', 'refined_prompt': '...'}}
+        If rejected, include a refined prompt.
         """
         
         request = WorkRequest(
             skill=SkillName.MARKETING_PSYCHOLOGY,
             model="claude-sonnet-4-5-20250929",
-            task=eval_task
+            task=eval_task,
+            response_schema=AssetEvaluation,
         )
         
         try:
-            result = await asyncio.to_thread(self.executor.execute, request)
-            text = result.output
-            log(f"Evaluation raw output: {text[:100]}...")
-            eval_data = json.loads(text[text.find("{"):text.rfind("}")+1])
-            return eval_data
+            result = await self.executor.execute_async(request)
+            log(f"Evaluation: {result.structured['status']} ({result.structured['score']})")
+            return result.structured
         except Exception as e:
             log(f"Evaluation error: {str(e)}")
             return {"status": "rejected", "critique": f"Evaluation failed: {str(e)}", "refined_prompt": prompt}
@@ -10,6 +10,7 @@ import asyncio
 import json
 import random
 from typing import List, Dict
+from pydantic import BaseModel, Field
 from slugify import slugify
 
 # Add project root to path
@@ -22,6 +23,15 @@ from service.core.models import ImageModels
 
 CAMPAIGNS_FILE = "frontend/src/lib/data/campaigns.json"
 
+
+class LandingContent(BaseModel):
+    headline: str = Field(description="A clever, sophisticated headline (Mad Men style)")
+    subheadline: str = Field(description="A clear value prop addressing their specific pain point")
+    pain_point_copy: str = Field(description="1 short paragraph on why generic tools fail them")
+    solution_copy: str = Field(description="1 short paragraph on how our tailored craftsmanship helps")
+    image_prompt: str = Field(description="A detailed prompt for FLUX Pro")
+
+
 class CampaignGenerator:
     def __init__(self):
         self.executor = get_executor()
@@ -48,16 +58,16 @@ class CampaignGenerator:
         - "Cryogenic Lab Technicians"
         - "Bespoke Neon Sign Benders"
         - "Rare Book Archivists"
-        
-        OUTPUT FORMAT: JSON List of strings only. ["Target 1", "Target 2", ...]
         """
-        req = WorkRequest(skill=SkillName.MARKETING_IDEAS, task=task, model="claude-sonnet-4-5-20250929")
-        result = self.executor.execute(req)
+        req = WorkRequest(
+            skill=SkillName.MARKETING_IDEAS,
+            task=task,
+            model="claude-sonnet-4-5-20250929",
+            response_schema={"type": "array", "items": {"type": "string"}},
+        )
         try:
-            text = result.output
-            start = text.find("[")
-            end = text.rfind("]") + 1
-            return json.loads(text[start:end])
+            result = self.executor.execute(req)
+            return result.structured
         except Exception as e:
             print(f"Error parsing targets: {e}")
             return []
@@ -75,22 +85,21 @@ class CampaignGenerator:
         task = f"""
         Create content for a landing page targeting: {target}.
         Brand Voice: 'High Era' (Mid-Century Modern, Sophisticated, Tactile).
-        
-        OUTPUT JSON ONLY:
-        {{
-            "headline": "A clever, sophisticated headline (Mad Men style)",
-            "subheadline": "A clear value prop addressing their specific pain point",
-            "pain_point_copy": "1 short paragraph on why generic tools fail them",
-            "solution_copy": "1 short paragraph on how our tailored craftsmanship helps",
-            "image_prompt": "A detailed prompt for FLUX Pro. Subject: A mid-century {target} workspace. Elements: Period-correct tools blended with subtle holographic data. Style: Cinematic 35mm, Kodak Portra 400, Golden Hour, No CGI sheen."
-        }}
+
+        Image prompt subject: A mid-century {target} workspace. Elements: Period-correct tools
+        blended with subtle holographic data. Style: Cinematic 35mm, Kodak Portra 400, Golden Hour,
+        No CGI sheen.
         """
         
-        req = WorkRequest(skill=SkillName.COPYWRITING, task=task, model="claude-sonnet-4-5-20250929")
+        req = WorkRequest(
+            skill=SkillName.COPYWRITING,
+            task=task,
+            model="claude-sonnet-4-5-20250929",
+            response_schema=LandingContent,
+        )
         try:
-            res = await asyncio.to_thread(self.executor.execute, req)
-            text = res.output
-            content = json.loads(text[text.find("{"):text.rfind("}")+1])
+            res = await self.executor.execute_async(req)
+            content = res.structured
         except Exception as e:
             print(f"Copy gen failed for {target}: {e}")
             return
@@ -8,8 +8,19 @@ from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from service.core.executor import get_executor
+from service.core import structured
 from service.api.schemas import WorkRequest, SkillName
 
+EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": 1, "maximum": 10},
+        "market_ready": {"type": "boolean", "description": "Is this client-ready?"},
+        "critique": {"type": "string", "description": "One sentence summary of strengths/weaknesses"},
+    },
+    "required": ["score", "market_ready", "critique"],
+}
+
 class PortfolioGenerator:
     def __init__(self):
         self.executor = get_executor()
@@ -41,10 +52,8 @@ class PortfolioGenerator:
         {output[:2000]}...
 
         ## Your Evaluation
-        Provide a JSON response with:
-        1. "score": Integer 1-10
-        2. "market_ready": Boolean (Is this client-ready?)
-        3. "critique": One sentence summary of strengths/weaknesses.
+        Score it from 1-10, say whether it is client-ready, and sum up its
+        strengths and weaknesses in one sentence.
         """
         
         # We use a direct client call here to act as the "Judge"
@@ -53,16 +62,10 @@ class PortfolioGenerator:
             message = self.executor.anthropic_client.messages.create(
                 model=self.executor.default_model,
                 max_tokens=500,
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                **structured.tool_params(EVALUATION_SCHEMA),
             )
-            eval_text = message.content[0].text
-            # Naive parsing looking for JSON structure
-            import re
-            json_match = re.search(r"{{.*}}", eval_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
-            else:
-                return {"score": 0, "market_ready": False, "critique": "Failed to parse evaluation."}
+            return structured.extract(message, EVALUATION_SCHEMA)
         except Exception as e:
             print(f"Evaluation failed: {e}")
             return {"score": 0, "market_ready": False, "critique": "Evaluation error."}
@@ -4,7 +4,7 @@ Request and response schemas for the Marketing Agency API.
 
 from enum import Enum
 from typing import Optional, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class SkillName(str, Enum):
@@ -97,6 +97,47 @@ class WorkRequest(BaseModel):
         description="Base64 encoded image data for vision tasks"
     )
 
+    page_text: Optional[str] = Field(
+        default=None,
+        description="Text rendering of a web page (outline and visible text), alongside or instead of a screenshot"
+    )
+
+    use_cache: bool = Field(
+        default=True,
+        description="Set to false to skip the result cache and force a fresh generation"
+    )
+
+    semantic_cache: bool = Field(
+        default=False,
+        description="Also accept a cached result for a near-identical earlier request (e.g. the same brief, reworded)"
+    )
+
+    cascade: bool = Field(
+        default=False,
+        description="Try a fast, cheap model first and escalate to `model` only if the result scores low"
+    )
+
+    n_best: int = Field(
+        default=1,
+        ge=1,
+        le=8,
+        description="Run this many completions concurrently and return their merged, ranked alternatives"
+    )
+
+    response_schema: Optional[dict[str, Any]] = Field(
+        default=None,
+        description="JSON Schema for the response; the validated result is returned in `structured`. "
+                    "Python callers may pass a Pydantic model class."
+    )
+
+    @field_validator("response_schema", mode="before")
+    @classmethod
+    def _schema_from_model(cls, value):
+        """Accept a Pydantic model class and store its JSON Schema."""
+        if isinstance(value, type) and issubclass(value, BaseModel):
+            return value.model_json_schema()
+        return value
+
 
 class WorkResult(BaseModel):
     """Result from executing a marketing skill."""
@@ -114,6 +155,11 @@ class WorkResult(BaseModel):
         description="Structured sections if the output has multiple parts"
     )
 
+    subsections: Optional[dict[str, dict[str, str]]] = Field(
+        default=None,
+        description="### subsections, grouped by their parent section"
+    )
+
     alternatives: Optional[list[str]] = Field(
         default=None,
         description="Alternative options if generated (headlines, CTAs, etc.)"
@@ -124,12 +170,53 @@ class WorkResult(BaseModel):
         description="Actionable recommendations if applicable"
     )
 
+    tables: Optional[list[list[list[str]]]] = Field(
+        default=None,
+        description="Markdown tables in the output, as rows of cells"
+    )
+
+    code_blocks: Optional[list[dict[str, str]]] = Field(
+        default=None,
+        description="Fenced code blocks in the output, with their language"
+    )
+
+    structured: Optional[Any] = Field(
+        default=None,
+        description="The validated response when the request set `response_schema`"
+    )
+
     metadata: Optional[dict] = Field(
         default=None,
         description="Additional metadata about the execution"
     )
 
 
+class BatchWorkRequest(BaseModel):
+    """Request to execute many independent skill runs as one batch."""
+
+    requests: list[WorkRequest] = Field(
+        ...,
+        description="The work requests to run; results come back in the same order",
+        min_length=1
+    )
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one request in a batch."""
+    index: int = Field(description="Position of the request in the submitted batch")
+    status: str = Field(description="'succeeded', 'errored', 'canceled', 'expired' or 'missing'")
+    result: Optional[WorkResult] = None
+    error: Optional[str] = None
+
+
+class BatchJobResponse(BaseModel):
+    """Status of a batch job, with per-item results once it completes."""
+    job_id: str
+    status: str = Field(description="'pending', 'processing', 'completed' or 'failed'")
+    counts: Optional[dict] = Field(default=None, description="Provider request counts by state")
+    results: Optional[list[BatchItemResult]] = None
+
+
 class WorkflowName(str, Enum):
     """Available pre-built workflows."""
     FULL_SERVICE = "full-service"
@@ -58,6 +58,10 @@ class BillingEnforcement:
 
     async def get_tenant(self, tenant_id: str) -> Dict[str, Any]:
         """Get tenant data with caching."""
+        return self.load_tenant(tenant_id)
+
+    def load_tenant(self, tenant_id: str) -> Dict[str, Any]:
+        """Get tenant data with caching; blocks on Firestore on a miss."""
         # Simple in-memory cache (use Redis in production)
         cache_key = f"tenant:{tenant_id}"
         cached = self._cache.get(cache_key)
@@ -0,0 +1,274 @@
+"""
+Per-tenant fair-share admission for in-flight model calls.
+
+An instance runs at most ``capacity`` model calls at once; a request that
+fans out to several calls holds that many units of capacity. Requests
+beyond that wait in one queue ordered by start-time fair queuing: each
+tenant's requests are tagged with a virtual start time that advances by
+``cost / weight`` per request, so a tenant with a burst of work
+gets its share of freed slots without starving others, and higher plans
+get proportionally more. When the estimated wait for a new request exceeds
+``max_wait``, it is rejected immediately so the client can retry later
+instead of holding a connection open in a queue it won't clear.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+DEFAULT_WEIGHTS = {"anonymous": 1.0, "starter": 2.0, "growth": 4.0, "enterprise": 8.0}
+
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class AdmissionRejected(Exception):
+    """The estimated queue wait exceeds the deadline."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Server busy; estimated wait {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class Histogram:
+    """Cumulative bucket counts, in the shape Prometheus uses."""
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+
+    def snapshot(self) -> dict[str, Any]:
+        cumulative = list(itertools.accumulate(self.counts))
+        buckets = {str(bound): count for bound, count in zip(self.bounds, cumulative)}
+        buckets["+Inf"] = cumulative[-1]
+        return {"buckets": buckets, "count": cumulative[-1], "sum": round(self.total, 3)}
+
+
+class Slot:
+    """A held admission slot; release it when the request's work is done."""
+
+    def __init__(self, scheduler: "AdmissionScheduler", plan: str, cost: int = 1):
+        self.scheduler = scheduler
+        self.plan = plan
+        self.cost = cost
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        """Free the slot for the next queued request; safe to call twice."""
+        if not self.released:
+            self.released = True
+            self.scheduler._release(self)
+
+
+class _Waiter:
+    __slots__ = ("future", "plan", "cost", "queued_at")
+
+    def __init__(self, future: asyncio.Future, plan: str, cost: int):
+        self.future = future
+        self.plan = plan
+        self.cost = cost
+        self.queued_at = time.monotonic()
+
+
+class AdmissionScheduler:
+    """
+    Caps in-flight requests and shares slots fairly between tenants.
+
+    Args:
+        capacity: Model calls allowed in flight at once
+        weights: Share of slots per plan, relative to each other
+        max_wait: Longest estimated queue wait before requests are rejected
+        service_time: Initial estimate of seconds a request holds a slot;
+            refined from observed requests
+    """
+
+    def __init__(
+        self,
+        capacity: int = 32,
+        weights: Optional[dict[str, float]] = None,
+        max_wait: float = 30.0,
+        service_time: float = 5.0,
+    ):
+        self.capacity = max(1, capacity)
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.max_wait = max_wait
+        self.service_time = service_time
+        self.in_flight = 0
+        self._virtual = 0.0
+        self._finish: dict[str, float] = {}
+        self._queue: list[tuple[float, int, _Waiter]] = []
+        self._order = itertools.count()
+        self.admitted: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self._waits: dict[str, Histogram] = {}
+        self._depths = Histogram(DEPTH_BUCKETS)
+
+    def weight(self, plan: str) -> float:
+        return self.weights.get(plan, self.weights["anonymous"])
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, waiter in self._queue if not waiter.future.done())
+
+    def estimated_wait(self, ahead: int, cost: int = 1) -> float:
+        """Seconds until a request of ``cost`` units, with ``ahead`` units queued before it, gets a slot."""
+        return (ahead + cost) * self.service_time / self.capacity
+
+    def _cost(self, cost: int) -> int:
+        # A request wider than the instance still runs, alone
+        return min(max(1, cost), self.capacity)
+
+    def _tag(self, tenant: str, plan: str, cost: int) -> float:
+        """The request's virtual start time, advancing its tenant's finish time."""
+        start = max(self._virtual, self._finish.get(tenant, 0.0))
+        self._finish[tenant] = start + cost / self.weight(plan)
+        return start
+
+    def _observe_wait(self, plan: str, seconds: float) -> None:
+        self._waits.setdefault(plan, Histogram(WAIT_BUCKETS)).observe(seconds)
+
+    def _can_start(self, cost: int) -> bool:
+        return self.in_flight + cost <= self.capacity and not self.queued
+
+    def _check(self, tenant: str, plan: str, cost: int) -> None:
+        start = max(self._virtual, self._finish.get(tenant, 0.0))
+        ahead = sum(
+            waiter.cost for tag, _, waiter in self._queue if tag <= start and not waiter.future.done()
+        )
+        wait = self.estimated_wait(ahead, cost)
+        if wait > self.max_wait:
+            self.rejected[plan] += 1
+            raise AdmissionRejected(wait)
+
+    def check(self, tenant: str, plan: str, cost: int = 1) -> None:
+        """
+        Reject a request now if it would be rejected on arrival, without queuing it.
+
+        Lets callers refuse work before charging the tenant's quotas for it.
+
+        Raises:
+            AdmissionRejected: If the estimated wait exceeds ``max_wait``
+        """
+        cost = self._cost(cost)
+        if not self._can_start(cost):
+            self._check(tenant, plan, cost)
+
+    async def acquire(self, tenant: str, plan: str, cost: int = 1) -> Slot:
+        """
+        Wait for a slot in fair-share order.
+
+        Args:
+            tenant: Whose share the request counts against
+            plan: The tenant's plan, which sets its weight
+            cost: Model calls the request makes, capped at ``capacity``
+
+        Raises:
+            AdmissionRejected: If the estimated wait exceeds ``max_wait``
+        """
+        cost = self._cost(cost)
+        self._depths.observe(self.queued)
+        if self._can_start(cost):
+            self._virtual = self._tag(tenant, plan, cost)
+            self.in_flight += cost
+            self.admitted[plan] += 1
+            self._observe_wait(plan, 0.0)
+            return Slot(self, plan, cost)
+
+        self._check(tenant, plan, cost)
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), plan, cost)
+        heapq.heappush(self._queue, (self._tag(tenant, plan, cost), next(self._order), waiter))
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted a slot just as the caller gave up
+                waiter.future.result().release()
+            raise
+
+    def _release(self, slot: Slot) -> None:
+        self.in_flight -= slot.cost
+        held = time.monotonic() - slot.started
+        self.service_time += 0.2 * (held - self.service_time)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._queue:
+            tag, _, waiter = self._queue[0]
+            if waiter.future.done():
+                heapq.heappop(self._queue)  # Cancelled while queued
+                continue
+            if self.in_flight + waiter.cost > self.capacity:
+                # The head waits for room rather than being overtaken, so
+                # wide requests aren't starved by narrow ones
+                break
+            heapq.heappop(self._queue)
+            self._virtual = tag
+            self.in_flight += waiter.cost
+            self.admitted[waiter.plan] += 1
+            self._observe_wait(waiter.plan, time.monotonic() - waiter.queued_at)
+            waiter.future.set_result(Slot(self, waiter.plan, waiter.cost))
+        if not self._queue:
+            # Nobody is waiting, so past usage no longer matters
+            self._finish.clear()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, plan: str, cost: int = 1) -> AsyncIterator[Slot]:
+        """Hold a slot for the body of an ``async with`` block."""
+        held = await self.acquire(tenant, plan, cost)
+        try:
+            yield held
+        finally:
+            held.release()
+
+    def metrics(self) -> dict[str, Any]:
+        """In-flight calls and queued requests, outcomes by plan, and wait histograms."""
+        queued_by_plan = Counter(waiter.plan for _, _, waiter in self._queue if not waiter.future.done())
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queued": sum(queued_by_plan.values()),
+            "queued_by_plan": dict(queued_by_plan),
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+            "service_time_estimate": round(self.service_time, 3),
+            "queue_depth_at_arrival": self._depths.snapshot(),
+            "wait_seconds": {plan: histogram.snapshot() for plan, histogram in self._waits.items()},
+        }
+
+
+def retry_after_header(rejected: AdmissionRejected) -> str:
+    return str(max(1, math.ceil(rejected.retry_after)))
+
+
+_scheduler: Optional[AdmissionScheduler] = None
+
+
+def get_admission() -> AdmissionScheduler:
+    """Get the admission scheduler singleton, configured from ADMISSION_* variables."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AdmissionScheduler(
+            capacity=int(os.getenv("ADMISSION_CAPACITY", "32")),
+            weights=json.loads(os.getenv("ADMISSION_WEIGHTS", "{}")),
+            max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "30")),
+            service_time=float(os.getenv("ADMISSION_SERVICE_TIME", "5")),
+        )
+    return _scheduler
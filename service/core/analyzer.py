@@ -0,0 +1,216 @@
+"""
+Single-pass markdown analyzer for skill output.
+
+Tokenizes model output once, line by line, and builds every structured
+view the API returns: sections, nested subsections, alternatives,
+recommendations, tables and code blocks. Text can be fed in arbitrary
+chunks, so the same analyzer runs over a finished output or a live stream.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+# "- item", "* item", "1. item" or "12) item"
+_LIST_ITEM = re.compile(r"(?:[-*]|\d+[.)]) (.*)")
+_LIST_START = frozenset("-*0123456789")
+_TABLE_SEPARATOR = re.compile(r"^\|?[\s:|-]+\|?$")
+
+ALTERNATIVE_KINDS = ("headline", "cta", "option")
+RECOMMENDATION_TERMS = ("recommendation", "quick win", "action item", "next step")
+_ALTERNATIVE_KIND = re.compile("|".join(ALTERNATIVE_KINDS))
+_RECOMMENDATION_TERM = re.compile("|".join(RECOMMENDATION_TERMS))
+# Cheap pre-filter: most lines trigger neither list
+_ANY_TRIGGER = re.compile("|".join(("alternative",) + RECOMMENDATION_TERMS))
+
+
+@dataclass
+class Analysis:
+    """Structured views of a skill output."""
+    sections: dict[str, str] = field(default_factory=dict)
+    subsections: dict[str, dict[str, str]] = field(default_factory=dict)
+    alternatives: list[str] = field(default_factory=list)
+    recommendations: list[str] = field(default_factory=list)
+    tables: list[list[list[str]]] = field(default_factory=list)
+    code_blocks: list[dict[str, str]] = field(default_factory=list)
+
+
+class OutputAnalyzer:
+    """
+    Streaming analyzer over markdown output.
+
+    ``feed`` accepts arbitrary chunks and returns the ``## `` sections that
+    completed within them; ``finish`` flushes the remainder. ``analysis``
+    holds everything found so far and is safe to read mid-stream.
+    """
+
+    def __init__(self):
+        self.analysis = Analysis()
+        self._pending = ""
+
+        self._section: Optional[str] = None
+        self._section_lines: list[str] = []
+        self._subsection: Optional[str] = None
+        self._subsection_lines: list[str] = []
+
+        # Which list the following items belong to, if any
+        self._in_alternatives = False
+        self._in_recommendations = False
+
+        self._table: Optional[list[list[str]]] = None
+        self._fence: Optional[str] = None
+        self._code_lines: list[str] = []
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """Consume a chunk of output; returns sections completed by it."""
+        self._pending += chunk
+        *lines, self._pending = self._pending.split("\n")
+        closed = []
+        for line in lines:
+            section = self.feed_line(line)
+            if section:
+                closed.append(section)
+        return closed
+
+    def finish(self) -> list[tuple[str, str]]:
+        """Flush buffered text at end of output; returns the last sections."""
+        closed = []
+        if self._pending:
+            section = self.feed_line(self._pending)
+            self._pending = ""
+            if section:
+                closed.append(section)
+        if self._fence is not None:
+            self._close_code()
+        self._close_table()
+        section = self._close_section()
+        if section:
+            closed.append(section)
+        return closed
+
+    def feed_line(self, line: str) -> Optional[tuple[str, str]]:
+        """Consume one complete line; returns a section if one just closed."""
+        first = line[:1]
+
+        # Code fences: everything inside is literal
+        if self._fence is not None or (first == "`" and line.startswith("```")):
+            self._code_line(line)
+            return None
+
+        # Tables: consecutive pipe-delimited rows
+        if first == "|":
+            if not _TABLE_SEPARATOR.match(line):
+                if self._table is None:
+                    self._table = []
+                self._table.append([cell.strip() for cell in line.strip().strip("|").split("|")])
+        elif self._table is not None:
+            self._close_table()
+
+        # Alternatives and recommendations lists
+        alt_trigger = rec_trigger = False
+        lower = line.lower()
+        if _ANY_TRIGGER.search(lower):
+            alt_trigger = "alternative" in lower and _ALTERNATIVE_KIND.search(lower) is not None
+            rec_trigger = _RECOMMENDATION_TERM.search(lower) is not None
+        if self._in_alternatives or self._in_recommendations:
+            self._collect(line, first, not alt_trigger, not rec_trigger)
+        if alt_trigger:
+            self._in_alternatives = True
+        if rec_trigger:
+            self._in_recommendations = True
+
+        if first == "#":
+            if line.startswith("## "):
+                closed = self._close_section()
+                self._section = line[3:].strip()
+                return closed
+            if line.startswith("### "):
+                if not self._section:
+                    # A leading ### before any ## acts as a top-level section
+                    self._section = line[4:].strip()
+                    return None
+                self._close_subsection()
+                self._subsection = line[4:].strip()
+                self._section_lines.append(line)
+                return None
+
+        if self._section:
+            self._section_lines.append(line)
+            if self._subsection:
+                self._subsection_lines.append(line)
+        return None
+
+    def _code_line(self, line: str) -> None:
+        """Handle a fence delimiter or a line inside a code block."""
+        if line.startswith("```"):
+            if self._fence is None:
+                self._fence = line[3:].strip()
+                self._code_lines = []
+            else:
+                self._close_code()
+        else:
+            self._code_lines.append(line)
+        if self._section:
+            self._section_lines.append(line)
+            if self._subsection:
+                self._subsection_lines.append(line)
+
+    def _collect(self, line: str, first: str, alt: bool, rec: bool) -> None:
+        """Add a list item to the open alternatives/recommendations lists."""
+        alt = alt and self._in_alternatives
+        rec = rec and self._in_recommendations
+        if first in _LIST_START:
+            match = _LIST_ITEM.match(line)
+            if match:
+                item = match.group(1).strip()
+                if alt:
+                    self.analysis.alternatives.append(item)
+                if rec:
+                    self.analysis.recommendations.append(item)
+                return
+        if first == "#" and line.startswith("##"):
+            if alt:
+                self._in_alternatives = False
+            if rec:
+                self._in_recommendations = False
+
+    def _close_subsection(self) -> None:
+        if self._section and self._subsection:
+            self.analysis.subsections.setdefault(self._section, {})[self._subsection] = (
+                "\n".join(self._subsection_lines).strip()
+            )
+        self._subsection = None
+        self._subsection_lines = []
+
+    def _close_section(self) -> Optional[tuple[str, str]]:
+        self._close_subsection()
+        if not self._section:
+            return None
+        title, body = self._section, "\n".join(self._section_lines).strip()
+        self.analysis.sections[title] = body
+        self._section = None
+        self._section_lines = []
+        return title, body
+
+    def _close_table(self) -> None:
+        if self._table:
+            self.analysis.tables.append(self._table)
+        self._table = None
+
+    def _close_code(self) -> None:
+        self.analysis.code_blocks.append({
+            "language": self._fence or "",
+            "code": "\n".join(self._code_lines),
+        })
+        self._fence = None
+        self._code_lines = []
+
+
+def analyze_output(output: str) -> Analysis:
+    """Analyze a complete output in one pass."""
+    analyzer = OutputAnalyzer()
+    feed_line = analyzer.feed_line
+    for line in output.split("\n"):
+        feed_line(line)
+    analyzer.finish()
+    return analyzer.analysis
@@ -1,3 +1,4 @@
+import logging
 import os
 import fal_client
 import httpx
@@ -6,6 +7,8 @@ from service.core.storage import get_storage
 from service.core.models import ImageModels, VideoModels, AudioModels
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 class AssetManager:
     """Manages AI asset generation via FAL and storage in GCS."""
     
@@ -17,7 +20,7 @@ class AssetManager:
 
     async def generate_image(self, prompt: str, model: str = ImageModels.FLUX_PRO_1_1, sync: bool = True) -> Dict[str, Any]:
         """Generates an image and saves it to GCS."""
-        print(f"Generating image with model: {model}")
+        logger.info("Generating image", extra={"model": model})
         
         handler = fal_client.submit(
             model,
@@ -55,7 +58,7 @@ class AssetManager:
 
     async def generate_video(self, prompt: str, model: str = VideoModels.KLING_V1_STANDARD) -> Dict[str, Any]:
         """Generates a video and saves it to GCS."""
-        print(f"Generating video with model: {model}")
+        logger.info("Generating video", extra={"model": model})
         
         handler = fal_client.submit(
             model,
@@ -91,7 +94,7 @@ class AssetManager:
 
     async def generate_audio(self, prompt: str, model: str = AudioModels.STABLE_AUDIO) -> Dict[str, Any]:
         """Generates audio and saves it to GCS."""
-        print(f"Generating audio with model: {model}")
+        logger.info("Generating audio", extra={"model": model})
         
         handler = fal_client.submit(
             model,
@@ -1,10 +1,13 @@
+import logging
 import os
 import firebase_admin
 from firebase_admin import auth, credentials
-from fastapi import HTTPException, Security, Request
+from fastapi import Depends, HTTPException, Security, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, Tuple
 
+logger = logging.getLogger(__name__)
+
 # Initialize Firebase Admin
 # Check if already initialized to avoid errors during reloads
 if not firebase_admin._apps:
@@ -34,7 +37,7 @@ async def get_current_user(
             return uid, False
         except Exception as e:
             # Invalid token
-            print(f"Auth error: {e}")
+            logger.info("Auth error: %s", e)
             pass # Fallthrough to check for anon
             
     # 2. Check for Anonymous ID header
@@ -47,3 +50,31 @@ async def get_current_user(
         status_code=401,
         detail="Authentication required. Please sign in or provide anonymous ID."
     )
+
+
+async def get_optional_user(
+    request: Request,
+    token: Optional[HTTPAuthorizationCredentials] = Security(security)
+) -> Optional[Tuple[str, bool]]:
+    """
+    Like get_current_user, for endpoints open to unidentified callers.
+    Returns (user_id, is_anonymous), or None.
+    """
+    try:
+        return await get_current_user(request, token)
+    except HTTPException:
+        return None
+
+
+async def require_admin(
+    user_info: Tuple[str, bool] = Depends(get_current_user)
+) -> str:
+    """
+    Allow only signed-in users listed in ADMIN_USER_IDS (comma-separated).
+    Returns the admin's user_id.
+    """
+    user_id, is_anon = user_info
+    admins = {uid.strip() for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()}
+    if is_anon or user_id not in admins:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_id
@@ -0,0 +1,108 @@
+"""
+Bulk skill execution through the provider's Message Batches API.
+
+Batches are processed server-side at discounted pricing, typically within
+minutes to hours, so they suit overnight campaign and portfolio runs
+rather than interactive requests.
+"""
+
+import os
+from typing import Any, Optional
+
+from service.api.schemas import SkillName, WorkRequest
+from service.core.executor import SkillExecutor, get_executor
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "100"))
+
+
+class BatchRunner:
+    """Submits WorkRequests as one message batch and collects the results."""
+
+    def __init__(self, executor: Optional[SkillExecutor] = None):
+        self.executor = executor or get_executor()
+
+    async def submit(self, requests: list[WorkRequest]) -> str:
+        """
+        Submit requests as a single message batch.
+
+        Args:
+            requests: The work requests; item ``i`` gets custom_id ``str(i)``
+
+        Returns:
+            The provider's batch ID
+        """
+        if not requests:
+            raise ValueError("Batch must contain at least one request")
+        if len(requests) > MAX_BATCH_SIZE:
+            raise ValueError(f"Batch too large ({len(requests)} > {MAX_BATCH_SIZE} requests)")
+
+        batch_requests = []
+        for i, request in enumerate(requests):
+            model = request.model or self.executor.default_model
+            if model.lower().startswith("minimax"):
+                raise ValueError("Batch execution is only available for Anthropic models")
+            batch_requests.append({
+                "custom_id": str(i),
+                "params": await self.executor._build_params_async(request, model),
+            })
+
+        batch = await self.executor.async_anthropic_client.messages.batches.create(
+            requests=batch_requests
+        )
+        return batch.id
+
+    async def poll(self, batch_id: str, items: list[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Check a batch and collect its results once it has ended.
+
+        Args:
+            batch_id: The provider's batch ID
+            items: ``{"skill", "model", "response_schema"}`` for each
+                submitted request, in order
+
+        Returns:
+            ``{"status", "counts", "results"}``; results is None until the
+            batch has ended, then one entry per item in submission order
+        """
+        client = self.executor.async_anthropic_client
+        batch = await client.messages.batches.retrieve(batch_id)
+        counts = batch.request_counts.model_dump()
+
+        if batch.processing_status != "ended":
+            return {"status": "processing", "counts": counts, "results": None}
+
+        results: list[Optional[dict[str, Any]]] = [None] * len(items)
+        async for entry in await client.messages.batches.results(batch_id):
+            index = int(entry.custom_id)
+            item = items[index]
+            if entry.result.type == "succeeded":
+                try:
+                    request = WorkRequest.model_construct(
+                        skill=SkillName(item["skill"]),
+                        response_schema=item.get("response_schema"),
+                    )
+                    result = self.executor._build_result(request, item["model"], entry.result.message)
+                    results[index] = {"index": index, "status": "succeeded", "result": result.model_dump()}
+                except ValueError as e:
+                    results[index] = {"index": index, "status": "errored", "error": str(e)}
+            elif entry.result.type == "errored":
+                results[index] = {"index": index, "status": "errored", "error": str(entry.result.error)}
+            else:
+                results[index] = {"index": index, "status": entry.result.type}
+
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = {"index": index, "status": "missing"}
+
+        return {"status": "completed", "counts": counts, "results": results}
+
+
+# Singleton
+_runner: Optional[BatchRunner] = None
+
+
+def get_batch_runner() -> BatchRunner:
+    global _runner
+    if _runner is None:
+        _runner = BatchRunner()
+    return _runner
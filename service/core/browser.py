@@ -1,27 +1,549 @@
+"""
+Headless browser pool and cached page captures.
+
+Launching Chromium costs 1-3 seconds and hundreds of MB, so the pool keeps
+a few browsers warm for the life of the process and hands each request an
+isolated context instead. Browsers are recycled after a number of pages to
+bound memory growth, and callers wait in a bounded queue so a burst of
+audits is rejected early rather than exhausting the instance.
+
+A capture is a screenshot plus the page's visible text and a simplified
+DOM outline, taken in one navigation. Captures are cached by URL and
+viewport, and reused while a cheap fetch of the page's HTML still matches
+the fingerprint recorded at capture time.
+"""
 
 import asyncio
-from playwright.async_api import async_playwright
 import base64
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import httpx
+from playwright.async_api import Browser, BrowserContext, async_playwright
+
+from service.core.coalesce import SingleFlight
+from service.core.log import truncate
+
+logger = logging.getLogger(__name__)
+
+VIEWPORT = {"width": 1280, "height": 800}
+
+# Caps on what a capture sends to the model
+MAX_TEXT_CHARS = int(os.getenv("CAPTURE_MAX_TEXT_CHARS", "20000"))
+MAX_OUTLINE_LINES = int(os.getenv("CAPTURE_MAX_OUTLINE_LINES", "300"))
+# Visible text sent alongside a screenshot, which already shows it
+MAX_TEXT_CHARS_WITH_SCREENSHOT = int(os.getenv("CAPTURE_MAX_TEXT_CHARS_WITH_SCREENSHOT", "2000"))
+
+# Visible text and a landmark/heading/control outline, computed in the page
+EXTRACT_SCRIPT = """
+(maxLines) => {
+  const SKIP = new Set(["script", "style", "noscript", "svg", "template", "iframe"]);
+  const LANDMARKS = new Set(["header", "nav", "main", "section", "article", "aside", "footer", "form"]);
+  const clean = (t) => (t || "").replace(/\\s+/g, " ").trim().slice(0, 120);
+  const visible = (el) => {
+    const style = getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    return style.display !== "none" && style.visibility !== "hidden" && rect.width > 0 && rect.height > 0;
+  };
+  const lines = [];
+  const walk = (el, depth) => {
+    if (lines.length >= maxLines) return;
+    const tag = el.tagName.toLowerCase();
+    if (SKIP.has(tag) || !visible(el)) return;
+    let line = null;
+    let leaf = false;
+    if (/^h[1-6]$/.test(tag)) {
+      line = `${tag}: ${clean(el.innerText)}`;
+      leaf = true;
+    } else if (LANDMARKS.has(tag)) {
+      line = el.id ? `${tag}#${el.id}` : tag;
+    } else if (tag === "a" && el.getAttribute("href")) {
+      line = `link: ${clean(el.innerText) || clean(el.getAttribute("aria-label"))} -> ${el.getAttribute("href")}`;
+      leaf = true;
+    } else if (tag === "button" || el.getAttribute("role") === "button") {
+      line = `button: ${clean(el.innerText || el.value)}`;
+      leaf = true;
+    } else if (tag === "input" || tag === "select" || tag === "textarea") {
+      line = `${tag}[${el.type || ""}]: ${clean(el.placeholder || el.getAttribute("aria-label") || el.name)}`;
+      leaf = true;
+    } else if (tag === "img") {
+      line = `img: ${clean(el.alt) || "(no alt)"}`;
+      leaf = true;
+    }
+    if (line) lines.push("  ".repeat(depth) + line);
+    if (leaf) return;
+    for (const child of el.children) walk(child, line ? depth + 1 : depth);
+  };
+  walk(document.body, 0);
+  return {title: document.title, text: document.body.innerText, outline: lines.join("\\n")};
+}
+"""
+
+# Flags that keep Chromium's footprint small inside a container
+CHROMIUM_ARGS = ["--disable-dev-shm-usage", "--disable-gpu", "--no-zygote"]
+
+
+@dataclass
+class PageCapture:
+    """One rendering of a page."""
+    url: str
+    width: int
+    height: int
+    title: str
+    text: str
+    outline: str
+    screenshot: str  # base64 JPEG
+    fingerprint: Optional[str] = None
+    captured_at: float = 0.0
+    validated_at: float = 0.0
+
+    def page_text(self, max_text_chars: Optional[int] = None) -> str:
+        """
+        Text representation for the model: title, outline and visible text.
+
+        Args:
+            max_text_chars: Cut the visible text to this many characters
+        """
+        text = self.text if max_text_chars is None else truncate(self.text, max_text_chars)
+        return "\n".join([
+            f"Title: {self.title}",
+            f"URL: {self.url}",
+            "",
+            "### Page Outline",
+            "",
+            self.outline,
+            "",
+            "### Visible Text",
+            "",
+            text,
+        ])
+
+
+class BrowserPoolBusy(Exception):
+    """Raised when the wait queue is full or no context frees up in time."""
+
+
+class _PooledBrowser:
+    """A pooled browser and its usage counters."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages = 0
+        self.active = 0
+        self.retiring = False
+        # Cleared while the browser is being relaunched
+        self.ready = asyncio.Event()
+        self.ready.set()
+        # Held while relaunching, so concurrent replacements launch only one
+        self.lock = asyncio.Lock()
+
+
+class BrowserPool:
+    """
+    A fixed set of warm browsers handing out one context per request.
+
+    Args:
+        size: Browsers kept running
+        contexts_per_browser: Concurrent contexts allowed on each browser
+        max_pages: Contexts served before a browser is closed and relaunched
+        max_waiters: Callers allowed to queue for a free context
+        acquire_timeout: Seconds a caller waits for a free context
+        launch: Coroutine function returning a new browser; defaults to
+            launching Chromium through Playwright
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        contexts_per_browser: int = 4,
+        max_pages: int = 50,
+        max_waiters: int = 32,
+        acquire_timeout: float = 10.0,
+        launch: Optional[Callable[[], Awaitable[Browser]]] = None,
+    ):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_pages = max_pages
+        self.max_waiters = max_waiters
+        self.acquire_timeout = acquire_timeout
+        self._launch = launch or self._launch_chromium
+        self._playwright = None
+        self._browsers: list[_PooledBrowser] = []
+        self._capacity = asyncio.Semaphore(size * contexts_per_browser)
+        self._waiting = 0
+        self._start_lock = asyncio.Lock()
+        self._recycling: set[asyncio.Task] = set()
+        self.recycled = 0
+
+    async def _launch_chromium(self) -> Browser:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        return await self._playwright.chromium.launch(args=CHROMIUM_ARGS)
+
+    @property
+    def started(self) -> bool:
+        return bool(self._browsers)
+
+    async def start(self) -> None:
+        """Launch the browsers. Safe to call more than once."""
+        async with self._start_lock:
+            if self._browsers:
+                return
+            browsers = await asyncio.gather(*(self._launch() for _ in range(self.size)))
+            self._browsers = [_PooledBrowser(browser) for browser in browsers]
+
+    async def close(self) -> None:
+        """Close every browser and stop Playwright."""
+        for task in list(self._recycling):
+            task.cancel()
+        await asyncio.gather(*self._recycling, return_exceptions=True)
+        browsers, self._browsers = self._browsers, []
+        for pooled in browsers:
+            try:
+                await pooled.browser.close()
+            except Exception as e:
+                logger.warning("Browser close error: %s", e)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def stats(self) -> dict[str, Any]:
+        """Current pool usage."""
+        return {
+            "browsers": len(self._browsers),
+            "active_contexts": sum(p.active for p in self._browsers),
+            "waiting": self._waiting,
+            "pages_served": [p.pages for p in self._browsers],
+            "recycled": self.recycled,
+        }
+
+    async def _acquire(self) -> None:
+        if self._waiting >= self.max_waiters:
+            raise BrowserPoolBusy("Too many page captures queued")
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._capacity.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise BrowserPoolBusy("Timed out waiting for a browser")
+        finally:
+            self._waiting -= 1
+
+    def _pick(self) -> _PooledBrowser:
+        """The least busy browser, preferring ones that are not retiring."""
+        return min(self._browsers, key=lambda p: (p.retiring, p.active))
+
+    async def _replace(self, pooled: _PooledBrowser, old: Browser) -> None:
+        """Relaunch a browser in place, unless another caller already replaced ``old``."""
+        pooled.ready.clear()
+        try:
+            async with pooled.lock:
+                if pooled.browser is not old:
+                    return
+                pooled.browser = await self._launch()
+                pooled.pages = 0
+                pooled.retiring = False
+                self.recycled += 1
+                try:
+                    await old.close()
+                except Exception as e:
+                    logger.warning("Browser close error: %s", e)
+        finally:
+            pooled.ready.set()
+
+    def _recycle(self, pooled: _PooledBrowser) -> None:
+        """Relaunch a retired browser in the background, off the request path."""
+        # Hold back new contexts from the old browser until the relaunch runs
+        pooled.ready.clear()
+        task = asyncio.create_task(self._recycle_quietly(pooled, pooled.browser))
+        self._recycling.add(task)
+        task.add_done_callback(self._recycling.discard)
+
+    async def _recycle_quietly(self, pooled: _PooledBrowser, old: Browser) -> None:
+        try:
+            await self._replace(pooled, old)
+        except Exception:
+            # The browser stays retiring, so the next release tries again
+            logger.exception("Browser relaunch failed")
+
+    @asynccontextmanager
+    async def context(self, **options) -> AsyncIterator[BrowserContext]:
+        """
+        Borrow an isolated browser context.
+
+        Args:
+            **options: Passed to ``Browser.new_context``
+
+        Raises:
+            BrowserPoolBusy: If the queue is full or the wait times out
+        """
+        if not self._browsers:
+            await self.start()
+        await self._acquire()
+        pooled = self._pick()
+        pooled.active += 1
+        try:
+            await pooled.ready.wait()
+            if not pooled.browser.is_connected():
+                # Crashed since last use
+                await self._replace(pooled, pooled.browser)
+            ctx = await pooled.browser.new_context(**options)
+            try:
+                yield ctx
+            finally:
+                await ctx.close()
+        finally:
+            try:
+                pooled.active -= 1
+                pooled.pages += 1
+                if pooled.pages >= self.max_pages:
+                    pooled.retiring = True
+                    if pooled.active == 0:
+                        self._recycle(pooled)
+            finally:
+                self._capacity.release()
+
+    async def capture(self, url: str, viewport: Optional[dict] = None, timeout: float = 20.0) -> PageCapture:
+        """
+        Load a page in a fresh context and capture it in one navigation.
+
+        Args:
+            url: The page to capture
+            viewport: ``{"width", "height"}``; defaults to 1280x800
+            timeout: Overall seconds allowed for navigation and capture
+
+        Raises:
+            asyncio.TimeoutError: If the capture takes longer than ``timeout``
+        """
+        viewport = viewport or VIEWPORT
+        async with self.context(viewport=viewport) as ctx:
+            page = await ctx.new_page()
+
+            async def capture() -> PageCapture:
+                try:
+                    await page.goto(url, wait_until="networkidle", timeout=15000)
+                except Exception:
+                    # Fallback if networkidle takes too long
+                    pass
+                extracted = await page.evaluate(EXTRACT_SCRIPT, MAX_OUTLINE_LINES)
+                screenshot = await page.screenshot(type="jpeg", quality=80)
+                now = time.time()
+                return PageCapture(
+                    url=url,
+                    width=viewport["width"],
+                    height=viewport["height"],
+                    title=extracted["title"] or "",
+                    text=(extracted["text"] or "")[:MAX_TEXT_CHARS],
+                    outline=extracted["outline"] or "",
+                    screenshot=base64.b64encode(screenshot).decode("utf-8"),
+                    captured_at=now,
+                    validated_at=now,
+                )
+
+            return await asyncio.wait_for(capture(), timeout)
+
+
+_VOLATILE_HTML = re.compile(
+    r"<script\b.*?</script>|<style\b.*?</style>|\s(?:nonce|data-csrf[\w-]*)=\"[^\"]*\"",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def html_fingerprint(html: str) -> str:
+    """Hash a page's markup, ignoring scripts, styles, nonces and whitespace."""
+    normalized = " ".join(_VOLATILE_HTML.sub(" ", html).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def capture_key(url: str, viewport: dict) -> str:
+    """Cache key for a URL rendered at a viewport."""
+    return hashlib.sha256(f"{url}|{viewport['width']}x{viewport['height']}".encode("utf-8")).hexdigest()
+
+
+class CaptureCache:
+    """
+    Page captures in a per-process LRU, backed by GCS when enabled.
+
+    Args:
+        ttl: Seconds since a capture was last validated before it expires
+        max_entries: Captures kept in memory
+        storage: A ``CloudStorage`` to share captures across instances, or None
+    """
+
+    PREFIX = "captures/"
+
+    def __init__(self, ttl: float = 86400, max_entries: int = 128, storage=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.storage = storage
+        self._entries: OrderedDict[str, PageCapture] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, capture: PageCapture) -> None:
+        with self._lock:
+            self._entries[key] = capture
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[PageCapture]:
+        """The cached capture for a key, or None if missing or expired."""
+        with self._lock:
+            capture = self._entries.get(key)
+            if capture is not None:
+                self._entries.move_to_end(key)
+
+        if capture is None and self.storage is not None:
+            try:
+                data = await asyncio.to_thread(self.storage.download_json, self.PREFIX + key + ".json")
+            except Exception as e:
+                logger.warning("Capture cache read error: %s", e)
+                data = None
+            if data:
+                capture = PageCapture(**data)
+                self._remember(key, capture)
+
+        if capture is None or capture.validated_at + self.ttl < time.time():
+            return None
+        return capture
+
+    async def set(self, key: str, capture: PageCapture) -> None:
+        """Store a capture in memory and, if configured, in GCS."""
+        self._remember(key, capture)
+        if self.storage is not None:
+            try:
+                await asyncio.to_thread(self.storage.upload_json, self.PREFIX + key + ".json", asdict(capture))
+            except Exception as e:
+                logger.warning("Capture cache write error: %s", e)
+
+
+class PageCapturer:
+    """
+    Cached page captures for URL audits.
+
+    A capture validated within ``revalidate_after`` seconds is reused as is.
+    An older one is reused if a plain HTTP fetch of the page still matches
+    its fingerprint; otherwise the page is rendered again. Concurrent
+    requests for the same URL share one rendering.
+
+    Args:
+        pool: The browser pool to render with
+        cache: Where captures are kept
+        revalidate_after: Seconds a capture is trusted without a fetch
+        timeout: Seconds allowed per rendering
+    """
+
+    def __init__(self, pool: BrowserPool, cache: CaptureCache, revalidate_after: float = 300, timeout: float = 20.0):
+        self.pool = pool
+        self.cache = cache
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        self.inflight = SingleFlight()
+
+    async def fingerprint(self, url: str) -> Optional[str]:
+        """Fingerprint of the page's current HTML, or None if it can't be fetched."""
+        try:
+            async with httpx.AsyncClient(follow_redirects=True, timeout=5.0) as client:
+                response = await client.get(url)
+                response.raise_for_status()
+        except httpx.HTTPError:
+            return None
+        return html_fingerprint(response.text)
+
+    async def capture(self, url: str, viewport: Optional[dict] = None) -> tuple[PageCapture, str]:
+        """
+        Capture a page, from cache when it hasn't changed.
+
+        Returns:
+            The capture and its source: "hit", "revalidated" or "miss"
+        """
+        viewport = viewport or VIEWPORT
+        key = capture_key(url, viewport)
+        result, _ = await self.inflight.do(key, lambda: self._capture(key, url, viewport))
+        return result
+
+    async def _capture(self, key: str, url: str, viewport: dict) -> tuple[PageCapture, str]:
+        cached = await self.cache.get(key)
+        if cached is not None and time.time() - cached.validated_at < self.revalidate_after:
+            return cached, "hit"
+
+        fingerprint = await self.fingerprint(url)
+        if cached is not None and fingerprint is not None and fingerprint == cached.fingerprint:
+            cached.validated_at = time.time()
+            await self.cache.set(key, cached)
+            return cached, "revalidated"
+
+        capture = await self.pool.capture(url, viewport, timeout=self.timeout)
+        capture.fingerprint = fingerprint
+        await self.cache.set(key, capture)
+        return capture, "miss"
+
+
+# Singleton
+_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """
+    Get the browser pool singleton.
+
+    Configured with BROWSER_POOL_SIZE, BROWSER_CONTEXTS_PER_BROWSER,
+    BROWSER_MAX_PAGES, BROWSER_MAX_WAITERS and BROWSER_ACQUIRE_TIMEOUT.
+    """
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool(
+            size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+            contexts_per_browser=int(os.getenv("BROWSER_CONTEXTS_PER_BROWSER", "4")),
+            max_pages=int(os.getenv("BROWSER_MAX_PAGES", "50")),
+            max_waiters=int(os.getenv("BROWSER_MAX_WAITERS", "32")),
+            acquire_timeout=float(os.getenv("BROWSER_ACQUIRE_TIMEOUT", "10")),
+        )
+    return _pool
+
+
+_capturer: Optional[PageCapturer] = None
+
+
+def get_page_capturer() -> PageCapturer:
+    """
+    Get the page capturer singleton.
+
+    Configured with CAPTURE_TIMEOUT, CAPTURE_CACHE_TTL,
+    CAPTURE_CACHE_MAX_ENTRIES, CAPTURE_REVALIDATE_AFTER and
+    CAPTURE_CACHE_GCS (true to share captures through Cloud Storage).
+    """
+    global _capturer
+    if _capturer is None:
+        storage = None
+        if os.getenv("CAPTURE_CACHE_GCS", "false").lower() == "true":
+            from service.core.storage import get_storage
+            storage = get_storage()
+        cache = CaptureCache(
+            ttl=float(os.getenv("CAPTURE_CACHE_TTL", "86400")),
+            max_entries=int(os.getenv("CAPTURE_CACHE_MAX_ENTRIES", "128")),
+            storage=storage,
+        )
+        _capturer = PageCapturer(
+            get_browser_pool(),
+            cache,
+            revalidate_after=float(os.getenv("CAPTURE_REVALIDATE_AFTER", "300")),
+            timeout=float(os.getenv("CAPTURE_TIMEOUT", "20")),
+        )
+    return _capturer
+
 
 async def capture_screenshot(url: str) -> str:
     """
     Captures a screenshot of the given URL.
     Returns the base64 encoded image string.
     """
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-        
-        # Set viewport for a desktop-like view
-        await page.set_viewport_size({"width": 1280, "height": 800})
-        
-        try:
-            await page.goto(url, wait_until="networkidle", timeout=15000)
-        except Exception:
-            # Fallback if networkidle takes too long
-            pass
-            
-        screenshot_bytes = await page.screenshot(type="jpeg", quality=80)
-        await browser.close()
-        
-        return base64.b64encode(screenshot_bytes).decode("utf-8")
+    capture, _ = await get_page_capturer().capture(url)
+    return capture.screenshot
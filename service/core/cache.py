@@ -0,0 +1,201 @@
+"""
+Content-addressed result cache for skill executions.
+
+Results are keyed on a canonical hash of everything that determines the
+model's output: the skill, the hash of its files, the model, the task,
+the normalized context, the content, any page text and a digest of any
+image. Editing a skill changes its hash, so stale entries are simply never
+looked up again and age out through the TTL.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from service.api.schemas import WorkRequest, WorkResult
+
+
+def _normalize(value):
+    """Normalize context values so equivalent requests hash the same."""
+    if isinstance(value, dict):
+        return {str(k).strip(): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def request_key(request: WorkRequest, skill_hash: str, model: str) -> str:
+    """
+    Compute the canonical cache key for a request.
+
+    Args:
+        request: The work request
+        skill_hash: Content hash of the skill's SKILL.md and support files
+        model: The model the request resolves to
+
+    Returns:
+        A hex SHA-256 digest
+    """
+    image_digest = None
+    if request.image_data:
+        image_digest = hashlib.sha256(request.image_data.encode("utf-8")).hexdigest()
+
+    canonical = json.dumps(
+        {
+            "skill": request.skill.value,
+            "skill_hash": skill_hash,
+            "model": model,
+            "task": request.task.strip(),
+            "context": _normalize(request.context or {}),
+            "content": request.content,
+            "page_text": request.page_text,
+            "image": image_digest,
+            "cascade": request.cascade,
+            "n_best": request.n_best,
+            "response_schema": request.response_schema,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Interface for result cache backends."""
+
+    def get(self, key: str) -> Optional[WorkResult]:
+        """Return the cached result for a key, or None on a miss."""
+        raise NotImplementedError
+
+    def set(self, key: str, result: WorkResult) -> None:
+        """Store a result under a key."""
+        raise NotImplementedError
+
+    async def get_async(self, key: str) -> Optional[WorkResult]:
+        """``get`` from a coroutine; backends that block override this."""
+        return self.get(key)
+
+    async def set_async(self, key: str, result: WorkResult) -> None:
+        """``set`` from a coroutine; backends that block override this."""
+        self.set(key, result)
+
+
+class MemoryResultCache(ResultCache):
+    """Per-process LRU cache with a TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, WorkResult]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[WorkResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def set(self, key: str, result: WorkResult) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteResultCache(ResultCache):
+    """
+    On-disk cache shared by every worker process on a host.
+
+    Uses WAL mode so readers never block on the single writer. The async
+    methods run queries in a thread, since a busy database can hold a
+    query for up to the one-second lock timeout. Expired rows are pruned
+    at most every ``prune_interval`` seconds rather than on every write.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, prune_interval: float = 300):
+        self.path = path
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=1.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+
+    def get(self, key: str) -> Optional[WorkResult]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return WorkResult.model_validate_json(row[0])
+
+    def set(self, key: str, result: WorkResult) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, result.model_dump_json(), now + self.ttl),
+            )
+            if now - self._pruned_at >= self.prune_interval:
+                self._pruned_at = now
+                self._conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+
+    async def get_async(self, key: str) -> Optional[WorkResult]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: str, result: WorkResult) -> None:
+        await asyncio.to_thread(self.set, key, result)
+
+
+# Singleton
+_cache: Optional[ResultCache] = None
+_cache_initialized = False
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Get the configured result cache, or None if caching is disabled.
+
+    Configured with RESULT_CACHE_BACKEND (memory, sqlite or none),
+    RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_PATH and
+    RESULT_CACHE_PRUNE_INTERVAL.
+    """
+    global _cache, _cache_initialized
+    if not _cache_initialized:
+        backend = os.getenv("RESULT_CACHE_BACKEND", "memory").lower()
+        ttl = float(os.getenv("RESULT_CACHE_TTL", "86400"))
+        if backend == "sqlite":
+            path = os.getenv("RESULT_CACHE_PATH", "/tmp/agency-result-cache.sqlite3")
+            prune_interval = float(os.getenv("RESULT_CACHE_PRUNE_INTERVAL", "300"))
+            _cache = SQLiteResultCache(path, ttl=ttl, prune_interval=prune_interval)
+        elif backend == "memory":
+            max_entries = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+            _cache = MemoryResultCache(max_entries=max_entries, ttl=ttl)
+        else:
+            _cache = None
+        _cache_initialized = True
+    return _cache
@@ -0,0 +1,180 @@
+"""
+Model cascade: run on a cheap model first, escalate when quality is low.
+
+Most simple requests are answered well by a fast, inexpensive model. In
+cascade mode the request runs there first, a scorer grades the result, and
+only results below the skill's threshold are re-run on the strong model.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Optional
+
+from service.api.schemas import WorkRequest, WorkResult
+
+if TYPE_CHECKING:
+    from service.core.executor import SkillExecutor
+
+DEFAULT_CHEAP_MODEL = "claude-haiku-4-5-20251001"
+
+# Minimum score (0-100) to accept the cheap model's result, per skill.
+# Audits and strategy work are judged more strictly than short copy.
+DEFAULT_THRESHOLDS = {
+    "copywriting": 65,
+    "copy-editing": 65,
+    "social-content": 60,
+    "email-sequence": 70,
+    "page-cro": 75,
+    "seo-audit": 75,
+    "pricing-strategy": 75,
+}
+DEFAULT_THRESHOLD = 70
+
+_REFUSAL = re.compile(r"\b(?:I can(?:no|')t|I'm unable|I am unable|I won't)\b", re.I)
+_WANTS_ALTERNATIVES = re.compile(r"\b(?:alternatives?|options|variations|variants|headlines|ideas)\b", re.I)
+_WANTS_RECOMMENDATIONS = re.compile(r"\b(?:audit|recommend\w*|improve|review|optimi[sz]e|critique)\b", re.I)
+
+
+def heuristic_score(request: WorkRequest, result: WorkResult) -> float:
+    """
+    Grade a result from its shape, without another model call.
+
+    Penalizes truncation, refusals, very short answers, unstructured
+    output, and missing alternatives or recommendations when the task
+    asks for them.
+
+    Returns:
+        A score from 0 to 100
+    """
+    score = 100.0
+    if result.metadata and result.metadata.get("stop_reason") == "max_tokens":
+        score -= 40
+    if _REFUSAL.search(result.output[:500]):
+        score -= 50
+    words = len(result.output.split())
+    if words < 40:
+        score -= 30
+    elif words < 120:
+        score -= 10
+    if not result.sections:
+        score -= 15
+    if _WANTS_ALTERNATIVES.search(request.task) and not result.alternatives:
+        score -= 20
+    if _WANTS_RECOMMENDATIONS.search(request.task) and not result.recommendations:
+        score -= 20
+    return max(0.0, score)
+
+
+class CascadeRunner:
+    """
+    Runs requests through the cheap-then-strong model cascade.
+
+    Args:
+        executor: The executor that runs each tier
+        cheap_model: Model tried first
+        scorer: "heuristic" (local, free) or "judge" (cheap-model critique
+            through QualityGuard)
+        thresholds: Per-skill minimum scores; others use DEFAULT_THRESHOLD
+    """
+
+    def __init__(
+        self,
+        executor: "SkillExecutor",
+        cheap_model: str = DEFAULT_CHEAP_MODEL,
+        scorer: str = "heuristic",
+        thresholds: Optional[dict[str, float]] = None,
+    ):
+        self.executor = executor
+        self.cheap_model = cheap_model
+        self.scorer = scorer
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self._runs: dict[str, int] = defaultdict(int)
+        self._escalations: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def threshold_for(self, skill: str) -> float:
+        return self.thresholds.get(skill, DEFAULT_THRESHOLD)
+
+    def escalation_rate(self, skill: str) -> float:
+        """Share of this process's cascade runs for a skill that escalated."""
+        with self._lock:
+            runs = self._runs[skill]
+            return round(self._escalations[skill] / runs, 3) if runs else 0.0
+
+    async def score(self, request: WorkRequest, result: WorkResult) -> float:
+        """Grade a cheap-tier result with the configured scorer."""
+        if self.scorer == "judge":
+            from service.core.quality import QualityGuard
+
+            verdict = await QualityGuard(self.executor).evaluate_copy(
+                result.output, context=request.task, model=self.cheap_model
+            )
+            if verdict.get("status") != "error":
+                return float(verdict.get("score", 0))
+            # Judge failed; fall back to the local heuristic
+        return heuristic_score(request, result)
+
+    async def run(self, request: WorkRequest) -> WorkResult:
+        """
+        Execute a request on the cheap model, escalating if it scores low.
+
+        The result's metadata gains a ``cascade`` entry with each tier's
+        model, latency and score, whether the request escalated, and the
+        skill's running escalation rate. Token counts cover every call.
+        """
+        skill = request.skill.value
+        strong_model = request.model or self.executor.default_model
+        threshold = self.threshold_for(skill)
+
+        started = time.perf_counter()
+        cheap = await self.executor.execute_async(
+            request.model_copy(update={"cascade": False, "model": self.cheap_model})
+        )
+        cheap_ms = round((time.perf_counter() - started) * 1000, 1)
+        score = await self.score(request, cheap)
+        tiers = [{"model": self.cheap_model, "latency_ms": cheap_ms, "score": score}]
+
+        escalated = score < threshold and strong_model != self.cheap_model
+        result = cheap
+        if escalated:
+            started = time.perf_counter()
+            result = await self.executor.execute_async(
+                request.model_copy(update={"cascade": False, "model": strong_model})
+            )
+            tiers.append({
+                "model": strong_model,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+            result.metadata["input_tokens"] += cheap.metadata["input_tokens"]
+            result.metadata["output_tokens"] += cheap.metadata["output_tokens"]
+
+        with self._lock:
+            self._runs[skill] += 1
+            if escalated:
+                self._escalations[skill] += 1
+
+        result.metadata["cascade"] = {
+            "tiers": tiers,
+            "threshold": threshold,
+            "scorer": self.scorer,
+            "escalated": escalated,
+            "escalation_rate": self.escalation_rate(skill),
+        }
+        return result
+
+
+def cascade_from_env(executor: "SkillExecutor") -> CascadeRunner:
+    """
+    Build a CascadeRunner from CASCADE_CHEAP_MODEL, CASCADE_SCORER and
+    CASCADE_THRESHOLDS (a JSON object of skill name to minimum score).
+    """
+    return CascadeRunner(
+        executor,
+        cheap_model=os.getenv("CASCADE_CHEAP_MODEL", DEFAULT_CHEAP_MODEL),
+        scorer=os.getenv("CASCADE_SCORER", "heuristic").lower(),
+        thresholds=json.loads(os.getenv("CASCADE_THRESHOLDS", "{}")),
+    )
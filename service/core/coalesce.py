@@ -0,0 +1,68 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+When many callers ask for the same key at once, only the first starts the
+upstream call; the rest wait on it and receive the same result, or the
+same exception.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class _Call:
+    """One upstream call and how many callers are attached to it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+
+    Args:
+        max_waiters: Callers that may share one upstream call besides the
+            one that started it. Beyond that, callers run their own call.
+            0 disables coalescing.
+    """
+
+    def __init__(self, max_waiters: int = 100):
+        self.max_waiters = max_waiters
+        self._calls: dict[str, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def joinable(self, key: str) -> bool:
+        """Whether a call for ``key`` is in flight with room for another caller."""
+        call = self._calls.get(key)
+        return call is not None and call.waiters < self.max_waiters
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Run ``fn`` once for all concurrent callers with the same key.
+
+        Returns:
+            The result and whether it was shared from another caller's call
+        """
+        call = self._calls.get(key)
+        if call is not None and call.waiters < self.max_waiters:
+            call.waiters += 1
+            # shield: a waiter that disconnects must not cancel the shared call
+            return await asyncio.shield(call.task), True
+
+        if call is not None or self.max_waiters <= 0:
+            return await fn(), False
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = _Call(task)
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), False
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        self._calls.pop(key, None)
+        # Mark the exception retrieved in case every caller has gone away
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,236 @@
+"""
+Content reduction for large HTML inputs.
+
+Landing-page HTML is mostly scripts, styles, SVG paths, tracking pixels and
+layout wrappers, none of which a CRO or copy audit needs. ``reduce_html``
+rewrites HTML as compact markup that keeps only what the page says and how
+it is structured: headings, copy, links and CTAs, forms and image alt text.
+``ContentReducer`` applies it to request content, passing anything that
+isn't HTML through unchanged.
+"""
+
+import hashlib
+import html
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Optional
+
+from service.core.tokens import CHARS_PER_TOKEN
+
+# Dropped together with everything inside them
+SKIP_TAGS = frozenset({"script", "style", "svg", "noscript", "template", "iframe", "canvas", "object", "head"})
+
+# Kept as tags; everything else is unwrapped to its text
+KEEP_TAGS = frozenset({
+    "h1", "h2", "h3", "h4", "h5", "h6", "p", "ul", "ol", "li", "blockquote",
+    "a", "button", "form", "input", "select", "option", "textarea", "label", "img",
+    "header", "nav", "main", "section", "article", "aside", "footer",
+    "table", "tr", "th", "td", "strong", "em",
+})
+KEEP_ATTRS = frozenset({"href", "type", "name", "placeholder", "alt", "action", "method", "value", "aria-label", "role"})
+VOID_TAGS = frozenset({"input", "img", "br", "hr", "meta", "link", "source"})
+
+# Block-level tags start a new line in the output
+BLOCK_TAGS = KEEP_TAGS - {"a", "button", "input", "select", "option", "label", "img", "strong", "em"}
+
+# 1x1 images and known beacons are tracking pixels, not content
+_TRACKING_SRC = re.compile(r"facebook\.com/tr|google-analytics|doubleclick|/pixel|/collect\b|bat\.bing", re.I)
+_DOCUMENT_HINT = re.compile(r"<(?:!doctype|html|head|body)\b", re.I)
+_TAG = re.compile(r"</?(?:div|span|section|header|footer|main|nav|article|script|style|p|a|ul|ol|li|img|button|form|input|h[1-6])\b[^<>]*>", re.I)
+# A fragment needs this many tags, at least one per TAG_SPACING characters
+MIN_TAGS = 4
+TAG_SPACING = 200
+# Before a landmark, or before a heading that doesn't open one
+_BLOCK_BOUNDARY = re.compile(
+    r"\n(?=<(?:section|header|footer|article|main)\b)"
+    r"|(?<!<section>)(?<!<header>)(?<!<article>)(?<!<main>)\n(?=<h[1-3]\b)"
+)
+
+
+def looks_like_html(text: str) -> bool:
+    """
+    Whether text is (mostly) HTML markup.
+
+    A document marker is enough; otherwise the start of the text must be
+    dense with tags, so markdown or prose that quotes a tag or two isn't
+    run through the HTML reducer and flattened.
+    """
+    sample = text[:4000]
+    if _DOCUMENT_HINT.search(sample[:2000]):
+        return True
+    tags = len(_TAG.findall(sample))
+    return tags >= MIN_TAGS and tags * TAG_SPACING >= len(sample)
+
+
+class _Reducer(HTMLParser):
+    """Streams HTML into compact semantic markup."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: list[str] = []
+        self._skip_depth = 0
+        self.title: Optional[str] = None
+        self.description: Optional[str] = None
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag in SKIP_TAGS:
+                self._skip_depth += 1
+            return
+        attrs = dict(attrs)
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag == "meta" and (attrs.get("name") or "").lower() == "description":
+            self.description = attrs.get("content")
+            return
+        if tag in SKIP_TAGS:
+            if tag == "head":
+                # Keep <title> and the meta description, drop the rest
+                return
+            self._skip_depth = 1
+            return
+        if tag not in KEEP_TAGS:
+            return
+        if tag == "img" and self._is_tracking_pixel(attrs):
+            return
+        kept = "".join(
+            f' {name}="{html.escape(value)}"' if value is not None else f" {name}"
+            for name, value in attrs.items()
+            if name in KEEP_ATTRS and not (name == "href" and (value or "").startswith("javascript:"))
+        )
+        self.out.append(("\n" if tag in BLOCK_TAGS else "") + f"<{tag}{kept}>")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in SKIP_TAGS and tag != "head" and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag in SKIP_TAGS:
+                self._skip_depth -= 1
+            return
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag in KEEP_TAGS and tag not in VOID_TAGS:
+            self.out.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        text = " ".join(data.split())
+        if not text:
+            if data and self.out and not self.out[-1].endswith(" "):
+                self.out.append(" ")
+            return
+        if self._in_title:
+            self.title = html.escape(text, quote=False)
+            return
+        self.out.append(html.escape(text, quote=False))
+
+    @staticmethod
+    def _is_tracking_pixel(attrs: dict) -> bool:
+        if attrs.get("width") in ("0", "1") or attrs.get("height") in ("0", "1"):
+            return True
+        return bool(_TRACKING_SRC.search(attrs.get("src") or ""))
+
+    def result(self) -> str:
+        body = "".join(self.out)
+        # Drop elements left empty once their wrappers' content was removed
+        empty = re.compile(r"<(p|li|ul|ol|section|header|footer|nav|main|article|aside|blockquote|strong|em)>\s*</\1>")
+        previous = None
+        while previous != body:
+            previous, body = body, empty.sub("", body)
+        lines = [line.strip() for line in body.split("\n")]
+        head = []
+        if self.title:
+            head.append(f"<title>{self.title}</title>")
+        if self.description:
+            head.append(f'<meta name="description" content="{html.escape(self.description)}">')
+        return "\n".join(head + [line for line in lines if line])
+
+
+def reduce_html(markup: str) -> str:
+    """Rewrite HTML as compact semantic markup."""
+    parser = _Reducer()
+    parser.feed(markup)
+    parser.close()
+    return parser.result()
+
+
+@dataclass
+class ReducedContent:
+    """Content after reduction, with its size before and after."""
+    text: str
+    original_chars: int
+    reduced: bool
+
+    @property
+    def compression_ratio(self) -> float:
+        """Original size over reduced size (1.0 when nothing was removed)."""
+        return round(self.original_chars / max(1, len(self.text)), 2)
+
+
+def split_content(text: str, max_tokens: int) -> list[str]:
+    """
+    Split reduced content into pieces of at most about ``max_tokens``.
+
+    Splits prefer section and heading boundaries, then any line break.
+    """
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    blocks = []
+    for block in _BLOCK_BOUNDARY.split(text):
+        while len(block) > max_chars:
+            cut = block.rfind("\n", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            blocks.append(block[:cut])
+            block = block[cut:].lstrip("\n")
+        blocks.append(block)
+
+    pieces: list[str] = []
+    current = ""
+    for block in blocks:
+        if current and len(current) + len(block) + 1 > max_chars:
+            pieces.append(current)
+            current = block
+        else:
+            current = f"{current}\n{block}" if current else block
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class ContentReducer:
+    """Memoized content reduction; prompts are built several times per request."""
+
+    def __init__(self, cache_entries: int = 64):
+        self.cache_entries = cache_entries
+        self._reduced: OrderedDict[str, ReducedContent] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reduce(self, content: str) -> ReducedContent:
+        """Reduce HTML content; other content is returned unchanged."""
+        key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._reduced.get(key)
+            if cached is not None:
+                self._reduced.move_to_end(key)
+                return cached
+
+        if looks_like_html(content):
+            reduced = ReducedContent(reduce_html(content), len(content), True)
+        else:
+            reduced = ReducedContent(content, len(content), False)
+
+        with self._lock:
+            self._reduced[key] = reduced
+            while len(self._reduced) > self.cache_entries:
+                self._reduced.popitem(last=False)
+        return reduced
@@ -4,6 +4,44 @@ from google.cloud import firestore
 from google.oauth2 import service_account
 from datetime import datetime
 
+# Kept well under Firestore's 10 MiB request limit with large results
+RESULT_WRITE_BATCH = 20
+
+
+# Wraps an array stored inside another array
+NESTED_ARRAY_KEY = "_nested_array"
+
+
+def storable(value: Any) -> Any:
+    """
+    Make a value storable in Firestore, which rejects arrays directly
+    inside arrays: each nested array is wrapped as ``{NESTED_ARRAY_KEY: [...]}``.
+    Markdown tables (rows of cells) and structured results need this.
+    ``loaded`` reverses it.
+    """
+    if isinstance(value, dict):
+        return {key: storable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [
+            {NESTED_ARRAY_KEY: storable(item)} if isinstance(item, (list, tuple)) else storable(item)
+            for item in value
+        ]
+    return value
+
+
+def loaded(value: Any) -> Any:
+    """Undo ``storable`` on a value read back from Firestore."""
+    if isinstance(value, dict):
+        return {key: loaded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [
+            loaded(item[NESTED_ARRAY_KEY])
+            if isinstance(item, dict) and item.keys() == {NESTED_ARRAY_KEY} else loaded(item)
+            for item in value
+        ]
+    return value
+
+
 class FirestoreClient:
     def __init__(self, project_id: Optional[str] = None):
         # Load credentials from service.json if it exists
@@ -28,17 +66,17 @@ class FirestoreClient:
 
         if "id" in brief_data and brief_data["id"]:
             doc_ref = self.briefs_collection.document(brief_data["id"])
-            doc_ref.set(brief_data, merge=True)
+            doc_ref.set(storable(brief_data), merge=True)
             return brief_data["id"]
         else:
-            update_time, doc_ref = self.briefs_collection.add(brief_data)
+            update_time, doc_ref = self.briefs_collection.add(storable(brief_data))
             return doc_ref.id
 
     def get_brief(self, brief_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a brief by ID."""
         doc = self.briefs_collection.document(brief_id).get()
         if doc.exists:
-            data = doc.to_dict()
+            data = loaded(doc.to_dict())
             data["id"] = doc.id
             return data
         return None
@@ -51,11 +89,30 @@ class FirestoreClient:
         
         results = []
         for doc in docs:
-            data = doc.to_dict()
+            data = loaded(doc.to_dict())
             data["id"] = doc.id
             results.append(data)
         return results
 
+    def save_batch_results(self, brief_id: str, results: List[Dict[str, Any]]) -> None:
+        """
+        Save a batch job's per-item results under its brief.
+
+        Each result is its own document, so a large batch doesn't push the
+        brief past Firestore's 1 MiB document limit.
+        """
+        results_col = self.briefs_collection.document(brief_id).collection('results')
+        for start in range(0, len(results), RESULT_WRITE_BATCH):
+            batch = self.db.batch()
+            for result in results[start:start + RESULT_WRITE_BATCH]:
+                batch.set(results_col.document(str(result["index"])), storable(result))
+            batch.commit()
+
+    def get_batch_results(self, brief_id: str) -> List[Dict[str, Any]]:
+        """Get a batch job's per-item results, in submission order."""
+        docs = self.briefs_collection.document(brief_id).collection('results').stream()
+        return sorted((loaded(doc.to_dict()) for doc in docs), key=lambda result: result["index"])
+
     def save_lead(self, lead_data: Dict[str, Any]) -> str:
         """Save a new lead to Firestore."""
         leads_col = self.db.collection('leads')
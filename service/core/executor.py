@@ -2,18 +2,55 @@
 Skill executor - loads skills and runs them through Claude API.
 """
 
+import asyncio
+import json
+import logging
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Optional
 
 import anthropic
 from dotenv import load_dotenv
 
 from service.api.schemas import SkillName, WorkRequest, WorkResult
+from service.core.analyzer import OutputAnalyzer, analyze_output
+from service.core.cache import get_result_cache, request_key
+from service.core.cascade import cascade_from_env
+from service.core.coalesce import SingleFlight
+from service.core.nbest import n_best_from_env
+from service.core.routing import router_from_env
+from service.core.semantic_cache import get_semantic_cache, partition_key
+from service.core import structured
+from service.core.content import ContentReducer, split_content
+from service.core.images import ImagePreprocessor
+from service.core.log import log_payload, truncate
+from service.core.skill_index import get_skill_index
+from service.core.skill_registry import SkillRegistry
+from service.core.tokens import CHARS_PER_TOKEN, TokenEstimator, estimate_input_tokens, estimate_text_tokens
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Entered around the model calls of a request that missed the cache, with
+# the request and its prebuilt params (None when the request fans out);
+# raising refuses the request before anything is sent
+CallGuard = Callable[[WorkRequest, Optional[dict[str, Any]]], AsyncContextManager]
+
+MINIMAX_BASE_URL = "https://api.minimax.io/anthropic"
+
+PREAMBLE = "\n".join([
+    "You are operating as a marketing agency skill executor.",
+    "",
+    "Execute each task using the skill framework below. ",
+    "Follow the skill's methodology, apply its frameworks, and use its quality checklists.",
+    "",
+    "Provide structured output with clear sections. ",
+    "If the skill calls for alternatives, provide them. ",
+    "If it calls for recommendations, prioritize them.",
+])
+
 
 class SkillExecutor:
     """Executes marketing skills using LLM APIs."""
@@ -27,20 +64,58 @@ class SkillExecutor:
         """
         # Standard Anthropic client
         self.anthropic_client = anthropic.Anthropic()
-        
-        # MiniMax client (using Anthropic SDK compatibility)
+        self.async_anthropic_client = anthropic.AsyncAnthropic()
+
+        # MiniMax client (using Anthropic SDK compatibility).
+        # with_options() shares the parent's pooled HTTP client, so both
+        # providers reuse one set of keep-alive connections.
         minimax_key = os.getenv("MINIMAX_API_KEY")
         if minimax_key:
-            self.minimax_client = anthropic.Anthropic(
+            self.minimax_client = self.anthropic_client.with_options(
+                api_key=minimax_key,
+                base_url=MINIMAX_BASE_URL,
+            )
+            self.async_minimax_client = self.async_anthropic_client.with_options(
                 api_key=minimax_key,
-                base_url="https://api.minimax.io/anthropic"
+                base_url=MINIMAX_BASE_URL,
             )
         else:
             self.minimax_client = None
+            self.async_minimax_client = None
 
-        self.skills_path = skills_path or Path(__file__).parent.parent.parent / "skills"
         self.default_model = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929")
-        self._skill_cache: dict[str, str] = {}
+        self.skill_index = get_skill_index()
+        self.skill_registry = SkillRegistry(
+            skills_path or Path(__file__).parent.parent.parent / "skills",
+            self.skill_index,
+            poll_interval=float(os.getenv("SKILL_RELOAD_INTERVAL", "2")),
+        )
+        self.content_reducer = ContentReducer()
+        self.content_token_budget = int(os.getenv("CONTENT_TOKEN_BUDGET", "12000"))
+        self.map_reduce_max_chunks = int(os.getenv("MAP_REDUCE_MAX_CHUNKS", "8"))
+        self.image_preprocessor = ImagePreprocessor(
+            quality=int(os.getenv("IMAGE_JPEG_QUALITY", "80")),
+            max_tiles=int(os.getenv("IMAGE_MAX_TILES", "4")),
+        )
+        self.result_cache = get_result_cache()
+        self.semantic_cache = get_semantic_cache()
+        self.token_estimator = TokenEstimator(
+            default=int(os.getenv("DEFAULT_MAX_TOKENS", "4096")),
+            ceiling=int(os.getenv("MAX_OUTPUT_TOKENS", "8192")),
+        )
+        self.token_count_mode = os.getenv("TOKEN_COUNT_MODE", "local").lower()
+        self.cascade = cascade_from_env(self)
+        self.router = router_from_env(self._provider_client)
+        self.n_best = n_best_from_env(self)
+        self.inflight = SingleFlight(max_waiters=int(os.getenv("COALESCE_MAX_WAITERS", "100")))
+
+    @property
+    def skills_path(self) -> Path:
+        return self.skill_registry.skills_path
+
+    @skills_path.setter
+    def skills_path(self, path: Path) -> None:
+        self.skill_registry.retarget(path)
 
     def load_skill(self, skill_name: SkillName) -> str:
         """
@@ -52,39 +127,74 @@ class SkillExecutor:
         Returns:
             The skill's markdown content
         """
-        if skill_name.value in self._skill_cache:
-            return self._skill_cache[skill_name.value]
+        # The registry recompiles the skill when its files change
+        return self.skill_registry.get(skill_name.value).corpus.skill_md
+
+    def skill_hash(self, skill_name: SkillName) -> str:
+        """Content hash of a skill's SKILL.md and support files."""
+        return self.skill_registry.get(skill_name.value).hash
+
+    def build_system(self, skill_name: SkillName, query: str = "") -> list[dict[str, Any]]:
+        """
+        Build the system prompt for a skill.
+
+        The agency preamble and the skill framework are identical for every
+        request to a skill, so they go in the system prompt with a cache
+        breakpoint after the framework. Repeat calls then read the prefix
+        from the provider's prompt cache instead of paying for it again.
+
+        Sections of the skill's rules, references and templates that match
+        the query follow the breakpoint, within SKILL_TOKEN_BUDGET.
+
+        Args:
+            skill_name: The skill to execute
+            query: Text the skill's support files are ranked against
+
+        Returns:
+            System content blocks for the Messages API
+        """
+        compiled = self.skill_registry.get(skill_name.value)
+        framework, references = self.skill_index.assemble(self.skills_path / skill_name.value, query)
 
-        skill_path = self.skills_path / skill_name.value / "SKILL.md"
+        if framework is compiled.corpus.skill_md:
+            # Whole SKILL.md: reuse the block compiled with the skill
+            framework_block = compiled.framework_block
+        else:
+            framework_block = {
+                "type": "text",
+                "text": f"## Skill Framework\n\n{framework}",
+                "cache_control": {"type": "ephemeral"},
+            }
 
-        if not skill_path.exists():
-            raise FileNotFoundError(f"Skill not found: {skill_name.value}")
+        system = [{"type": "text", "text": PREAMBLE}, framework_block]
+        if references:
+            system.append({
+                "type": "text",
+                "text": f"## Skill References\n\nExcerpts from the skill's supporting files relevant to this task.\n\n{references}",
+            })
+        return system
 
-        content = skill_path.read_text()
-        self._skill_cache[skill_name.value] = content
-        return content
+    @staticmethod
+    def retrieval_query(request: WorkRequest) -> str:
+        """The text skill chunks are ranked against: the task and context."""
+        parts = [request.task]
+        for key, value in (request.context or {}).items():
+            parts.append(f"{key} {value}")
+        return "\n".join(parts)
 
     def build_prompt(self, request: WorkRequest) -> str:
         """
-        Build the full prompt for Claude, combining skill and request.
+        Build the per-request part of the prompt: task, context and content.
+
+        The skill itself lives in the system prompt (see ``build_system``).
 
         Args:
             request: The work request
 
         Returns:
-            The complete prompt string
+            The user message text
         """
-        skill_content = self.load_skill(request.skill)
-
         prompt_parts = [
-            "You are operating as a marketing agency skill executor.",
-            "",
-            "## Skill Framework",
-            "",
-            skill_content,
-            "",
-            "---",
-            "",
             "## Your Task",
             "",
             request.task,
@@ -103,64 +213,51 @@ class SkillExecutor:
                     prompt_parts.append(f"**{key}**: {value}")
 
         if request.content:
+            # HTML is reduced to its semantic markup first
             prompt_parts.extend([
                 "",
                 "## Content to Analyze/Improve",
                 "",
                 "```",
-                request.content,
+                self.content_reducer.reduce(request.content).text,
                 "```",
             ])
 
-        prompt_parts.extend([
-            "",
-            "---",
-            "",
-            "Execute this task using the skill framework above. ",
-            "Follow the skill's methodology, apply its frameworks, and use its quality checklists.",
-            "",
-            "Provide structured output with clear sections. ",
-            "If the skill calls for alternatives, provide them. ",
-            "If it calls for recommendations, prioritize them.",
-        ])
+        if request.page_text:
+            prompt_parts.extend([
+                "",
+                "## Page Content",
+                "",
+                request.page_text,
+            ])
 
         return "\n".join(prompt_parts)
 
-    def execute(self, request: WorkRequest) -> WorkResult:
-        """
-        Execute a skill with the given request.
+    def _provider_client(self, provider: str):
+        """The async client for a routing provider name, or None."""
+        if provider == "minimax":
+            return self.async_minimax_client
+        return self.async_anthropic_client
 
-        Args:
-            request: The work request
-
-        Returns:
-            The work result
-        """
-        prompt = self.build_prompt(request)
-        
-        # Determine model and client
-        model = request.model or self.default_model
-        
+    def _select_client(self, model: str, use_async: bool = False):
+        """Pick the provider client for a model."""
         if model.lower().startswith("minimax"):
-            if not self.minimax_client:
+            client = self.async_minimax_client if use_async else self.minimax_client
+            if not client:
                 raise ValueError("MiniMax API key not configured")
-            client = self.minimax_client
-        else:
-            client = self.anthropic_client
+            return client
+        return self.async_anthropic_client if use_async else self.anthropic_client
+
+    def _build_params(self, request: WorkRequest, model: str) -> dict[str, Any]:
+        """Build the keyword arguments for a Messages API call."""
+        prompt = self.build_prompt(request)
 
         messages = []
         if request.image_data:
+            images = self.image_preprocessor.prepare(request.image_data)
             messages.append({
                 "role": "user",
-                "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "image/jpeg",
-                            "data": request.image_data,
-                        },
-                    },
+                "content": [image.block() for image in images] + [
                     {
                         "type": "text",
                         "text": prompt
@@ -170,13 +267,28 @@ class SkillExecutor:
         else:
             messages.append({"role": "user", "content": prompt})
 
-        message = client.messages.create(
-            model=model,
-            max_tokens=4096,
-            messages=messages
-        )
+        params = {
+            "model": model,
+            "max_tokens": self.token_estimator.max_tokens_for(request.skill.value),
+            "system": self.build_system(request.skill, self.retrieval_query(request)),
+            "messages": messages,
+        }
+        if request.response_schema:
+            params.update(structured.tool_params(request.response_schema))
+        return params
+
+    async def _build_params_async(self, request: WorkRequest, model: str) -> dict[str, Any]:
+        """``_build_params`` with image preprocessing moved off the event loop."""
+        if request.image_data:
+            await self.image_preprocessor.prepare_async(request.image_data)
+        return self._build_params(request, model)
 
-        print(f"DEBUG: Model response content: {message.content}")
+    def _build_result(self, request: WorkRequest, model: str, message) -> WorkResult:
+        """Turn a Messages API response into a WorkResult."""
+        log_payload(logger, "Model response", message.content, model=model, skill=request.skill.value)
+
+        if request.response_schema:
+            return self._build_structured_result(request, model, message)
 
         # Extract text content from all blocks (handling both TextBlock and ThinkingBlock)
         output_parts = []
@@ -192,92 +304,371 @@ class SkillExecutor:
         output = "\n".join(output_parts)
 
         if not output.strip():
-            print("ERROR: Empty output from model")
+            logger.error("Empty output from model", extra={"model": model, "skill": request.skill.value})
             # Fallback or error
             raise ValueError("Model returned empty response")
 
-        # Parse structured sections from the output
-        sections = self._parse_sections(output)
-        alternatives = self._extract_alternatives(output)
-        recommendations = self._extract_recommendations(output)
+        self.token_estimator.record(
+            request.skill.value,
+            message.usage.output_tokens,
+            truncated=getattr(message, "stop_reason", None) == "max_tokens",
+        )
+
+        # Parse structured sections from the output in a single pass
+        analysis = analyze_output(output)
 
         return WorkResult(
             skill=request.skill,
             output=output,
-            sections=sections if sections else None,
-            alternatives=alternatives if alternatives else None,
-            recommendations=recommendations if recommendations else None,
-            metadata={
-                "model": model,
-                "input_tokens": message.usage.input_tokens,
-                "output_tokens": message.usage.output_tokens,
-            }
+            sections=analysis.sections or None,
+            subsections=analysis.subsections or None,
+            alternatives=analysis.alternatives[:10] or None,  # Cap at 10
+            recommendations=analysis.recommendations[:20] or None,  # Cap at 20
+            tables=analysis.tables or None,
+            code_blocks=analysis.code_blocks or None,
+            metadata=self._result_metadata(request, model, message),
+        )
+
+    def _build_structured_result(self, request: WorkRequest, model: str, message) -> WorkResult:
+        """
+        Turn a forced tool call into a WorkResult carrying the validated
+        value in ``structured``; ``output`` is its JSON text.
+        """
+        value = structured.extract(message, request.response_schema)
+        self.token_estimator.record(
+            request.skill.value,
+            message.usage.output_tokens,
+            truncated=getattr(message, "stop_reason", None) == "max_tokens",
+        )
+        return WorkResult(
+            skill=request.skill,
+            output=json.dumps(value, indent=2),
+            structured=value,
+            metadata=self._result_metadata(request, model, message),
         )
 
-    def _parse_sections(self, output: str) -> dict:
-        """Extract sections from markdown output."""
-        sections = {}
-        current_section = None
-        current_content = []
-
-        for line in output.split("\n"):
-            if line.startswith("## "):
-                if current_section:
-                    sections[current_section] = "\n".join(current_content).strip()
-                current_section = line[3:].strip()
-                current_content = []
-            elif line.startswith("### ") and not current_section:
-                if current_section:
-                    sections[current_section] = "\n".join(current_content).strip()
-                current_section = line[4:].strip()
-                current_content = []
-            elif current_section:
-                current_content.append(line)
-
-        if current_section:
-            sections[current_section] = "\n".join(current_content).strip()
-
-        return sections
-
-    def _extract_alternatives(self, output: str) -> list[str]:
-        """Extract alternative options from output."""
-        alternatives = []
-        in_alternatives = False
-
-        for line in output.split("\n"):
-            lower = line.lower()
-            if "alternative" in lower and ("headline" in lower or "cta" in lower or "option" in lower):
-                in_alternatives = True
-                continue
-            if in_alternatives:
-                if line.startswith("- ") or line.startswith("* "):
-                    alternatives.append(line[2:].strip())
-                elif line.startswith("1. ") or line.startswith("2. ") or line.startswith("3. "):
-                    alternatives.append(line[3:].strip())
-                elif line.startswith("##"):
-                    in_alternatives = False
-
-        return alternatives[:10]  # Cap at 10
-
-    def _extract_recommendations(self, output: str) -> list[str]:
-        """Extract recommendations from output."""
-        recommendations = []
-        in_recommendations = False
-
-        for line in output.split("\n"):
-            lower = line.lower()
-            if any(term in lower for term in ["recommendation", "quick win", "action item", "next step"]):
-                in_recommendations = True
-                continue
-            if in_recommendations:
-                if line.startswith("- ") or line.startswith("* "):
-                    recommendations.append(line[2:].strip())
-                elif line.startswith(("1. ", "2. ", "3. ", "4. ", "5. ")):
-                    recommendations.append(line[3:].strip())
-                elif line.startswith("##"):
-                    in_recommendations = False
-
-        return recommendations[:20]  # Cap at 20
+    def _result_metadata(self, request: WorkRequest, model: str, message) -> dict[str, Any]:
+        metadata = {
+            "model": model,
+            "input_tokens": message.usage.input_tokens,
+            "output_tokens": message.usage.output_tokens,
+            "cache_read_input_tokens": getattr(message.usage, "cache_read_input_tokens", None) or 0,
+            "cache_creation_input_tokens": getattr(message.usage, "cache_creation_input_tokens", None) or 0,
+            "stop_reason": getattr(message, "stop_reason", None),
+        }
+        if request.content:
+            reduced = self.content_reducer.reduce(request.content)
+            if reduced.reduced:
+                metadata["content_compression_ratio"] = reduced.compression_ratio
+        return metadata
+
+    async def estimate_tokens(self, request: WorkRequest, params: Optional[dict[str, Any]] = None) -> dict[str, int]:
+        """
+        Estimate the token cost of a request before running it.
+
+        Input tokens come from the provider's count endpoint when
+        TOKEN_COUNT_MODE=provider, falling back to the local approximation.
+        Requests that fan out are estimated across all their model calls.
+
+        Args:
+            request: The work request
+            params: The request's already built params, if any
+
+        Returns:
+            ``input_tokens``, ``max_output_tokens``, their ``total`` and
+            ``model_calls``
+        """
+        model = request.model or self.default_model
+        if params is None:
+            params = await self._build_params_async(request, model)
+
+        input_tokens = None
+        if self.token_count_mode == "provider" and not model.lower().startswith("minimax"):
+            try:
+                counted = await self.async_anthropic_client.messages.count_tokens(
+                    model=model,
+                    system=params["system"],
+                    messages=params["messages"],
+                )
+                input_tokens = counted.input_tokens
+            except anthropic.APIError as e:
+                logger.warning("Token count failed, using local estimate: %s", e)
+        if input_tokens is None:
+            input_tokens = estimate_input_tokens(params)
+
+        calls = self.model_calls(request)
+        oversized = None if request.cascade or request.n_best > 1 else self._oversized_content_tokens(request)
+        if oversized is not None:
+            # Chunks split the content, but each resends the rest of the
+            # prompt, and the merge reads up to the content budget
+            input_tokens += (calls - 1) * max(0, input_tokens - oversized) + self.content_token_budget
+        else:
+            # Judge and scorer calls are counted as full calls
+            input_tokens *= calls
+        max_output_tokens = params["max_tokens"] * calls
+
+        return {
+            "input_tokens": input_tokens,
+            "max_output_tokens": max_output_tokens,
+            "total": input_tokens + max_output_tokens,
+            "model_calls": calls,
+        }
+
+    def _oversized_content_tokens(self, request: WorkRequest) -> Optional[int]:
+        """Tokens of the reduced content if it is over budget and will be map-reduced, else None."""
+        if not request.content:
+            return None
+        tokens = estimate_text_tokens(self.content_reducer.reduce(request.content).text)
+        return tokens if tokens > self.content_token_budget else None
+
+    def model_calls(self, request: WorkRequest) -> int:
+        """Model calls ``execute_async`` makes for a request, counting cascades as escalating."""
+        if request.cascade:
+            tier = self.model_calls(request.model_copy(update={"cascade": False}))
+            return 2 * tier + (1 if self.cascade.scorer == "judge" else 0)
+        if request.n_best > 1:
+            return request.n_best * self.model_calls(request.model_copy(update={"n_best": 1})) + 1
+        tokens = self._oversized_content_tokens(request)
+        if tokens is None:
+            return 1
+        chunk_tokens = max(self.content_token_budget, -(-tokens // self.map_reduce_max_chunks))
+        return -(-tokens // chunk_tokens) + 1
+
+    def execute(self, request: WorkRequest) -> WorkResult:
+        """
+        Execute a skill with the given request.
+
+        Blocks the calling thread for the whole LLM call; use
+        ``execute_async`` from inside the event loop.
+
+        Args:
+            request: The work request
+
+        Returns:
+            The work result
+        """
+        model = request.model or self.default_model
+        client = self._select_client(model)
+        message = client.messages.create(**self._build_params(request, model))
+        return self._build_result(request, model, message)
+
+    async def execute_async(self, request: WorkRequest, params: Optional[dict[str, Any]] = None) -> WorkResult:
+        """
+        Execute a skill without blocking the event loop.
+
+        Args:
+            request: The work request
+            params: Prebuilt params for a request that doesn't fan out
+
+        Returns:
+            The work result
+        """
+        if request.cascade:
+            return await self.cascade.run(request)
+        if request.n_best > 1:
+            return await self.n_best.run(request)
+        if request.content:
+            reduced = self.content_reducer.reduce(request.content)
+            if estimate_text_tokens(reduced.text) > self.content_token_budget:
+                return await self._execute_map_reduce(request, reduced.text)
+        return await self._execute_once(request, params)
+
+    async def prepare_params(self, request: WorkRequest) -> Optional[dict[str, Any]]:
+        """Build a request's params up front, or None if it fans out and each call builds its own."""
+        if self.model_calls(request) > 1:
+            return None
+        return await self._build_params_async(request, request.model or self.default_model)
+
+    async def _execute_once(self, request: WorkRequest, params: Optional[dict[str, Any]] = None) -> WorkResult:
+        """Run a request as a single Messages API call, through the router."""
+        model = request.model or self.default_model
+        if model.lower().startswith("minimax"):
+            # Same error as before routing when MiniMax isn't configured
+            self._select_client(model, use_async=True)
+        if params is None:
+            params = await self._build_params_async(request, model)
+        message, route, hedged = await self.router.create(params)
+        result = self._build_result(request, route.model, message)
+        result.metadata["provider"] = route.provider
+        if hedged:
+            result.metadata["hedged"] = True
+        return result
+
+    async def _execute_map_reduce(self, request: WorkRequest, content: str) -> WorkResult:
+        """
+        Analyze oversized content in chunks concurrently, then merge.
+
+        Each chunk gets the original task scoped to its part of the page;
+        a final call merges the partial analyses into one result.
+
+        Args:
+            request: The work request
+            content: The reduced content, over the token budget
+        """
+        total_tokens = estimate_text_tokens(content)
+        chunk_tokens = max(self.content_token_budget, -(-total_tokens // self.map_reduce_max_chunks))
+        chunks = split_content(content, chunk_tokens)
+        count = len(chunks)
+
+        partials = await asyncio.gather(*(
+            self._execute_once(request.model_copy(update={
+                "content": chunk,
+                "response_schema": None,
+                "task": (
+                    f"{request.task}\n\nThe content is part {i} of {count} of a larger page. "
+                    "Analyze only this part; the parts will be merged afterwards."
+                ),
+            }))
+            for i, chunk in enumerate(chunks, 1)
+        ))
+
+        # The partial analyses are markdown, so they go in as page text
+        # rather than through the HTML reducer
+        merged = await self._execute_once(request.model_copy(update={
+            "content": None,
+            "page_text": self._merge_input([partial.output for partial in partials]),
+            "task": (
+                f"{request.task}\n\nThe page was too large to analyze at once, so its {count} parts "
+                "were analyzed separately, in page order; the analyses follow. Merge them into one "
+                "complete response to the task: remove duplicates, keep the strongest alternatives "
+                "and prioritize recommendations across the whole page."
+            ),
+        }))
+
+        calls = partials + [merged]
+        merged.metadata.update({
+            "input_tokens": sum(r.metadata["input_tokens"] for r in calls),
+            "output_tokens": sum(r.metadata["output_tokens"] for r in calls),
+            "content_compression_ratio": self.content_reducer.reduce(request.content).compression_ratio,
+            "map_reduce_chunks": count,
+        })
+        return merged
+
+    def _merge_input(self, outputs: list[str]) -> str:
+        """Join partial analyses, trimming each evenly if together they exceed the content budget."""
+        count = len(outputs)
+        if sum(estimate_text_tokens(output) for output in outputs) > self.content_token_budget:
+            limit = int(self.content_token_budget / count * CHARS_PER_TOKEN)
+            outputs = [truncate(output, limit) for output in outputs]
+        return "\n\n".join(f"## Part {i} of {count}\n\n{output}" for i, output in enumerate(outputs, 1))
+
+    def cache_key(self, request: WorkRequest) -> str:
+        """Canonical content hash identifying a request's result."""
+        model = request.model or self.default_model
+        return request_key(request, self.skill_hash(request.skill), model)
+
+    async def execute_cached(
+        self, request: WorkRequest, guard: Optional[CallGuard] = None,
+    ) -> tuple[WorkResult, str]:
+        """
+        Execute a skill through the result cache and in-flight coalescing.
+
+        Concurrent identical requests share one upstream call, whether or
+        not a result cache is configured.
+
+        Args:
+            request: The work request; ``use_cache=False`` skips both the
+                cache lookup and coalescing but still stores the fresh result
+            guard: Entered only when this request makes model calls itself,
+                not for cache hits or callers sharing another's call
+
+        Returns:
+            The work result and its source: "hit", "semantic", "miss",
+            "coalesced" or "bypass"
+        """
+        key = self.cache_key(request)
+        partition = None
+        if self.semantic_cache is not None:
+            partition = partition_key(request, self.skill_hash(request.skill), request.model or self.default_model)
+
+        if not request.use_cache:
+            result = await self._execute_guarded(request, guard)
+            await self._store(key, request, partition, result)
+            return result, "bypass"
+
+        if self.result_cache is not None:
+            cached = await self.result_cache.get_async(key)
+            if cached is not None:
+                return cached, "hit"
+
+        audited = None
+        if request.semantic_cache and partition is not None:
+            similar = self.semantic_cache.lookup(request, partition)
+            if similar is not None:
+                if not self.semantic_cache.should_audit():
+                    return similar, "semantic"
+                audited = similar
+
+        if self.inflight.joinable(key):
+            result, shared = await self.inflight.do(key, lambda: self.execute_async(request))
+        else:
+            # Guard outside the shared call, so a refusal reaches only this caller
+            result, shared = await self._execute_guarded(request, guard, key)
+        if shared:
+            return result, "coalesced"
+        await self._store(key, request, partition, result)
+        if audited is not None:
+            self.semantic_cache.record_audit(audited, result)
+        return result, "miss"
+
+    async def _execute_guarded(
+        self, request: WorkRequest, guard: Optional[CallGuard], key: Optional[str] = None,
+    ) -> Any:
+        """
+        Run a request inside its guard, reusing the params the guard saw.
+
+        With a ``key`` the call goes through in-flight coalescing, and the
+        result and whether it was shared are returned.
+        """
+        params = await self.prepare_params(request) if guard is not None else None
+
+        def run():
+            return self.execute_async(request, params)
+
+        if guard is None:
+            return await (self.inflight.do(key, run) if key is not None else run())
+        async with guard(request, params):
+            return await (self.inflight.do(key, run) if key is not None else run())
+
+    async def _store(self, key: str, request: WorkRequest, partition: Optional[str], result: WorkResult) -> None:
+        """Save a fresh result in the exact cache and the semantic index."""
+        if self.result_cache is not None:
+            await self.result_cache.set_async(key, result)
+        if partition is not None:
+            self.semantic_cache.add(key, request, partition, result)
+
+    async def stream_async(self, request: WorkRequest) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Execute a skill, yielding events as the model generates.
+
+        Yields ``(event, data)`` pairs:
+            ("delta", str): a chunk of generated text
+            ("section", (title, content)): a ``## `` section that just completed
+            ("result", WorkResult): the final result, once the stream ends
+
+        Args:
+            request: The work request
+        """
+        model = request.model or self.default_model
+        client = self._select_client(model, use_async=True)
+        analyzer = OutputAnalyzer()
+
+        params = await self._build_params_async(request, model)
+        async with client.messages.stream(**params) as stream:
+            async for text in stream.text_stream:
+                yield "delta", text
+                for section in analyzer.feed(text):
+                    yield "section", section
+            message = await stream.get_final_message()
+
+        for section in analyzer.finish():
+            yield "section", section
+        yield "result", self._build_result(request, model, message)
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP clients."""
+        await self.async_anthropic_client.close()
+        self.anthropic_client.close()
 
 
 # Singleton instance
@@ -0,0 +1,216 @@
+"""
+Image normalization before vision calls.
+
+Images arrive as base64 in ``WorkRequest.image_data``, often full-resolution
+screenshots. Before they are sent, each is decoded once, its format is
+detected from the file signature, it is downscaled to the resolution the
+model actually uses, re-encoded, and tall full-page captures are split into
+tiles. Prepared images are memoized by digest, so token estimation,
+execution and retries don't repeat the work, and ``prepare_async`` runs
+the decode and resize in a thread so they stay off the event loop.
+
+Resizing and re-encoding need Pillow. Without it images are passed through
+unchanged, with their detected media type.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# The model downscales anything larger, so extra pixels only add upload time
+MAX_EDGE = 1568
+MAX_PIXELS = 1_150_000
+
+
+class ImageError(ValueError):
+    """Raised for image data that is not valid base64 or not a supported format."""
+
+
+def detect_media_type(data: bytes) -> str:
+    """
+    Detect an image's media type from its leading bytes.
+
+    Raises:
+        ImageError: If the bytes are not JPEG, PNG, GIF or WebP
+    """
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    raise ImageError("Unsupported image format (expected JPEG, PNG, GIF or WebP)")
+
+
+@dataclass
+class PreparedImage:
+    """An image ready for a Messages API image block."""
+    media_type: str
+    data: str  # base64
+    digest: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+    def block(self) -> dict:
+        """The image as a Messages API content block."""
+        return {
+            "type": "image",
+            "source": {"type": "base64", "media_type": self.media_type, "data": self.data},
+        }
+
+
+class ImagePreprocessor:
+    """
+    Normalizes request images for vision calls.
+
+    Args:
+        max_edge: Longest side after downscaling, in pixels
+        max_pixels: Pixel budget per image or tile after downscaling
+        quality: JPEG quality for re-encoded images
+        max_tiles: Tiles a tall capture is split into at most; taller
+            captures get taller tiles rather than losing their bottom
+        tile_ratio: Height/width ratio above which an image is tiled
+        cache_entries: Prepared inputs kept in memory
+    """
+
+    def __init__(
+        self,
+        max_edge: int = MAX_EDGE,
+        max_pixels: int = MAX_PIXELS,
+        quality: int = 80,
+        max_tiles: int = 4,
+        tile_ratio: float = 1.5,
+        cache_entries: int = 64,
+    ):
+        self.max_edge = max_edge
+        self.max_pixels = max_pixels
+        self.quality = quality
+        self.max_tiles = max_tiles
+        self.tile_ratio = tile_ratio
+        self.cache_entries = cache_entries
+        self._prepared: OrderedDict[str, list[PreparedImage]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(image_data: str) -> tuple[str, str]:
+        if image_data.startswith("data:"):
+            image_data = image_data.partition(",")[2]
+        return image_data, hashlib.sha256(image_data.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[list[PreparedImage]]:
+        with self._lock:
+            cached = self._prepared.get(key)
+            if cached is not None:
+                self._prepared.move_to_end(key)
+            return cached
+
+    async def prepare_async(self, image_data: str) -> list[PreparedImage]:
+        """``prepare`` in a worker thread, unless the image is already prepared."""
+        cached = self._cached(self._key(image_data)[1])
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self.prepare, image_data)
+
+    def prepare(self, image_data: str) -> list[PreparedImage]:
+        """
+        Prepare one request image, possibly as several tiles.
+
+        Args:
+            image_data: Base64 image data, optionally as a ``data:`` URL
+
+        Returns:
+            One or more images, without duplicates, in reading order
+
+        Raises:
+            ImageError: If the data is not a supported base64 image
+        """
+        image_data, key = self._key(image_data)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        try:
+            raw = base64.b64decode(image_data, validate=True)
+        except (binascii.Error, ValueError):
+            raise ImageError("image_data is not valid base64")
+        media_type = detect_media_type(raw)
+
+        if Image is None or media_type == "image/gif":
+            # Nothing to gain without Pillow; GIFs may be animated
+            prepared = [PreparedImage(media_type, image_data, hashlib.sha256(raw).hexdigest())]
+        else:
+            prepared = self._normalize(raw, image_data, media_type)
+
+        with self._lock:
+            self._prepared[key] = prepared
+            while len(self._prepared) > self.cache_entries:
+                self._prepared.popitem(last=False)
+        return prepared
+
+    def _normalize(self, raw: bytes, image_data: str, media_type: str) -> list[PreparedImage]:
+        try:
+            image = Image.open(io.BytesIO(raw))
+            image.load()
+        except Exception as e:
+            raise ImageError(f"Could not read image: {e}")
+
+        width, height = image.size
+        if height > width * self.tile_ratio:
+            # Full-page capture: square-ish tiles top to bottom stay legible
+            # where one downscaled strip would not. Past max_tiles squares
+            # the tiles grow taller, so the whole page is still covered
+            tile_height = max(width, -(-height // self.max_tiles))
+            boxes = [
+                (0, top, width, min(height, top + tile_height))
+                for top in range(0, height, tile_height)
+            ]
+        else:
+            boxes = [None]
+
+        prepared = []
+        seen = set()
+        for box in boxes:
+            tile = image.crop(box) if box else image
+            scale = min(
+                1.0,
+                self.max_edge / max(tile.size),
+                (self.max_pixels / (tile.size[0] * tile.size[1])) ** 0.5,
+            )
+            if box is None and scale == 1.0 and media_type == "image/jpeg":
+                # Already small enough; re-encoding would only lose quality
+                encoded = raw
+            else:
+                if scale < 1.0:
+                    tile = tile.resize(
+                        (max(1, int(tile.size[0] * scale)), max(1, int(tile.size[1] * scale))),
+                        Image.LANCZOS,
+                    )
+                buffer = io.BytesIO()
+                tile.convert("RGB").save(buffer, format="JPEG", quality=self.quality, optimize=True)
+                encoded = buffer.getvalue()
+                if box is None and scale == 1.0 and len(encoded) >= len(raw):
+                    encoded = raw
+
+            digest = hashlib.sha256(encoded).hexdigest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            if encoded is raw:
+                prepared.append(PreparedImage(media_type, image_data, digest, *tile.size))
+            else:
+                data = base64.b64encode(encoded).decode("ascii")
+                prepared.append(PreparedImage("image/jpeg", data, digest, *tile.size))
+        return prepared
@@ -1,50 +1,633 @@
+"""
+Per-user daily request limits with leased quota.
+
+The authoritative count of a user's requests for the day lives in a
+backend: Firestore by default, or Redis or process memory. Rather than a
+round trip per request, each instance leases a few units at a time with
+one atomic, capped increment and admits requests from its local bucket
+until the lease runs out. A backend never grants past the limit, so all
+instances together can't over-admit. Units left in leases that go idle
+are handed back periodically so other instances can use them.
+
+Request rates per endpoint are checked separately by a RateChecker: per
+plan, a GCRA limit smooths bursts within a minute and sliding windows cap
+each hour and day. With Redis every check for a request runs in one Lua
+script, so a request costs one round trip however many limits apply.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional
+
+from google.cloud import firestore
+
 from service.core.db import get_db
 
-class RateLimiter:
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class LimitBackend:
+    """Authoritative per-user, per-window counters."""
+
+    def lease(self, key: str, window: str, units: int, limit: int) -> int:
+        """
+        Atomically take up to ``units`` from a counter without passing ``limit``.
+
+        Returns:
+            Units granted, 0 if the limit is reached
+        """
+        raise NotImplementedError
+
+    def release(self, key: str, window: str, units: int) -> None:
+        """Hand back leased units that were never used."""
+        raise NotImplementedError
+
+
+class MemoryBackend(LimitBackend):
+    """Counters in this process; for tests and single-instance deployments."""
+
     def __init__(self):
-        self.db = get_db()
+        self._counts: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def used(self, key: str, window: str) -> int:
+        return self._counts.get((key, window), 0)
+
+    def lease(self, key: str, window: str, units: int, limit: int) -> int:
+        with self._lock:
+            used = self._counts.get((key, window), 0)
+            granted = max(0, min(units, limit - used))
+            self._counts[(key, window)] = used + granted
+            return granted
+
+    def release(self, key: str, window: str, units: int) -> None:
+        with self._lock:
+            self._counts[(key, window)] = max(0, self._counts.get((key, window), 0) - units)
+
+
+class FirestoreBackend(LimitBackend):
+    """
+    Counters at ``users/{user_id}/usage/{date}``, taken in a transaction.
+
+    Leasing keeps writes to a user's document to a few per minute even
+    under heavy traffic, well within Firestore's per-document write rate.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or get_db()
+
+    def _ref(self, key: str, window: str):
+        return self.db.db.collection('users').document(key).collection('usage').document(window)
+
+    def lease(self, key: str, window: str, units: int, limit: int) -> int:
+        ref = self._ref(key, window)
+
+        @firestore.transactional
+        def take(transaction) -> int:
+            snapshot = ref.get(transaction=transaction)
+            used = snapshot.to_dict().get("count", 0) if snapshot.exists else 0
+            granted = max(0, min(units, limit - used))
+            if granted:
+                transaction.set(ref, {"count": used + granted}, merge=True)
+            return granted
+
+        return take(self.db.db.transaction())
+
+    def release(self, key: str, window: str, units: int) -> None:
+        self._ref(key, window).set({"count": firestore.Increment(-units)}, merge=True)
+
+
+# Grant what fits under the limit and bump the counter in one round trip
+LEASE_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+local granted = math.max(0, math.min(tonumber(ARGV[1]), tonumber(ARGV[2]) - used))
+if granted > 0 then
+    redis.call('INCRBY', KEYS[1], granted)
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return granted
+"""
+
+# Hand units back only to a counter that still exists: a day's counter that
+# expired must not come back negative, with an extra day's worth of units
+RELEASE_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+local units = math.min(tonumber(ARGV[1]), used)
+if units > 0 then
+    redis.call('DECRBY', KEYS[1], units)
+end
+return units
+"""
+
+
+class RedisBackend(LimitBackend):
+    """
+    Counters in Redis, leased and released by Lua scripts.
+
+    Args:
+        url: Redis connection URL
+        ttl: Seconds a day's counter is kept
+        client: A redis-py client; built from ``url`` when omitted
+    """
+
+    def __init__(self, url: Optional[str] = None, ttl: int = 2 * 86400, client=None):
+        if client is None:
+            if redis is None:
+                raise ImportError("The redis package is required for LIMITER_BACKEND=redis")
+            client = redis.Redis.from_url(url or os.getenv("REDIS_URL", "redis://localhost:6379"))
+        self.client = client
+        self.ttl = ttl
+        self._lease = self.client.register_script(LEASE_SCRIPT)
+        self._release = self.client.register_script(RELEASE_SCRIPT)
+
+    @staticmethod
+    def _key(key: str, window: str) -> str:
+        return f"limit:{key}:{window}"
+
+    def lease(self, key: str, window: str, units: int, limit: int) -> int:
+        return int(self._lease(keys=[self._key(key, window)], args=[units, limit, self.ttl]))
+
+    def release(self, key: str, window: str, units: int) -> None:
+        self._release(keys=[self._key(key, window)], args=[units])
+
+
+def backend_from_env() -> LimitBackend:
+    """The backend named by LIMITER_BACKEND: firestore, redis or memory."""
+    name = os.getenv("LIMITER_BACKEND", "firestore").lower()
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    return FirestoreBackend()
+
+
+@dataclass
+class _Bucket:
+    """One user's leased, not yet used units on this instance."""
+    window: str = ""
+    tokens: int = 0
+    used_at: float = 0.0
+    denied_until: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class RateLimiter:
+    """
+    Enforces daily request limits from locally leased quota.
+
+    Args:
+        backend: Authoritative counters; defaults to LIMITER_BACKEND
+        lease_size: Most units leased per backend call; small limits lease
+            a quarter of the limit, at least one unit. At the default daily
+            limits (5 and 1) that is one unit, so every request is a
+            backend round trip: a bigger lease could strand a user's last
+            units on an instance they aren't routed to until it goes idle
+        idle_after: Seconds a lease may go unused before its units are
+            handed back
+        deny_for: Seconds a refused user is refused locally before the
+            backend is asked again
+    """
+
+    def __init__(
+        self,
+        backend: Optional[LimitBackend] = None,
+        lease_size: Optional[int] = None,
+        idle_after: Optional[float] = None,
+        deny_for: Optional[float] = None,
+    ):
+        self.backend = backend or backend_from_env()
+        self.db = getattr(self.backend, "db", None)
         self.daily_limit_user = 5
         self.daily_limit_anon = 1
+        self.lease_size = lease_size or int(os.getenv("LIMITER_LEASE_SIZE", "50"))
+        self.idle_after = idle_after if idle_after is not None else float(os.getenv("LIMITER_IDLE_AFTER", "10"))
+        self.deny_for = deny_for if deny_for is not None else float(os.getenv("LIMITER_DENY_FOR", "5"))
+        self._buckets: dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def _bucket(self, key: str) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(key, _Bucket())
+        return bucket
+
+    def lease_units(self, limit: int) -> int:
+        """
+        Units to lease against ``limit``: a quarter of it, capped at
+        ``lease_size``, so several instances can hold leases at once.
+        Limits under 8 lease a single unit and get no batching.
+        """
+        return max(1, min(self.lease_size, limit // 4))
+
+    def take(self, key: str, limit: int, window: str) -> bool:
+        """
+        Admit one request against ``limit`` for ``window``.
+
+        Returns:
+            True if admitted; also True if the backend fails, so an outage
+            doesn't block users
+        """
+        bucket = self._bucket(key)
+        with bucket.lock:
+            now = time.monotonic()
+            if bucket.window != window:
+                # A new window; units leased for the old one no longer count
+                bucket.window, bucket.tokens, bucket.denied_until = window, 0, 0.0
+            if not bucket.tokens:
+                if bucket.denied_until > now:
+                    return False
+                try:
+                    granted = self.backend.lease(key, window, self.lease_units(limit), limit)
+                except Exception as e:
+                    logger.warning("Rate limiter error: %s", e)
+                    return True
+                if not granted:
+                    bucket.denied_until = now + self.deny_for
+                    return False
+                bucket.tokens = granted
+            bucket.tokens -= 1
+            bucket.used_at = now
+            return True
 
     def check_limit(self, user_id: str, is_anonymous: bool) -> bool:
         """
         Check if the user has exceeded their daily limit.
         Returns True if allowed, False if limit exceeded.
         """
-        today = datetime.utcnow().strftime("%Y-%m-%d")
-        
-        # Collection path: users/{user_id}/usage/{date}
-        # For anonymous: use a special prefix or collection? 
-        # Let's treat anon IDs as normal user IDs but enforce lower limit.
-        
-        usage_ref = self.db.db.collection('users').document(user_id).collection('usage').document(today)
-        
-        # Atomic transaction to check and increment
-        # Note: In a high-throughput scenario, we'd use a distributed counter or Redis.
-        # For "5 per day", simple read-update is fine or even just Firestore increment.
-        
-        try:
-            doc = usage_ref.get()
-            current_count = 0
-            if doc.exists:
-                current_count = doc.to_dict().get("count", 0)
-            
-            limit = self.daily_limit_anon if is_anonymous else self.daily_limit_user
-            
-            if current_count >= limit:
-                return False
-                
-            # Increment
-            usage_ref.set({"count": current_count + 1}, merge=True)
-            return True
-            
-        except Exception as e:
-            print(f"Rate limiter error: {e}")
-            # Fail open if DB error? Or fail closed? 
-            # Let's fail open to not block users on infra glitches
-            return True
+        limit = self.daily_limit_anon if is_anonymous else self.daily_limit_user
+        return self.take(user_id, limit, datetime.utcnow().strftime("%Y-%m-%d"))
+
+    def reconcile(self, idle_after: Optional[float] = None) -> int:
+        """
+        Hand back units of leases unused for ``idle_after`` seconds and
+        forget buckets with nothing left to track.
+
+        Returns:
+            Units handed back
+        """
+        idle_after = self.idle_after if idle_after is None else idle_after
+        released = 0
+        for key, bucket in list(self._buckets.items()):
+            if not bucket.lock.acquire(blocking=False):
+                continue
+            try:
+                now = time.monotonic()
+                if now - bucket.used_at < idle_after:
+                    continue
+                if bucket.tokens:
+                    try:
+                        self.backend.release(key, bucket.window, bucket.tokens)
+                    except Exception as e:
+                        logger.warning("Rate limiter release failed for %s: %s", key, e)
+                        continue
+                    released += bucket.tokens
+                    bucket.tokens = 0
+                if bucket.denied_until <= now:
+                    with self._lock:
+                        self._buckets.pop(key, None)
+            finally:
+                bucket.lock.release()
+        return released
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.idle_after)
+            try:
+                await asyncio.to_thread(self.reconcile)
+            except Exception:
+                logger.exception("Rate limiter reconcile failed")
+
+    def start(self) -> None:
+        """Start handing back idle leases in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        """Stop reconciling and hand back every unused unit."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.reconcile, 0)
+
+
+@dataclass(frozen=True)
+class Rate:
+    """
+    A limit on requests per period.
+
+    ``window`` limits use a sliding window: the current fixed window's
+    count plus the previous one's, weighted by how much of it still
+    overlaps. ``gcra`` limits spread requests evenly over the period while
+    allowing ``burst`` at once.
+    """
+    name: str
+    limit: int
+    period: float  # seconds
+    algorithm: str = "window"
+    burst: int = 1
+
+
+@dataclass
+class RateDecision:
+    """The outcome of checking every rate for one request."""
+    allowed: bool
+    retry_after: float = 0.0
+    remaining: dict[str, int] = field(default_factory=dict)
+    exceeded: list[str] = field(default_factory=list)
+
+
+# Request rates per endpoint; signed-in users without a tenant are on starter
+PLAN_RATES = {
+    "anonymous": (
+        Rate("minute", 3, 60, "gcra", burst=1),
+        Rate("hour", 10, 3600),
+        Rate("day", 20, 86400),
+    ),
+    "starter": (
+        Rate("minute", 20, 60, "gcra", burst=5),
+        Rate("hour", 300, 3600),
+        Rate("day", 2000, 86400),
+    ),
+    "growth": (
+        Rate("minute", 60, 60, "gcra", burst=15),
+        Rate("hour", 1500, 3600),
+        Rate("day", 10000, 86400),
+    ),
+    "enterprise": (
+        Rate("minute", 300, 60, "gcra", burst=60),
+        Rate("hour", 10000, 3600),
+        Rate("day", 100000, 86400),
+    ),
+}
+
+
+def _window_wait(previous: float, current: float, elapsed: float, limit: int, cost: int) -> float:
+    """
+    Fraction of a period until a sliding window admits ``cost`` more,
+    where ``cost`` is at most ``limit``.
+
+    Args:
+        previous: Count in the previous fixed window
+        current: Count in the current fixed window
+        elapsed: Fraction of the current fixed window that has passed
+    """
+    room = limit - cost - current
+    if room >= 0 and previous > 0:
+        # The previous window's weight fades as the current one goes on
+        return max(0.0, 1 - room / previous - elapsed)
+    # Wait for the next window, where the current count becomes the previous
+    return 1 - elapsed + max(0.0, 1 - (limit - cost) / current)
+
+
+class RateChecker:
+    """Checks a request against several rates at once, all or nothing."""
+
+    def check(self, checks: list[tuple[str, Rate]], cost: int = 1) -> RateDecision:
+        """
+        Record ``cost`` requests against every keyed rate, if all allow it.
+
+        A cost larger than a rate could ever allow, such as an n-best
+        request's fan-out against a small burst, is charged as the whole
+        burst or limit, so the request is slowed rather than always refused.
+
+        Args:
+            checks: Counter keys with the rate each is held to
+            cost: Requests this call counts as
+
+        Returns:
+            The decision; nothing is recorded when it's denied
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def key(user_id: str, endpoint: str, rate: Rate) -> str:
+        # The user in braces keeps a request's keys in one Redis Cluster slot
+        return f"rate:{{{user_id}}}:{endpoint}:{rate.name}"
+
+    def check_plan(self, plan: str, user_id: str, endpoint: str, cost: int = 1) -> RateDecision:
+        """Check a user's request to an endpoint against their plan's rates."""
+        rates = PLAN_RATES.get(plan, PLAN_RATES["starter"])
+        return self.check([(self.key(user_id, endpoint, rate), rate) for rate in rates], cost)
+
+
+class MemoryRateChecker(RateChecker):
+    """
+    The Redis checks in this process; for tests and single instances.
+
+    Args:
+        clock: Seconds since the epoch; injectable for tests
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._windows: dict[str, dict[int, int]] = {}
+        self._tats: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def check(self, checks: list[tuple[str, Rate]], cost: int = 1) -> RateDecision:
+        with self._lock:
+            now = self.clock()
+            decision = RateDecision(allowed=True)
+            pending = []
+            for key, rate in checks:
+                if rate.algorithm == "gcra":
+                    charge = min(cost, rate.burst)
+                    emission = rate.period / rate.limit
+                    tolerance = emission * rate.burst
+                    tat = max(self._tats.get(key, now), now)
+                    new_tat = tat + emission * charge
+                    excess = new_tat - now - tolerance
+                    if excess > 0:
+                        decision.exceeded.append(rate.name)
+                        decision.retry_after = max(decision.retry_after, excess)
+                        decision.remaining[rate.name] = max(0, math.floor((tolerance - (tat - now)) / emission))
+                    else:
+                        decision.remaining[rate.name] = math.floor((tolerance - (new_tat - now)) / emission)
+                        pending.append((key, rate, new_tat, charge))
+                else:
+                    charge = min(cost, rate.limit)
+                    index = math.floor(now / rate.period)
+                    elapsed = now / rate.period - index
+                    counts = self._windows.get(key, {})
+                    previous, current = counts.get(index - 1, 0), counts.get(index, 0)
+                    estimate = previous * (1 - elapsed) + current
+                    if estimate + charge > rate.limit:
+                        decision.exceeded.append(rate.name)
+                        wait = _window_wait(previous, current, elapsed, rate.limit, charge) * rate.period
+                        decision.retry_after = max(decision.retry_after, wait)
+                        decision.remaining[rate.name] = max(0, math.floor(rate.limit - estimate))
+                    else:
+                        decision.remaining[rate.name] = math.floor(rate.limit - estimate - charge)
+                        pending.append((key, rate, index, charge))
+            if decision.exceeded:
+                decision.allowed = False
+                return decision
+            for key, rate, value, charge in pending:
+                if rate.algorithm == "gcra":
+                    self._tats[key] = value
+                else:
+                    counts = self._windows.setdefault(key, {})
+                    counts[value] = counts.get(value, 0) + charge
+                    for index in [index for index in counts if index < value - 1]:
+                        del counts[index]
+            return decision
+
+
+# Every check for one request, evaluated against Redis's clock and only
+# recorded if all of them pass. ARGV: cost, then per key: algorithm, limit,
+# period in ms, burst. Returns allowed, retry_after in ms, then per key the
+# remaining count and whether it was exceeded.
+RATE_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local cost = tonumber(ARGV[1])
+local allowed = 1
+local retry = 0
+local result = {}
+local pending = {}
+local charges = {}
+
+for i, key in ipairs(KEYS) do
+    local base = 1 + (i - 1) * 4
+    local algorithm = ARGV[base + 1]
+    local limit = tonumber(ARGV[base + 2])
+    local period = tonumber(ARGV[base + 3])
+    local burst = tonumber(ARGV[base + 4])
+    local remaining, exceeded = 0, 0
+    -- More than a rate could ever allow is charged as all of it
+    local charge = math.min(cost, limit)
+    if algorithm == 'gcra' then charge = math.min(cost, burst) end
+    charges[i] = charge
+
+    if algorithm == 'gcra' then
+        local emission = period / limit
+        local tolerance = emission * burst
+        local tat = tonumber(redis.call('GET', key) or '0')
+        if tat < now then tat = now end
+        local new_tat = tat + emission * charge
+        local excess = new_tat - now - tolerance
+        if excess > 0 then
+            exceeded = 1
+            retry = math.max(retry, excess)
+            remaining = math.max(0, math.floor((tolerance - (tat - now)) / emission))
+        else
+            remaining = math.floor((tolerance - (new_tat - now)) / emission)
+            pending[i] = new_tat
+        end
+    else
+        local index = math.floor(now / period)
+        local elapsed = now / period - index
+        local previous = tonumber(redis.call('HGET', key, index - 1) or '0')
+        local current = tonumber(redis.call('HGET', key, index) or '0')
+        local estimate = previous * (1 - elapsed) + current
+        if estimate + charge > limit then
+            exceeded = 1
+            local room = limit - charge - current
+            local wait
+            if room >= 0 and previous > 0 then
+                wait = math.max(0, 1 - room / previous - elapsed)
+            else
+                wait = 1 - elapsed + math.max(0, 1 - (limit - charge) / current)
+            end
+            retry = math.max(retry, wait * period)
+            remaining = math.max(0, math.floor(limit - estimate))
+        else
+            remaining = math.floor(limit - estimate - charge)
+            pending[i] = index
+        end
+    end
+    if exceeded == 1 then allowed = 0 end
+    result[#result + 1] = remaining
+    result[#result + 1] = exceeded
+end
+
+if allowed == 1 then
+    for i, key in ipairs(KEYS) do
+        local base = 1 + (i - 1) * 4
+        local period = tonumber(ARGV[base + 3])
+        if ARGV[base + 1] == 'gcra' then
+            redis.call('SET', key, string.format('%.3f', pending[i]), 'PX', math.max(1, math.ceil(pending[i] - now)))
+        else
+            redis.call('HINCRBY', key, pending[i], charges[i])
+            redis.call('HDEL', key, pending[i] - 2)
+            redis.call('PEXPIRE', key, math.ceil(period * 2))
+        end
+    end
+end
+
+return {allowed, math.ceil(retry), unpack(result)}
+"""
+
+
+class RedisRateChecker(RateChecker):
+    """
+    Rate checks in Redis, one script call per request.
+
+    Args:
+        client: A redis-py client; built from ``url`` when omitted
+        url: Redis connection URL
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None):
+        if client is None:
+            if redis is None:
+                raise ImportError("The redis package is required for RATE_LIMIT_BACKEND=redis")
+            client = redis.Redis.from_url(url or os.getenv("REDIS_URL", "redis://localhost:6379"))
+        self.client = client
+        self._script = client.register_script(RATE_SCRIPT)
+
+    def check(self, checks: list[tuple[str, Rate]], cost: int = 1) -> RateDecision:
+        args = [cost]
+        for _, rate in checks:
+            args += [rate.algorithm, rate.limit, int(rate.period * 1000), rate.burst]
+        reply = self._script(keys=[key for key, _ in checks], args=args)
+        decision = RateDecision(allowed=bool(int(reply[0])), retry_after=int(reply[1]) / 1000)
+        for i, (_, rate) in enumerate(checks):
+            decision.remaining[rate.name] = int(reply[2 + 2 * i])
+            if int(reply[3 + 2 * i]):
+                decision.exceeded.append(rate.name)
+        return decision
+
+
+_rate_checker: Optional[RateChecker] = None
+_rate_checker_loaded = False
+
+
+def get_rate_checker() -> Optional[RateChecker]:
+    """
+    The request-rate checker named by RATE_LIMIT_BACKEND, or None if off.
+
+    ``redis`` and ``memory`` pick a backend; unset means Redis when
+    REDIS_URL is configured and no rate checks otherwise.
+    """
+    global _rate_checker, _rate_checker_loaded
+    if not _rate_checker_loaded:
+        name = os.getenv("RATE_LIMIT_BACKEND", "redis" if os.getenv("REDIS_URL") else "none").lower()
+        if name == "redis":
+            _rate_checker = RedisRateChecker()
+        elif name == "memory":
+            _rate_checker = MemoryRateChecker()
+        _rate_checker_loaded = True
+    return _rate_checker
+
 
 _limiter: Optional[RateLimiter] = None
 
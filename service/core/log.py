@@ -0,0 +1,195 @@
+"""
+Structured logging, formatted and written off the request path.
+
+Records are handed to a bounded queue on the calling thread and turned
+into JSON lines by a listener thread, so a log call costs an enqueue rather
+than string formatting and a blocking write to stdout. Each line carries
+the request ID of the request that logged it, and uses the ``severity``
+key Cloud Logging reads from JSON on stdout.
+
+Large payloads such as model responses go through ``log_payload``, which
+skips the record entirely unless its level is enabled and it is sampled,
+and every field is truncated so one response can't dominate ingestion.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional, TextIO
+
+# Set per HTTP request by the middleware in main.py and per message by the worker
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["QueueLogHandler"] = None
+_payload_sample_rate = 1.0
+
+
+def truncate(text: str, limit: int) -> str:
+    """Cut text to ``limit`` characters, noting how much was dropped."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def _jsonable(value: Any) -> Any:
+    """Fallback for json.dumps: SDK models as dicts, anything else as str."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+
+    Args:
+        max_field_chars: Longest string kept for the message and each field
+    """
+
+    def __init__(self, max_field_chars: int = 2000):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def _field(self, value: Any) -> Any:
+        if isinstance(value, (bool, int, float)) or value is None:
+            return value
+        if not isinstance(value, str):
+            text = json.dumps(value, default=_jsonable)
+            if len(text) <= self.max_field_chars:
+                return json.loads(text)
+            value = text
+        return truncate(value, self.max_field_chars)
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage(), self.max_field_chars),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = self._field(value)
+        if record.exc_info:
+            entry["exception"] = truncate(self.formatException(record.exc_info), self.max_field_chars)
+        return json.dumps(entry, default=_jsonable)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them.
+
+    The stdlib QueueHandler formats on the calling thread; this one only
+    captures the current request ID and leaves formatting to the listener,
+    so log arguments should not be mutated after the call. Records are
+    dropped and counted when the queue is full rather than blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    stream: Optional[TextIO] = None,
+) -> QueueLogHandler:
+    """
+    Route the root logger through a queue to a listener thread.
+
+    Safe to call more than once; later calls replace the previous setup.
+
+    Args:
+        level: Root level; defaults to LOG_LEVEL, then INFO
+        fmt: ``json`` or ``text``; defaults to LOG_FORMAT, then json
+        stream: Where lines are written; defaults to stdout
+
+    Returns:
+        The queue handler installed on the root logger
+    """
+    global _listener, _handler, _payload_sample_rate
+    shutdown_logging()
+
+    if (fmt or os.getenv("LOG_FORMAT", "json")).lower() == "text":
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    else:
+        formatter = JsonFormatter(max_field_chars=int(os.getenv("LOG_MAX_FIELD_CHARS", "2000")))
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+
+    _handler = QueueLogHandler(queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    _payload_sample_rate = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueLogHandler):
+            root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    return _handler
+
+
+def shutdown_logging() -> None:
+    """Stop the listener after it writes every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def log_payload(
+    logger: logging.Logger,
+    message: str,
+    payload: Any,
+    level: int = logging.DEBUG,
+    **fields: Any,
+) -> bool:
+    """
+    Log a large payload, such as a model response, if enabled and sampled.
+
+    Nothing is built or serialized unless the record will be written; the
+    payload is truncated to LOG_MAX_FIELD_CHARS when it is formatted.
+
+    Args:
+        logger: The module's logger
+        message: Log message
+        payload: Anything JSON-serializable, or SDK models
+        level: Level the payload is logged at
+        fields: Extra structured fields
+
+    Returns:
+        Whether the payload was logged
+    """
+    if not logger.isEnabledFor(level) or random.random() >= _payload_sample_rate:
+        return False
+    logger.log(level, message, extra={"payload": payload, **fields})
+    return True
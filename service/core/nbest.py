@@ -0,0 +1,226 @@
+"""
+N-best generation: several completions at once, merged and ranked.
+
+Skills such as copywriting and paid-ads are valued for their alternatives,
+but one completion only lists a handful. With ``n_best`` the request runs
+as N concurrent completions, each steered toward a different creative
+angle; their alternatives are pooled, near-duplicates dropped, and the
+rest ranked by one batched judge call. Wall-clock time stays close to a
+single completion.
+
+The Messages API in the pinned SDK takes no temperature or seed, so
+diversity comes from the angle added to each completion's task.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from typing import TYPE_CHECKING, Optional
+
+from service.api.schemas import WorkRequest, WorkResult
+from service.core import structured
+
+if TYPE_CHECKING:
+    from service.core.executor import SkillExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JUDGE_MODEL = "claude-haiku-4-5-20251001"
+
+# Angles for completions after the first, which runs the task as given
+# and supplies the result's output
+ANGLES = (
+    "the concrete benefit and outcome",
+    "the pain point or cost of the status quo",
+    "curiosity and a specific, surprising detail",
+    "social proof and credibility",
+    "plain, direct language with no cleverness",
+    "urgency and the cost of waiting",
+    "a contrarian or unexpected framing",
+)
+
+# Word-set overlap above which two alternatives count as the same option
+DUPLICATE_SIMILARITY = 0.8
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+JUDGE_SYSTEM = "You are a senior copy chief ranking marketing alternatives."
+RANKING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "ranking": {
+            "type": "array",
+            "items": {"type": "integer"},
+            "description": "Option numbers, best first",
+        },
+    },
+    "required": ["ranking"],
+}
+
+
+def variants(request: WorkRequest) -> list[WorkRequest]:
+    """The request as given, then one copy per angle, ``n_best`` in all."""
+    single = request.model_copy(update={"n_best": 1})
+    return [single] + [
+        single.model_copy(update={
+            "task": f"{request.task}\n\nFor this draft, lean toward options built on {angle}.",
+        })
+        for angle in ANGLES[:request.n_best - 1]
+    ]
+
+
+def _words(text: str) -> frozenset[str]:
+    return frozenset(_WORD.findall(text.lower()))
+
+
+def dedupe(candidates: list[list[str]], threshold: float = DUPLICATE_SIMILARITY) -> list[tuple[str, int]]:
+    """
+    Merge alternatives from several completions, dropping near-duplicates.
+
+    Args:
+        candidates: Each completion's alternatives, in its own order
+        threshold: Word-set Jaccard similarity at or above which two
+            options are the same
+
+    Returns:
+        Unique options with the number of completions that proposed them,
+        most-proposed first, then in order of first appearance
+    """
+    unique: list[tuple[str, frozenset[str]]] = []
+    votes: list[set[int]] = []
+    for completion, options in enumerate(candidates):
+        for option in options:
+            words = _words(option)
+            for i, (_, seen) in enumerate(unique):
+                union = words | seen
+                if union and len(words & seen) / len(union) >= threshold:
+                    votes[i].add(completion)
+                    break
+            else:
+                unique.append((option, words))
+                votes.append({completion})
+    order = sorted(range(len(unique)), key=lambda i: (-len(votes[i]), i))
+    return [(unique[i][0], len(votes[i])) for i in order]
+
+
+def _order(ranking: list[int], count: int) -> Optional[list[int]]:
+    """Zero-based option order from the judge's ranking, or None if unusable."""
+    order = []
+    for number in ranking:
+        if isinstance(number, int) and 1 <= number <= count and number - 1 not in order:
+            order.append(number - 1)
+    if not order:
+        return None
+    # Options the judge left out keep their frequency order at the end
+    return order + [i for i in range(count) if i not in order]
+
+
+class NBestRunner:
+    """
+    Runs n-best requests.
+
+    Args:
+        executor: The executor that runs each completion
+        judge_model: Model for the batched ranking call
+        max_alternatives: Ranked alternatives returned at most
+    """
+
+    def __init__(
+        self,
+        executor: "SkillExecutor",
+        judge_model: str = DEFAULT_JUDGE_MODEL,
+        max_alternatives: int = 30,
+    ):
+        self.executor = executor
+        self.judge_model = judge_model
+        self.max_alternatives = max_alternatives
+
+    async def rank(self, request: WorkRequest, options: list[str]) -> tuple[list[str], Optional[dict]]:
+        """
+        Rank options best first with one judge call.
+
+        Returns:
+            The ranked options and the judge message's usage, or the options
+            unchanged and None if the judge failed or there's nothing to rank
+        """
+        if len(options) < 2:
+            return options, None
+        numbered = "\n".join(f"{i}. {option}" for i, option in enumerate(options, 1))
+        params = {
+            "model": self.judge_model,
+            "max_tokens": 512,
+            "system": JUDGE_SYSTEM,
+            "messages": [{
+                "role": "user",
+                "content": (
+                    f"Task: {request.task}\n\n"
+                    f"Options:\n{numbered}\n\n"
+                    "Rank the options from strongest to weakest for this task, judging clarity, "
+                    "specificity and persuasion."
+                ),
+            }],
+            **structured.tool_params(RANKING_SCHEMA),
+        }
+        try:
+            message, _, _ = await self.executor.router.create(params)
+            ranking = structured.extract(message, RANKING_SCHEMA)["ranking"]
+        except Exception as e:
+            logger.warning("n-best judge failed, keeping frequency order: %s", e)
+            return options, None
+        order = _order(ranking, len(options))
+        if order is None:
+            logger.warning("n-best judge returned no usable ranking, keeping frequency order")
+            return options, None
+        return [options[i] for i in order], {
+            "input_tokens": message.usage.input_tokens,
+            "output_tokens": message.usage.output_tokens,
+        }
+
+    async def run(self, request: WorkRequest) -> WorkResult:
+        """
+        Execute a request as ``n_best`` concurrent completions.
+
+        The result is the completion of the task as given, with its
+        alternatives replaced by the merged, deduplicated and ranked set
+        from all completions. Its metadata gains an ``n_best`` entry and
+        token counts cover every call, including the judge.
+        """
+        n = request.n_best
+        outcomes = await asyncio.gather(
+            *(self.executor.execute_async(variant) for variant in variants(request)),
+            return_exceptions=True,
+        )
+        completions = [outcome for outcome in outcomes if isinstance(outcome, WorkResult)]
+        if not completions:
+            raise outcomes[0]
+
+        candidates = [completion.alternatives or [] for completion in completions]
+        options = [option for option, _ in dedupe(candidates)]
+        ranked, judge_usage = await self.rank(request, options)
+
+        result = completions[0]
+        result.alternatives = ranked[:self.max_alternatives] or None
+        for completion in completions[1:]:
+            result.metadata["input_tokens"] += completion.metadata["input_tokens"]
+            result.metadata["output_tokens"] += completion.metadata["output_tokens"]
+        if judge_usage:
+            result.metadata["input_tokens"] += judge_usage["input_tokens"]
+            result.metadata["output_tokens"] += judge_usage["output_tokens"]
+        result.metadata["n_best"] = {
+            "completions": len(completions),
+            "failed": n - len(completions),
+            "candidates": sum(len(options) for options in candidates),
+            "unique": len(options),
+            "ranked_by": "judge" if judge_usage else "frequency",
+        }
+        return result
+
+
+def n_best_from_env(executor: "SkillExecutor") -> NBestRunner:
+    """Build an NBestRunner from NBEST_JUDGE_MODEL and NBEST_MAX_ALTERNATIVES."""
+    return NBestRunner(
+        executor,
+        judge_model=os.getenv("NBEST_JUDGE_MODEL", DEFAULT_JUDGE_MODEL),
+        max_alternatives=int(os.getenv("NBEST_MAX_ALTERNATIVES", "30")),
+    )
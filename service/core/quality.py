@@ -6,19 +6,36 @@ for generated content (text and assets). It is used by the test framework
 and can be integrated into the main service pipeline.
 """
 
-import json
-import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Literal, Optional
+from pydantic import BaseModel, Field
 from service.core.executor import get_executor
 from service.api.schemas import SkillName, WorkRequest
 
+
+class AssetEvaluation(BaseModel):
+    """Creative director's verdict on a generated asset."""
+    score: int = Field(ge=0, le=100)
+    status: Literal["approved", "rejected", "needs_revision"]
+    critique: str = Field(description="Concise, actionable feedback")
+    issues: list[str] = Field(default_factory=list, description="Specific flaws")
+    refined_prompt: Optional[str] = Field(default=None, description="An improved prompt if rejected")
+
+
+class CopyEvaluation(BaseModel):
+    """Copy chief's verdict on marketing copy."""
+    score: int = Field(ge=0, le=100)
+    status: Literal["approved", "rejected"]
+    critique: str
+    suggestions: list[str] = Field(default_factory=list, description="Improvements to make")
+
+
 class QualityGuard:
     """
     Evaluates content against specific brand and quality standards.
     """
     
-    def __init__(self):
-        self.executor = get_executor()
+    def __init__(self, executor=None):
+        self.executor = executor or get_executor()
 
     async def evaluate_asset(self, asset_type: str, asset_url: str, prompt: str, criteria: list[str] = None) -> Dict[str, Any]:
         """
@@ -43,40 +60,29 @@ class QualityGuard:
         
         CRITERIA TO CHECK:
         {chr(10).join([f"{i+1}. {c}" for i, c in enumerate(criteria)])} 
-        
-        OUTPUT FORMAT (JSON ONLY):
-        {{
-            "score": <0-100 integer>,
-            "status": "approved" | "rejected" | "needs_revision",
-            "critique": "<concise actionable feedback>",
-            "issues": ["<list>", "<of>", "<specific>", "<flaws>"],
-            "refined_prompt": "<an improved version of the prompt if rejected>"
-        }}
         """
 
         request = WorkRequest(
             skill=SkillName.MARKETING_PSYCHOLOGY,
             model="claude-sonnet-4-5-20250929", # Use strongest model for eval
-            task=eval_task
+            task=eval_task,
+            response_schema=AssetEvaluation,
         )
 
         try:
-            result = await asyncio.to_thread(self.executor.execute, request)
-            text = result.output
-            
-            # Robust JSON extraction
-            start = text.find("{")
-            end = text.rfind("}") + 1
-            if start != -1 and end != -1:
-                return json.loads(text[start:end])
-            else:
-                return {"status": "error", "critique": "Failed to parse evaluation JSON", "score": 0}
+            result = await self.executor.execute_async(request)
+            return result.structured
         except Exception as e:
             return {"status": "error", "critique": f"Evaluation exception: {str(e)}", "score": 0}
 
-    async def evaluate_copy(self, text_content: str, context: str = "") -> Dict[str, Any]:
+    async def evaluate_copy(self, text_content: str, context: str = "", model: Optional[str] = None) -> Dict[str, Any]:
         """
         Evaluate text copy against copywriting best practices.
+
+        Args:
+            text_content: The copy to review
+            context: What the copy was written for
+            model: Judge model; defaults to the strongest model
         """
         eval_task = f"""
         ACT AS: A Senior Copy Chief.
@@ -94,31 +100,18 @@ class QualityGuard:
         1. Clarity & Concision (No fluff)
         2. Persuasion (PAS or AIDA framework used?)
         3. Tone (Sophisticated, confident, human)
-        
-        OUTPUT FORMAT (JSON ONLY):
-        {{
-            "score": <0-100 integer>,
-            "status": "approved" | "rejected",
-            "critique": "<feedback>",
-            "suggestions": ["<list of improvements>"]
-        }}
         """
         
         request = WorkRequest(
             skill=SkillName.COPY_EDITING,
-            model="claude-sonnet-4-5-20250929",
-            task=eval_task
+            model=model or "claude-sonnet-4-5-20250929",
+            task=eval_task,
+            response_schema=CopyEvaluation,
         )
         
         try:
-            result = await asyncio.to_thread(self.executor.execute, request)
-            # JSON extraction logic (same as above)
-            text = result.output
-            start = text.find("{")
-            end = text.rfind("}") + 1
-            if start != -1 and end != -1:
-                return json.loads(text[start:end])
-            return {"status": "error", "critique": "JSON parse error", "score": 0}
+            result = await self.executor.execute_async(request)
+            return result.structured
         except Exception as e:
              return {"status": "error", "critique": f"Error: {e}", "score": 0}
 
@@ -1,56 +1,502 @@
-import os
+"""
+Task queues for /work/async jobs.
+
+The API publishes jobs and the worker consumes them through one interface,
+with three backends chosen by TASK_QUEUE_BACKEND:
+
+- ``pubsub``: Google Pub/Sub, for deployments with separate worker services.
+- ``memory``: an asyncio queue inside the API process, which then runs the
+  jobs itself; nothing else to start, nothing survives a restart.
+- ``sqlite``: a queue file shared by the API and any number of worker
+  processes on one host, with leases so a crashed worker's jobs come back.
+
+Publishing never waits for the broker: ``publish`` hands the message to a
+batcher and returns a future, so a burst of requests goes out as a few
+batched writes instead of one round trip per request.
+"""
+
+import asyncio
+import concurrent.futures
 import json
-from typing import Optional
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
 from google.cloud import pubsub_v1
 from google.oauth2 import service_account
+
 from service.api.schemas import WorkRequest
 
+logger = logging.getLogger(__name__)
+
+# What a subscriber's callback is handed; see JobRunner for the message shape
+MessageCallback = Callable[[object], object]
+
+
+def encode_task(request: WorkRequest, job_id: str) -> bytes:
+    """The message body the worker expects."""
+    return json.dumps({"job_id": job_id, "request": request.model_dump()}).encode("utf-8")
+
+
 class TaskQueue:
-    def __init__(self, project_id: Optional[str] = None):
+    """
+    Interface for task queue backends.
+
+    Messages handed to subscribers have ``data``, ``message_id``, ``ack()``,
+    ``nack()`` and ``modify_ack_deadline(seconds)``, as Pub/Sub messages do.
+    Memory and SQLite messages also have ``release()``, which hands the
+    message back without counting the delivery as a failed attempt.
+    """
+
+    # Whether jobs can only be consumed by the process that published them
+    in_process = False
+
+    def publish(self, request: WorkRequest, job_id: str) -> concurrent.futures.Future:
+        """
+        Queue a work request without waiting for it to be stored.
+
+        Returns:
+            A future for the message ID
+        """
+        raise NotImplementedError
+
+    def subscribe(self, callback: MessageCallback, max_messages: int = 8, max_lease: float = 3600):
+        """
+        Deliver messages to ``callback`` until the returned handle is cancelled.
+
+        A callback that returns None has refused the message, as a draining
+        JobRunner does; backends that poll then stop claiming messages.
+
+        Args:
+            callback: Called with each message; must not block
+            max_messages: Messages handed out but not yet acked or nacked
+            max_lease: Longest a message is kept leased, in seconds
+
+        Returns:
+            A future-like handle with ``cancel()``, ``result()`` and
+            ``add_done_callback()``
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush pending publishes and release connections."""
+
+
+class PubSubTaskQueue(TaskQueue):
+    """
+    Google Pub/Sub topic and subscription.
+
+    Args:
+        project_id: Defaults to GCP_PROJECT_ID, then the credentials' project
+        batch_max_messages: Messages per publish batch
+        batch_max_latency: Seconds a batch waits to fill before it is sent
+        batch_max_bytes: Bytes per publish batch
+    """
+
+    def __init__(
+        self,
+        project_id: Optional[str] = None,
+        batch_max_messages: int = 100,
+        batch_max_latency: float = 0.01,
+        batch_max_bytes: int = 1_000_000,
+    ):
         self.project_id = project_id or os.getenv("GCP_PROJECT_ID")
         self.topic_name = "agency-work-queue"
-        
+        self.subscription_name = "agency-worker-sub"
+        self.credentials = None
+        batch_settings = pubsub_v1.types.BatchSettings(
+            max_bytes=batch_max_bytes,
+            max_latency=batch_max_latency,
+            max_messages=batch_max_messages,
+        )
+
         # Load credentials
         if os.path.exists("service.json"):
             self.credentials = service_account.Credentials.from_service_account_file("service.json")
-            self.publisher = pubsub_v1.PublisherClient(credentials=self.credentials)
+            self.publisher = pubsub_v1.PublisherClient(batch_settings, credentials=self.credentials)
             if not self.project_id:
                 self.project_id = self.credentials.project_id
         else:
-            self.publisher = pubsub_v1.PublisherClient()
+            self.publisher = pubsub_v1.PublisherClient(batch_settings)
             if not self.project_id:
                 # Attempt to get project ID from default credentials or env
                 self.project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
 
         if not self.project_id:
-             # Fallback for local dev without strict setup
-             print("Warning: No Project ID found for TaskQueue. Async tasks may fail.")
+            # Fallback for local dev without strict setup
+            logger.warning("No Project ID found for TaskQueue. Async tasks may fail.")
 
         self.topic_path = self.publisher.topic_path(self.project_id, self.topic_name) if self.project_id else None
+        self.subscriber: Optional[pubsub_v1.SubscriberClient] = None
 
-    def publish_task(self, request: WorkRequest, job_id: str) -> str:
-        """
-        Publish a work request to the queue.
-        Returns the message ID.
-        """
+    def publish(self, request: WorkRequest, job_id: str) -> concurrent.futures.Future:
         if not self.topic_path:
             raise ValueError("TaskQueue not initialized with Project ID")
+        return self.publisher.publish(self.topic_path, encode_task(request, job_id))
+
+    def subscribe(self, callback: MessageCallback, max_messages: int = 8, max_lease: float = 3600):
+        if not self.project_id:
+            raise ValueError("TaskQueue not initialized with Project ID")
+        if self.subscriber is None:
+            if self.credentials is not None:
+                self.subscriber = pubsub_v1.SubscriberClient(credentials=self.credentials)
+            else:
+                self.subscriber = pubsub_v1.SubscriberClient()
+        subscription_path = self.subscriber.subscription_path(self.project_id, self.subscription_name)
+        # Lease no more messages than can run; the client also keeps their
+        # leases alive for up to max_lease_duration
+        flow_control = pubsub_v1.types.FlowControl(max_messages=max_messages, max_lease_duration=int(max_lease))
+        logger.info("Listening for messages on %s", subscription_path)
+        return self.subscriber.subscribe(subscription_path, callback=callback, flow_control=flow_control)
+
+    def close(self) -> None:
+        self.publisher.stop()
+        if self.subscriber is not None:
+            self.subscriber.close()
+
+
+class _MemoryMessage:
+    def __init__(self, owner: "MemoryTaskQueue", data: bytes, message_id: str, attempt: int):
+        self.owner = owner
+        self.data = data
+        self.message_id = message_id
+        self.attempt = attempt
+        self._settled = False
+
+    def _settle(self, outcome: str) -> None:
+        if not self._settled:
+            self._settled = True
+            self.owner._settle(self, outcome)
+
+    def ack(self) -> None:
+        self._settle("ack")
+
+    def nack(self) -> None:
+        self._settle("nack")
+
+    def release(self) -> None:
+        self._settle("release")
+
+    def modify_ack_deadline(self, seconds: float) -> None:
+        # Nothing else can take the message, so there is no lease to extend
+        pass
+
+
+class MemoryTaskQueue(TaskQueue):
+    """
+    An asyncio queue consumed by the process that publishes to it.
+
+    Publish and subscribe on the same event loop; messages may be acked or
+    nacked from any thread.
+
+    Args:
+        max_attempts: Deliveries before a repeatedly nacked message is dropped
+    """
+
+    in_process = True
+
+    def __init__(self, max_attempts: int = 5):
+        self.max_attempts = max_attempts
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.dead = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def publish(self, request: WorkRequest, job_id: str) -> concurrent.futures.Future:
+        message_id = uuid.uuid4().hex
+        self._queue.put_nowait((encode_task(request, job_id), message_id, 1))
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.set_result(message_id)
+        return future
+
+    def subscribe(self, callback: MessageCallback, max_messages: int = 8, max_lease: float = 3600):
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(max_messages)
+        return asyncio.create_task(self._consume(callback))
+
+    async def _consume(self, callback: MessageCallback) -> None:
+        while True:
+            await self._slots.acquire()
+            data, message_id, attempt = await self._queue.get()
+            message = _MemoryMessage(self, data, message_id, attempt)
+            try:
+                accepted = callback(message)
+            except Exception:
+                logger.exception("Task queue callback failed")
+                message.nack()
+                continue
+            if accepted is None:
+                # The consumer is draining; leave the rest queued
+                return
+
+    def _settle(self, message: _MemoryMessage, outcome: str) -> None:
+        self._loop.call_soon_threadsafe(self._finish, message, outcome)
+
+    def _finish(self, message: _MemoryMessage, outcome: str) -> None:
+        self._slots.release()
+        if outcome == "ack":
+            return
+        if outcome == "release":
+            self._queue.put_nowait((message.data, message.message_id, message.attempt))
+            return
+        if message.attempt >= self.max_attempts:
+            self.dead += 1
+            logger.warning("Dropping message %s after %d attempts", message.message_id, message.attempt)
+            return
+        self._queue.put_nowait((message.data, message.message_id, message.attempt + 1))
+
+
+class _SQLiteMessage:
+    def __init__(self, owner: "SQLiteTaskQueue", row_id: int, data: bytes, attempts: int, slots: threading.Semaphore):
+        self.owner = owner
+        self.row_id = row_id
+        self.data = data
+        self.message_id = str(row_id)
+        self.attempts = attempts
+        self._slots = slots
+        self._settled = False
+
+    def _settle(self, outcome: str) -> None:
+        if self._settled:
+            return
+        self._settled = True
+        try:
+            self.owner._finish(self, outcome)
+        finally:
+            self._slots.release()
+
+    def ack(self) -> None:
+        self._settle("ack")
+
+    def nack(self) -> None:
+        self._settle("nack")
+
+    def release(self) -> None:
+        self._settle("release")
+
+    def modify_ack_deadline(self, seconds: float) -> None:
+        self.owner._extend(self, seconds)
+
+
+class SQLiteTaskQueue(TaskQueue):
+    """
+    A queue file shared by every process on a host.
+
+    Consumers claim a message by leasing it for ``ack_deadline`` seconds;
+    a message whose lease runs out without an ack, say because its worker
+    died, is delivered again. Uses WAL mode so polling consumers never
+    block the publisher.
+
+    Args:
+        path: The queue file
+        batch_max_messages: Messages written per transaction
+        batch_max_latency: Seconds a batch waits to fill before it is written
+        poll_interval: Seconds between checks of an empty queue
+        ack_deadline: Seconds a claimed message stays leased
+        max_attempts: Deliveries before a repeatedly nacked message is set aside
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_max_messages: int = 100,
+        batch_max_latency: float = 0.01,
+        poll_interval: float = 0.2,
+        ack_deadline: float = 60,
+        max_attempts: int = 5,
+    ):
+        self.path = path
+        self.batch_max_messages = max(1, batch_max_messages)
+        self.batch_max_latency = batch_max_latency
+        self.poll_interval = poll_interval
+        self.ack_deadline = ack_deadline
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, data BLOB NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'ready', attempts INTEGER NOT NULL DEFAULT 0, "
+            "lease_until REAL NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, lease_until)")
+        self._pending: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def counts(self) -> dict[str, int]:
+        """Messages by status; leased messages count as ``ready``."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def publish(self, request: WorkRequest, job_id: str) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_batches, name="task-queue-writer", daemon=True)
+                    self._writer.start()
+        self._pending.put((encode_task(request, job_id), future))
+        return future
+
+    def _write_batches(self) -> None:
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_max_latency
+            while len(batch) < self.batch_max_messages:
+                try:
+                    item = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._insert(batch)
+                    return
+                batch.append(item)
+            self._insert(batch)
+
+    def _insert(self, batch: list[tuple[bytes, concurrent.futures.Future]]) -> None:
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    ids = [
+                        self._conn.execute("INSERT INTO tasks (data) VALUES (?) RETURNING id", (data,)).fetchone()[0]
+                        for data, _ in batch
+                    ]
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except Exception as e:
+            logger.exception("Failed to write %d queued tasks", len(batch))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), row_id in zip(batch, ids):
+            future.set_result(str(row_id))
+
+    def claim(self) -> Optional[tuple[int, bytes, int]]:
+        """Lease the oldest available message, returning its id, body and attempt count."""
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE tasks SET lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM tasks WHERE status = 'ready' AND lease_until <= ? ORDER BY id LIMIT 1) "
+                "RETURNING id, data, attempts",
+                (now + self.ack_deadline, now),
+            ).fetchone()
+
+    def _finish(self, message: _SQLiteMessage, outcome: str) -> None:
+        with self._lock:
+            if outcome == "ack":
+                self._conn.execute("DELETE FROM tasks WHERE id = ?", (message.row_id,))
+            elif outcome == "release":
+                # Handed back unprocessed, so this delivery doesn't count
+                self._conn.execute(
+                    "UPDATE tasks SET lease_until = 0, attempts = attempts - 1 WHERE id = ?", (message.row_id,),
+                )
+            elif message.attempts >= self.max_attempts:
+                logger.warning("Setting aside message %s after %d attempts", message.message_id, message.attempts)
+                self._conn.execute("UPDATE tasks SET status = 'dead' WHERE id = ?", (message.row_id,))
+            else:
+                self._conn.execute("UPDATE tasks SET lease_until = 0 WHERE id = ?", (message.row_id,))
+
+    def _extend(self, message: _SQLiteMessage, seconds: float) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE tasks SET lease_until = ? WHERE id = ?", (time.time() + seconds, message.row_id))
+
+    def subscribe(self, callback: MessageCallback, max_messages: int = 8, max_lease: float = 3600):
+        handle: concurrent.futures.Future = concurrent.futures.Future()
+        thread = threading.Thread(
+            target=self._pull, args=(callback, max_messages, handle), name="task-queue-pull", daemon=True,
+        )
+        thread.start()
+        return handle
+
+    def _pull(self, callback: MessageCallback, max_messages: int, handle: concurrent.futures.Future) -> None:
+        slots = threading.Semaphore(max_messages)
+        draining = False
+        try:
+            while not handle.done():
+                if draining:
+                    time.sleep(self.poll_interval)
+                    continue
+                if not slots.acquire(timeout=self.poll_interval):
+                    continue
+                row = self.claim()
+                if row is None:
+                    slots.release()
+                    time.sleep(self.poll_interval)
+                    continue
+                message = _SQLiteMessage(self, *row, slots)
+                try:
+                    # Stop claiming once the consumer refuses messages
+                    draining = callback(message) is None
+                except Exception:
+                    logger.exception("Task queue callback failed")
+                    message.nack()
+        except Exception as e:
+            if not handle.done():
+                handle.set_exception(e)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._pending.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+        with self._lock:
+            self._conn.close()
 
-        # Create payload
-        payload = {
-            "job_id": job_id,
-            "request": request.model_dump()
-        }
-        data = json.dumps(payload).encode("utf-8")
-        
-        future = self.publisher.publish(self.topic_path, data)
-        return future.result()
 
 # Singleton
 _queue: Optional[TaskQueue] = None
 
+
 def get_queue() -> TaskQueue:
+    """
+    Get the configured task queue.
+
+    Configured with TASK_QUEUE_BACKEND (pubsub, memory or sqlite),
+    TASK_QUEUE_PATH, TASK_QUEUE_BATCH_MAX_MESSAGES, TASK_QUEUE_BATCH_MAX_LATENCY,
+    TASK_QUEUE_BATCH_MAX_BYTES, TASK_QUEUE_POLL_INTERVAL, TASK_QUEUE_ACK_DEADLINE
+    and TASK_QUEUE_MAX_ATTEMPTS.
+    """
     global _queue
     if _queue is None:
-        _queue = TaskQueue()
+        backend = os.getenv("TASK_QUEUE_BACKEND", "pubsub").lower()
+        batch_max_messages = int(os.getenv("TASK_QUEUE_BATCH_MAX_MESSAGES", "100"))
+        batch_max_latency = float(os.getenv("TASK_QUEUE_BATCH_MAX_LATENCY", "0.01"))
+        max_attempts = int(os.getenv("TASK_QUEUE_MAX_ATTEMPTS", "5"))
+        if backend == "memory":
+            _queue = MemoryTaskQueue(max_attempts=max_attempts)
+        elif backend == "sqlite":
+            _queue = SQLiteTaskQueue(
+                os.getenv("TASK_QUEUE_PATH", "/tmp/agency-task-queue.sqlite3"),
+                batch_max_messages=batch_max_messages,
+                batch_max_latency=batch_max_latency,
+                poll_interval=float(os.getenv("TASK_QUEUE_POLL_INTERVAL", "0.2")),
+                ack_deadline=float(os.getenv("TASK_QUEUE_ACK_DEADLINE", "60")),
+                max_attempts=max_attempts,
+            )
+        else:
+            _queue = PubSubTaskQueue(
+                batch_max_messages=batch_max_messages,
+                batch_max_latency=batch_max_latency,
+                batch_max_bytes=int(os.getenv("TASK_QUEUE_BATCH_MAX_BYTES", "1000000")),
+            )
     return _queue
@@ -0,0 +1,320 @@
+"""
+Latency-aware routing over the LLM providers.
+
+Every call is timed per provider and model. The router uses those rolling
+stats to pick the fastest healthy route, to hedge slow calls with a
+duplicate on a second route once the first has run past its observed p95,
+and to stop sending traffic to a route whose breaker has tripped.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import anthropic
+
+POLICIES = ("primary", "fastest", "hedge")
+
+
+class CircuitOpenError(Exception):
+    """Raised when every route for a model has an open circuit breaker."""
+
+
+@dataclass(frozen=True)
+class Route:
+    """A provider and the model name to request from it."""
+    provider: str
+    model: str
+
+    def __str__(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+class RouteStats:
+    """Rolling latency and error samples for one route."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[tuple[float, bool]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q-quantile of successful call latencies in seconds, if any."""
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failures`` consecutive errors; after ``cooldown`` seconds
+    lets one trial call through (half-open) and closes again if it succeeds.
+    """
+
+    def __init__(self, failures: int = 5, cooldown: float = 30.0):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go through now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give back a half-open trial that ended without a verdict."""
+        self._trial = False
+
+    def record(self, ok: bool) -> None:
+        self._trial = False
+        if ok:
+            self._consecutive = 0
+            self._opened_at = None
+            return
+        self._consecutive += 1
+        if self._consecutive >= self.failures or self._opened_at is not None:
+            self._opened_at = time.monotonic()
+
+
+# Errors that say nothing about the route's health
+_CLIENT_ERRORS = (anthropic.BadRequestError, anthropic.AuthenticationError, anthropic.PermissionDeniedError, anthropic.NotFoundError)
+
+
+class ProviderRouter:
+    """
+    Routes Messages API calls across providers.
+
+    Args:
+        client_for: Returns the async client for a provider name, or None
+            if that provider isn't configured
+        alternates: Equivalent routes per model, tried or hedged to after
+            the model's own provider
+        policy: "primary" (always the model's own provider), "fastest"
+            (lowest p50 among healthy routes) or "hedge" (fastest, plus a
+            duplicate on the next healthy route after the first's p95)
+        hedge_delay: Seconds to wait before hedging while a route has too
+            few samples for a p95
+        min_samples: Samples needed before a route's latency is trusted
+        breaker_failures: Consecutive errors that open a route's breaker
+        breaker_cooldown: Seconds a breaker stays open
+    """
+
+    def __init__(
+        self,
+        client_for: Callable[[str], Any],
+        alternates: Optional[dict[str, list[str]]] = None,
+        policy: str = "primary",
+        hedge_delay: float = 10.0,
+        min_samples: int = 20,
+        breaker_failures: int = 5,
+        breaker_cooldown: float = 30.0,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}")
+        self.client_for = client_for
+        self.alternates = {
+            model: [Route(*route.split(":", 1)) for route in routes]
+            for model, routes in (alternates or {}).items()
+        }
+        self.policy = policy
+        self.hedge_delay = hedge_delay
+        self.min_samples = min_samples
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self._stats: dict[Route, RouteStats] = {}
+        self._breakers: dict[Route, CircuitBreaker] = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @staticmethod
+    def provider_for(model: str) -> str:
+        return "minimax" if model.lower().startswith("minimax") else "anthropic"
+
+    def _stats_for(self, route: Route) -> RouteStats:
+        if route not in self._stats:
+            self._stats[route] = RouteStats()
+        return self._stats[route]
+
+    def _breaker_for(self, route: Route) -> CircuitBreaker:
+        if route not in self._breakers:
+            self._breakers[route] = CircuitBreaker(self.breaker_failures, self.breaker_cooldown)
+        return self._breakers[route]
+
+    def candidates(self, model: str) -> list[Route]:
+        """
+        Routes that may serve a model, best first under the policy.
+
+        Routes without a configured client are skipped, and routes whose
+        breaker is open go last so they are only used when nothing else is left.
+        """
+        routes = [Route(self.provider_for(model), model)] + self.alternates.get(model, [])
+        routes = [route for route in routes if self.client_for(route.provider) is not None]
+        if not routes:
+            raise ValueError(f"No configured provider for model {model}")
+
+        if self.policy != "primary":
+            def speed(route: Route) -> float:
+                stats = self._stats_for(route)
+                p50 = stats.quantile(0.5) if len(stats) >= self.min_samples else None
+                # Untried routes sort after measured ones but before slow ones
+                return p50 if p50 is not None else self.hedge_delay
+            routes.sort(key=speed)
+
+        healthy = [route for route in routes if self._breaker_for(route).state != "open"]
+        return healthy + [route for route in routes if route not in healthy]
+
+    def hedge_after(self, route: Route) -> float:
+        """Seconds to wait on a route before sending the hedge."""
+        stats = self._stats_for(route)
+        if len(stats) >= self.min_samples:
+            p95 = stats.quantile(0.95)
+            if p95 is not None:
+                return p95
+        return self.hedge_delay
+
+    async def _call(self, route: Route, params: dict[str, Any]):
+        breaker = self._breaker_for(route)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {route}")
+        started = time.perf_counter()
+        try:
+            client = self.client_for(route.provider)
+            message = await client.messages.create(**{**params, "model": route.model})
+        except asyncio.CancelledError:
+            # A cancelled hedge loser says nothing about the route
+            breaker.release()
+            raise
+        except _CLIENT_ERRORS:
+            breaker.record(True)
+            raise
+        except Exception:
+            self._stats_for(route).record(time.perf_counter() - started, False)
+            breaker.record(False)
+            raise
+        self._stats_for(route).record(time.perf_counter() - started, True)
+        breaker.record(True)
+        return message
+
+    async def create(self, params: dict[str, Any]) -> tuple[Any, Route, bool]:
+        """
+        Make a Messages API call through the routing policy.
+
+        Args:
+            params: Keyword arguments for ``messages.create``; ``model`` is
+                replaced with each route's model
+
+        Returns:
+            The message, the route that produced it and whether it came
+            from a hedge
+        """
+        routes = self.candidates(params["model"])
+        first = routes[0]
+
+        if self.policy != "hedge" or len(routes) < 2:
+            try:
+                return await self._call(first, params), first, False
+            except _CLIENT_ERRORS:
+                raise
+            except Exception:
+                if len(routes) < 2 or self.policy == "primary":
+                    raise
+                # Fail over once to the next route
+                return await self._call(routes[1], params), routes[1], False
+
+        primary = asyncio.ensure_future(self._call(first, params))
+        pending = {primary}
+        # Every call still running is cancelled on the way out, including
+        # when the caller is cancelled while waiting on the primary
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after(first))
+            if done and not primary.exception():
+                return primary.result(), first, False
+
+            # Slow or failed: race a duplicate on the next route
+            self.hedges += 1
+            second = routes[1]
+            hedge = asyncio.ensure_future(self._call(second, params))
+            pending.add(hedge)
+            error: Optional[BaseException] = primary.exception() if done else None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result(), (second if task is hedge else first), task is hedge
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        """Live per-route latency, error rate and breaker state."""
+        routes = {}
+        for route, stats in list(self._stats.items()):
+            p50, p95 = stats.quantile(0.5), stats.quantile(0.95)
+            routes[str(route)] = {
+                "samples": len(stats),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "error_rate": round(stats.error_rate, 3),
+                "breaker": self._breaker_for(route).state,
+            }
+        return {
+            "policy": self.policy,
+            "routes": routes,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+def router_from_env(client_for: Callable[[str], Any]) -> ProviderRouter:
+    """
+    Build a ProviderRouter from ROUTING_POLICY, ROUTING_ALTERNATES (JSON
+    object of model to ["provider:model", ...]), HEDGE_DELAY,
+    BREAKER_FAILURES and BREAKER_COOLDOWN.
+    """
+    return ProviderRouter(
+        client_for,
+        alternates=json.loads(os.getenv("ROUTING_ALTERNATES", "{}")),
+        policy=os.getenv("ROUTING_POLICY", "primary").lower(),
+        hedge_delay=float(os.getenv("HEDGE_DELAY", "10")),
+        breaker_failures=int(os.getenv("BREAKER_FAILURES", "5")),
+        breaker_cooldown=float(os.getenv("BREAKER_COOLDOWN", "30")),
+    )
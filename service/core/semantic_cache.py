@@ -0,0 +1,376 @@
+"""
+Semantic near-duplicate tier for the result cache.
+
+The exact cache misses the same brief with a reworded task ("write a
+headline for X" / "give me headlines for X"). This tier embeds each
+request's task and context as a hashed word, bigram and character-trigram
+vector and answers from the most similar earlier result once cosine
+similarity clears the skill's threshold.
+
+Only requests that agree on everything else (skill version, model,
+content, page text, image and generation options) are compared, and a
+match must also name the same numbers and proper nouns, so "three
+headlines" never answers "five headlines" and one product never answers
+for another. Requests opt in with ``semantic_cache``.
+
+Vectors are kept in NumPy matrices for vectorized top-k lookups when NumPy
+is installed, and as sparse dicts otherwise.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from service.api.schemas import WorkRequest, WorkResult
+from service.core.cache import _normalize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DIMENSIONS = 1024
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SALIENT = re.compile(r"\b(?:\d[\d.,%]*|[A-Z][a-zA-Z0-9]*[A-Z0-9][a-zA-Z0-9]*)\b|(?<=[a-z,;:] )[A-Z][a-z]+\b")
+_NUMBER_WORDS = frozenset(
+    "one two three four five six seven eight nine ten eleven twelve fifteen twenty fifty hundred".split()
+)
+# Phrasing that doesn't change what is asked for
+_STOP_WORDS = frozenset(
+    "a an the for of to me my our us i we you your please can could would will give write "
+    "create make produce draft some with and in on about this that it is are be".split()
+)
+
+Vector = dict[int, float]
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def embed(text: str) -> Vector:
+    """
+    Embed text as a sparse, L2-normalized hashed feature vector.
+
+    Features are content words, word bigrams and character trigrams of
+    each word, hashed with signs into DIMENSIONS buckets.
+    """
+    words = [_stem(word) for word in _WORD.findall(text.lower()) if word not in _STOP_WORDS]
+    vector: Vector = {}
+
+    def add(feature: str, weight: float) -> None:
+        digest = zlib.crc32(feature.encode("utf-8"))
+        index = digest % DIMENSIONS
+        vector[index] = vector.get(index, 0.0) + (weight if digest & 0x10000 else -weight)
+
+    for word in words:
+        add(f"w:{word}", 1.0)
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            add(f"c:{padded[i:i + 3]}", 0.3)
+    for first, second in zip(words, words[1:]):
+        add(f"b:{first} {second}", 0.7)
+
+    norm = sum(value * value for value in vector.values()) ** 0.5
+    return {index: value / norm for index, value in vector.items()} if norm else {}
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    """Cosine similarity of two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+def salient_tokens(text: str) -> frozenset[str]:
+    """Numbers and proper nouns, which a match must share exactly."""
+    tokens = {token.lower() for token in _SALIENT.findall(text)}
+    tokens.update(word for word in _WORD.findall(text.lower()) if word in _NUMBER_WORDS)
+    return frozenset(tokens)
+
+
+def request_text(request: WorkRequest) -> str:
+    """The parts of a request compared semantically: task and context."""
+    lines = [request.task.strip()]
+    for key, value in sorted((_normalize(request.context or {})).items()):
+        lines.append(f"{key}: {value if isinstance(value, str) else json.dumps(value, sort_keys=True)}")
+    return "\n".join(lines)
+
+
+def partition_key(request: WorkRequest, skill_hash: str, model: str) -> str:
+    """Hash of everything that must match exactly for a semantic hit."""
+    canonical = json.dumps(
+        {
+            "skill": request.skill.value,
+            "skill_hash": skill_hash,
+            "model": model,
+            "content": request.content,
+            "page_text": request.page_text,
+            "image": hashlib.sha256(request.image_data.encode("utf-8")).hexdigest() if request.image_data else None,
+            "cascade": request.cascade,
+            "n_best": request.n_best,
+            "response_schema": request.response_schema,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _Partition:
+    """Vectors of the cached requests in one partition, for top-k lookups."""
+
+    def __init__(self):
+        self.keys: list[str] = []
+        self._positions: dict[str, int] = {}
+        if np is not None:
+            self._matrix = np.zeros((16, DIMENSIONS), dtype=np.float32)
+        else:
+            self._vectors: list[Vector] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, vector: Vector) -> None:
+        if key in self._positions:
+            self.remove(key)
+        row = len(self.keys)
+        self.keys.append(key)
+        self._positions[key] = row
+        if np is None:
+            self._vectors.append(vector)
+            return
+        if row == len(self._matrix):
+            self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+        self._matrix[row] = 0.0
+        if vector:
+            self._matrix[row, list(vector)] = list(vector.values())
+
+    def remove(self, key: str) -> None:
+        """Drop a key by moving the last row into its place."""
+        row = self._positions.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            moved = self.keys[last]
+            self.keys[row] = moved
+            self._positions[moved] = row
+            if np is None:
+                self._vectors[row] = self._vectors[last]
+            else:
+                self._matrix[row] = self._matrix[last]
+        self.keys.pop()
+        if np is None:
+            self._vectors.pop()
+
+    def top_k(self, vector: Vector, k: int) -> list[tuple[float, str]]:
+        """The k most similar keys, most similar first."""
+        if not self.keys or not vector:
+            return []
+        if np is None:
+            scores = ((cosine(vector, other), key) for other, key in zip(self._vectors, self.keys))
+            return heapq.nlargest(k, scores)
+        rows = len(self.keys)
+        query = np.zeros(DIMENSIONS, dtype=np.float32)
+        query[list(vector)] = list(vector.values())
+        scores = self._matrix[:rows] @ query
+        if rows > k:
+            best = np.argpartition(scores, rows - k)[rows - k:]
+        else:
+            best = np.arange(rows)
+        best = best[np.argsort(scores[best])[::-1]]
+        return [(float(scores[i]), self.keys[i]) for i in best]
+
+    @property
+    def nbytes(self) -> int:
+        if np is not None:
+            return int(self._matrix.nbytes)
+        return sum(sys.getsizeof(vector) for vector in self._vectors)
+
+
+@dataclass
+class _Entry:
+    partition: str
+    text: str
+    salient: frozenset[str]
+    expires_at: float
+    result: WorkResult
+
+
+class SemanticCache:
+    """
+    Near-duplicate result lookups within a partition.
+
+    Args:
+        threshold: Default minimum cosine similarity for a hit
+        thresholds: Per-skill minimum similarities
+        max_entries: Results indexed at most; the least recently used go first
+        ttl: Seconds an indexed result stays valid
+        top_k: Nearest neighbours checked per lookup
+        audit_rate: Share of hits re-run fresh and compared, to measure
+            false hits
+        audit_agreement: Output similarity below which an audited hit
+            counts as false
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        thresholds: Optional[dict[str, float]] = None,
+        max_entries: int = 2048,
+        ttl: float = 86400,
+        top_k: int = 5,
+        audit_rate: float = 0.0,
+        audit_agreement: float = 0.5,
+    ):
+        self.threshold = threshold
+        self.thresholds = thresholds or {}
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.top_k = top_k
+        self.audit_rate = audit_rate
+        self.audit_agreement = audit_agreement
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._partitions: dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.audits = 0
+        self.false_hits = 0
+        self._recent_hits: deque[dict[str, Any]] = deque(maxlen=20)
+
+    def threshold_for(self, skill: str) -> float:
+        return self.thresholds.get(skill, self.threshold)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        partition = self._partitions[entry.partition]
+        partition.remove(key)
+        if not partition:
+            del self._partitions[entry.partition]
+
+    def lookup(self, request: WorkRequest, partition: str) -> Optional[WorkResult]:
+        """
+        The cached result of the most similar earlier request, if it clears
+        the skill's threshold and names the same numbers and proper nouns.
+        """
+        text = request_text(request)
+        vector = embed(text)
+        salient = salient_tokens(text)
+        threshold = self.threshold_for(request.skill.value)
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            index = self._partitions.get(partition)
+            if index is None:
+                return None
+            for score, key in index.top_k(vector, self.top_k):
+                if score < threshold:
+                    break
+                entry = self._entries[key]
+                if entry.expires_at < now:
+                    self._drop(key)
+                    continue
+                if entry.salient != salient:
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._recent_hits.append({
+                    "skill": request.skill.value,
+                    "task": request.task[:200],
+                    "matched": entry.text.split("\n", 1)[0][:200],
+                    "similarity": round(score, 3),
+                })
+                return entry.result
+        return None
+
+    def add(self, key: str, request: WorkRequest, partition: str, result: WorkResult) -> None:
+        """Index a fresh result under its exact cache key."""
+        text = request_text(request)
+        vector = embed(text)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(partition, text, salient_tokens(text), time.monotonic() + self.ttl, result)
+            self._partitions.setdefault(partition, _Partition()).add(key, vector)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def should_audit(self) -> bool:
+        """Whether to re-run this hit fresh and compare instead of serving it."""
+        return self.audit_rate > 0 and random.random() < self.audit_rate
+
+    def record_audit(self, cached: WorkResult, fresh: WorkResult) -> bool:
+        """
+        Compare an audited hit with the fresh result for the same request.
+
+        Returns:
+            Whether the hit was false: the outputs share too little wording
+            to be answers to the same brief
+        """
+        false_hit = cosine(embed(cached.output), embed(fresh.output)) < self.audit_agreement
+        with self._lock:
+            self.audits += 1
+            if false_hit:
+                self.false_hits += 1
+        return false_hit
+
+    def metrics(self) -> dict[str, Any]:
+        """Hit rate, audit results and index size."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "partitions": len(self._partitions),
+                "index_bytes": sum(partition.nbytes for partition in self._partitions.values()),
+                "vectorized": np is not None,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+                "audits": self.audits,
+                "false_hits": self.false_hits,
+                "false_hit_rate": round(self.false_hits / self.audits, 3) if self.audits else 0.0,
+                "recent_hits": list(self._recent_hits),
+            }
+
+
+# Singleton
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_initialized = False
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Get the semantic cache tier, or None if SEMANTIC_CACHE is false.
+
+    Configured with SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_THRESHOLDS (a
+    JSON object of skill name to similarity), SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_AUDIT_RATE and RESULT_CACHE_TTL.
+    """
+    global _semantic_cache, _semantic_cache_initialized
+    if not _semantic_cache_initialized:
+        if os.getenv("SEMANTIC_CACHE", "true").lower() == "true":
+            _semantic_cache = SemanticCache(
+                threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85")),
+                thresholds=json.loads(os.getenv("SEMANTIC_CACHE_THRESHOLDS", "{}")),
+                max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048")),
+                ttl=float(os.getenv("RESULT_CACHE_TTL", "86400")),
+                audit_rate=float(os.getenv("SEMANTIC_CACHE_AUDIT_RATE", "0")),
+            )
+        _semantic_cache_initialized = True
+    return _semantic_cache
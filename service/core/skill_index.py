@@ -0,0 +1,374 @@
+"""
+Skill corpus index for retrieval-based prompt assembly.
+
+Each skill directory is split into heading-level chunks: SKILL.md plus
+everything under ``rules/``, ``references/`` and ``templates/``. Chunks are
+ranked against the task with BM25 and packed into the system prompt under
+a token budget, so large skills contribute only their relevant parts.
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from service.core.tokens import CHARS_PER_TOKEN, estimate_text_tokens
+
+SUPPORT_DIRS = ("rules", "references", "templates")
+
+# Text formats worth indexing under the support directories
+CODE_LANGUAGES = {
+    ".py": "python",
+    ".ts": "typescript",
+    ".tsx": "tsx",
+    ".js": "javascript",
+    ".html": "html",
+    ".css": "css",
+    ".json": "json",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+}
+TEXT_SUFFIXES = {".md", ".txt"} | set(CODE_LANGUAGES)
+
+# Skills whose SKILL.md links to support files shipped in another directory
+CORPUS_ALIASES = {
+    "manim-best-practices": "manimce-best-practices",
+}
+
+# Split oversized sections so one long reference can't eat the whole budget
+MAX_CHUNK_TOKENS = 800
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+_HEADING = re.compile(r"(#{1,3}) +(.+?) *#*$")
+_TERM = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it of on or that the this to "
+    "use was what when with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased terms for ranking, without stopwords."""
+    return [t for t in _TERM.findall(text.lower()) if t not in _STOPWORDS]
+
+
+@dataclass
+class Chunk:
+    """One heading-level slice of a skill file."""
+    source: str
+    heading: str
+    text: str
+    language: Optional[str] = None
+    tokens: int = 0
+    terms: Counter = field(default_factory=Counter)
+    length: int = 0
+
+    def __post_init__(self):
+        self.tokens = estimate_text_tokens(self.text)
+        # Headings describe the chunk, so their terms count twice
+        self.terms = Counter(tokenize(self.text)) + Counter(tokenize(self.heading))
+        self.length = sum(self.terms.values())
+
+    def render(self, with_source: bool = True) -> str:
+        """The chunk as it appears in the references block."""
+        text = self.text if self.language is None else f"```{self.language}\n{self.text}\n```"
+        return f"**Source: {self.source}**\n\n{text}" if with_source else text
+
+
+def _split(lines: list[str], max_tokens: int) -> list[str]:
+    """Split lines into pieces under max_tokens at blank lines outside fences."""
+    pieces = []
+    current: list[str] = []
+    size = 0
+    fenced = False
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    for line in lines:
+        if line.startswith("```"):
+            fenced = not fenced
+        current.append(line)
+        size += len(line) + 1
+        if not fenced and not line.strip() and size >= max_chars:
+            pieces.append("\n".join(current).strip())
+            current, size = [], 0
+    if current:
+        pieces.append("\n".join(current).strip())
+    return [piece for piece in pieces if piece]
+
+
+def chunk_markdown(text: str, source: str, max_tokens: int = MAX_CHUNK_TOKENS) -> list[Chunk]:
+    """
+    Split markdown into chunks at ``#``, ``##`` and ``###`` headings.
+
+    Headings inside code fences are ignored. Each chunk's heading is the
+    path of enclosing headings, e.g. ``"Copywriting > Headlines"``.
+
+    Args:
+        text: Markdown content
+        source: Path of the file relative to the skill directory
+        max_tokens: Sections larger than this are split at blank lines
+
+    Returns:
+        Chunks in document order
+    """
+    chunks: list[Chunk] = []
+    path: list[tuple[int, str]] = []
+    heading = source
+    lines: list[str] = []
+    fenced = False
+
+    def close():
+        for piece in _split(lines, max_tokens):
+            chunks.append(Chunk(source=source, heading=heading, text=piece))
+
+    for line in text.split("\n"):
+        if line.startswith("```"):
+            fenced = not fenced
+        match = None if fenced else _HEADING.match(line)
+        if match:
+            close()
+            level = len(match.group(1))
+            path = [entry for entry in path if entry[0] < level] + [(level, match.group(2))]
+            heading = " > ".join(title for _, title in path)
+            lines = []
+        lines.append(line)
+    close()
+    return chunks
+
+
+def chunk_file(text: str, source: str, max_tokens: int = MAX_CHUNK_TOKENS) -> list[Chunk]:
+    """Chunk one skill file: markdown by heading, anything else by size."""
+    suffix = Path(source).suffix
+    if suffix == ".md":
+        return chunk_markdown(text, source, max_tokens)
+    language = CODE_LANGUAGES.get(suffix, "")
+    return [
+        Chunk(source=source, heading=source, text=piece, language=language)
+        for piece in _split(text.split("\n"), max_tokens)
+    ]
+
+
+class SkillCorpus:
+    """The chunks of one skill and a BM25 index over them."""
+
+    def __init__(self, name: str, skill_md: str, chunks: list[Chunk], fingerprint: str, signature: tuple):
+        self.name = name
+        self.skill_md = skill_md
+        self.skill_md_tokens = estimate_text_tokens(skill_md)
+        self.chunks = chunks
+        self.fingerprint = fingerprint
+        self.signature = signature
+
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        for i, chunk in enumerate(chunks):
+            for term, count in chunk.terms.items():
+                self.postings.setdefault(term, []).append((i, count))
+        self.avg_length = (sum(c.length for c in chunks) / len(chunks) if chunks else 0.0) or 1.0
+
+    @property
+    def tokens(self) -> int:
+        """Estimated tokens across every chunk."""
+        return sum(chunk.tokens for chunk in self.chunks)
+
+    def rank(self, query: str) -> list[tuple[float, int]]:
+        """
+        Score chunks against a query with BM25.
+
+        Returns:
+            ``(score, chunk_index)`` for chunks sharing at least one term
+            with the query, best first
+        """
+        n = len(self.chunks)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = K1 * (1 - B + B * self.chunks[i].length / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        return sorted(((score, i) for i, score in scores.items()), key=lambda item: (-item[0], item[1]))
+
+
+def _support_files(skill_dir: Path) -> list[Path]:
+    """Indexable files under a skill's support directories, in a stable order."""
+    files = []
+    for name in SUPPORT_DIRS:
+        support = skill_dir / name
+        if support.is_dir():
+            files.extend(sorted(
+                path for path in support.rglob("*")
+                if path.is_file() and path.suffix in TEXT_SUFFIXES
+            ))
+    return files
+
+
+def _signature(paths: list[Path]) -> tuple:
+    """Modification stamps for change detection; raises if a path is gone."""
+    stamps = []
+    for path in paths:
+        stat = path.stat()
+        stamps.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(stamps)
+
+
+class SkillIndex:
+    """
+    Chunked, ranked corpora for every skill, rebuilt when files change.
+
+    Args:
+        budget: Token budget for the skill part of the system prompt
+        mode: "auto" keeps SKILL.md whole when it fits and adds relevant
+            support chunks; "always" also trims SKILL.md to the sections
+            that match the task; "off" uses SKILL.md alone, as before
+    """
+
+    def __init__(self, budget: int = 6000, mode: str = "auto"):
+        self.budget = budget
+        self.mode = mode
+        # Stat a skill's files on every lookup; off while a SkillRegistry
+        # watcher refreshes the index in the background instead
+        self.revalidate = True
+        self._corpora: dict[str, SkillCorpus] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._corpora)
+
+    def build(self, skill_dir: Path) -> SkillCorpus:
+        """Read, chunk and index one skill directory."""
+        skill_md_path = skill_dir / "SKILL.md"
+        if not skill_md_path.is_file():
+            raise FileNotFoundError(f"Skill not found: {skill_dir.name}")
+
+        skill_md = skill_md_path.read_text()
+        chunks = chunk_markdown(skill_md, "SKILL.md")
+        digest = hashlib.sha256(skill_md.encode("utf-8"))
+        watched = [skill_md_path]
+
+        roots = [skill_dir]
+        alias = CORPUS_ALIASES.get(skill_dir.name)
+        if alias and (skill_dir.parent / alias).is_dir():
+            roots.append(skill_dir.parent / alias)
+
+        for root in roots:
+            # Directory stamps catch support files being added or removed
+            watched.extend(path for path in (root / name for name in SUPPORT_DIRS) if path.is_dir())
+            for path in _support_files(root):
+                source = str(path.relative_to(root))
+                text = path.read_text(errors="replace")
+                chunks.extend(chunk_file(text, source))
+                digest.update(b"\0" + source.encode("utf-8") + b"\0" + text.encode("utf-8"))
+                watched.append(path)
+
+        return SkillCorpus(skill_dir.name, skill_md, chunks, digest.hexdigest(), _signature(watched))
+
+    def get(self, skill_dir: Path) -> SkillCorpus:
+        """
+        The index for a skill directory, rebuilt if any of its files changed.
+
+        Raises:
+            FileNotFoundError: If the directory has no SKILL.md
+        """
+        corpus = self._corpora.get(str(skill_dir))
+        if corpus is not None and (not self.revalidate or not self.stale(corpus)):
+            return corpus
+        return self.rebuild(skill_dir)
+
+    @staticmethod
+    def stale(corpus: SkillCorpus) -> bool:
+        """Whether any file a corpus was built from changed or disappeared."""
+        try:
+            watched = [Path(stamp[0]) for stamp in corpus.signature]
+            return _signature(watched) != corpus.signature
+        except FileNotFoundError:
+            return True
+
+    def rebuild(self, skill_dir: Path) -> SkillCorpus:
+        """
+        Build a skill's index and swap it in.
+
+        Requests already holding the previous corpus finish with it.
+        """
+        corpus = self.build(skill_dir)
+        with self._lock:
+            self._corpora[str(skill_dir)] = corpus
+        return corpus
+
+    def assemble(self, skill_dir: Path, query: str) -> tuple[str, str]:
+        """
+        Select the skill content for a task under the token budget.
+
+        SKILL.md stays whole when it fits (and the mode is not "always") so
+        the framework block remains identical across requests and cacheable.
+        Otherwise its first chunk is always kept and the rest are chosen by
+        relevance. Remaining budget goes to the best-matching support chunks.
+
+        Args:
+            skill_dir: The skill directory
+            query: Text to rank against, usually the task and context
+
+        Returns:
+            The framework text and the references text (possibly empty)
+        """
+        corpus = self.get(skill_dir)
+        if self.mode == "off":
+            return corpus.skill_md, ""
+
+        ranked = [i for _, i in corpus.rank(query)] if query else []
+        chunks = corpus.chunks
+        skill_ids = [i for i, chunk in enumerate(chunks) if chunk.source == "SKILL.md"]
+
+        slice_skill = corpus.skill_md_tokens > self.budget or (self.mode == "always" and ranked)
+        if slice_skill and skill_ids:
+            chosen = {skill_ids[0]}
+            used = chunks[skill_ids[0]].tokens
+            candidates = [i for i in ranked if chunks[i].source == "SKILL.md"] or skill_ids
+            for i in candidates:
+                if i not in chosen and used + chunks[i].tokens <= self.budget:
+                    chosen.add(i)
+                    used += chunks[i].tokens
+            framework = "\n\n".join(chunks[i].text for i in sorted(chosen))
+        else:
+            framework = corpus.skill_md
+            used = corpus.skill_md_tokens
+
+        references = []
+        for i in ranked:
+            if chunks[i].source != "SKILL.md" and used + chunks[i].tokens <= self.budget:
+                references.append(i)
+                used += chunks[i].tokens
+
+        rendered = []
+        previous = None
+        for i in sorted(references):
+            rendered.append(chunks[i].render(with_source=chunks[i].source != previous))
+            previous = chunks[i].source
+        return framework, "\n\n".join(rendered)
+
+
+# Singleton
+_index: Optional[SkillIndex] = None
+
+
+def get_skill_index() -> SkillIndex:
+    """
+    Get the skill index singleton.
+
+    Configured with SKILL_TOKEN_BUDGET and SKILL_SLICING (auto, always or off).
+    """
+    global _index
+    if _index is None:
+        _index = SkillIndex(
+            budget=int(os.getenv("SKILL_TOKEN_BUDGET", "6000")),
+            mode=os.getenv("SKILL_SLICING", "auto").lower(),
+        )
+    return _index
@@ -0,0 +1,273 @@
+"""
+Precompiled, hot-reloadable skill registry.
+
+Every skill is compiled once into what requests need from it: the cached
+framework block of the system prompt, a content hash, a token count and an
+index of its headings, plus the catalog metadata from its front matter. A
+background task polls the skills directory and recompiles skills whose
+files changed, swapping each new entry in whole so a SKILL.md edit is live
+within seconds without a redeploy and without failing in-flight requests.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from service.core.skill_index import SkillCorpus, SkillIndex
+
+logger = logging.getLogger(__name__)
+
+# How /skills groups the catalog; skills not listed here appear under "other"
+CATEGORIES = {
+    "writing": ["copywriting", "copy-editing", "email-sequence", "social-content"],
+    "cro": ["page-cro", "form-cro", "signup-flow-cro", "onboarding-cro", "popup-cro", "paywall-upgrade-cro"],
+    "seo": ["seo-audit", "programmatic-seo", "schema-markup"],
+    "strategy": [
+        "marketing-ideas", "marketing-psychology", "pricing-strategy", "launch-strategy",
+        "competitor-alternatives", "referral-program", "free-tool-strategy",
+    ],
+    "measurement": ["ab-test-setup", "analytics-tracking", "paid-ads"],
+    "video": ["remotion-script", "remotion-layout", "manim-composer", "manim-best-practices"],
+}
+
+
+def parse_front_matter(text: str) -> dict[str, Any]:
+    """
+    Read the ``---`` delimited header of a SKILL.md.
+
+    Handles the forms the skills use: ``key: value``, ``key: [a, b]`` and
+    indented ``key: |`` blocks.
+    """
+    lines = text.splitlines()
+    if not lines or lines[0].strip() != "---":
+        return {}
+    meta: dict[str, Any] = {}
+    block_key = None
+    for line in lines[1:]:
+        if line.strip() == "---":
+            break
+        if block_key and (line.startswith((" ", "\t")) or not line.strip()):
+            meta[block_key] = f"{meta[block_key]}\n{line.strip()}".strip()
+            continue
+        block_key = None
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        key, value = key.strip(), value.strip()
+        if value in ("|", ">"):
+            block_key = key
+            meta[key] = ""
+        elif value.startswith("[") and value.endswith("]"):
+            meta[key] = [item.strip().strip("'\"") for item in value[1:-1].split(",") if item.strip()]
+        else:
+            meta[key] = value.strip("'\"")
+    return meta
+
+
+def _first_paragraph(text: str) -> str:
+    """The first line of prose after the front matter and title."""
+    body = text.split("\n---", 1)[-1] if text.startswith("---") else text
+    for line in body.splitlines():
+        line = line.strip()
+        if line and not line.startswith(("#", "---", "```")):
+            return line
+    return ""
+
+
+@dataclass(frozen=True)
+class CompiledSkill:
+    """Everything a request or the catalog needs from one skill."""
+    name: str
+    description: str
+    tags: tuple[str, ...]
+    corpus: SkillCorpus
+    framework_block: dict[str, Any]
+    headings: tuple[tuple[str, int], ...]
+    compiled_at: float
+
+    @property
+    def hash(self) -> str:
+        return self.corpus.fingerprint
+
+    @property
+    def tokens(self) -> int:
+        return self.corpus.skill_md_tokens
+
+    def summary(self) -> dict[str, Any]:
+        """Catalog metadata for /skills."""
+        return {
+            "description": self.description,
+            "tags": list(self.tags),
+            "hash": self.hash[:12],
+            "tokens": self.tokens,
+            "support_tokens": self.corpus.tokens - self.tokens,
+            "headings": [heading for heading, _ in self.headings],
+            "compiled_at": self.compiled_at,
+        }
+
+
+class SkillRegistry:
+    """
+    Compiled skills, kept current by polling the skills directory.
+
+    Args:
+        skills_path: The skills directory
+        index: The skill index the compiled corpora come from
+        poll_interval: Seconds between checks for changed files
+    """
+
+    def __init__(self, skills_path: Path, index: SkillIndex, poll_interval: float = 2.0):
+        self.skills_path = skills_path
+        self.index = index
+        self.poll_interval = poll_interval
+        self._skills: dict[str, CompiledSkill] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.reloads = 0
+
+    def __len__(self) -> int:
+        return len(self._skills)
+
+    def retarget(self, skills_path: Path) -> None:
+        """Point the registry at another skills directory, dropping compiled skills."""
+        self.skills_path = skills_path
+        self._skills = {}
+
+    def compile(self, name: str) -> CompiledSkill:
+        """
+        Compile one skill from its directory.
+
+        Raises:
+            FileNotFoundError: If the skill has no SKILL.md
+        """
+        corpus = self.index.rebuild(self.skills_path / name)
+        meta = parse_front_matter(corpus.skill_md)
+        return CompiledSkill(
+            name=name,
+            description=" ".join(str(meta.get("description", "")).split()) or _first_paragraph(corpus.skill_md),
+            tags=tuple(meta.get("tags") or ()),
+            corpus=corpus,
+            framework_block={
+                "type": "text",
+                "text": f"## Skill Framework\n\n{corpus.skill_md}",
+                "cache_control": {"type": "ephemeral"},
+            },
+            headings=tuple((chunk.heading, chunk.tokens) for chunk in corpus.chunks
+                           if chunk.source == "SKILL.md" and chunk.heading != chunk.source),
+            compiled_at=time.time(),
+        )
+
+    def _swap(self, compiled: dict[str, CompiledSkill], removed: tuple[str, ...] = ()) -> None:
+        """Publish a new mapping; readers see the old one or the new one, never a mix."""
+        skills = {**self._skills, **compiled}
+        for name in removed:
+            skills.pop(name, None)
+        self._skills = skills
+
+    def load(self, names: Optional[list[str]] = None) -> dict[str, CompiledSkill]:
+        """
+        Compile many skills and swap them in.
+
+        Args:
+            names: Skill directory names; defaults to every directory with a SKILL.md
+
+        Returns:
+            The compiled skills; missing ones are left out
+        """
+        if names is None:
+            names = sorted(p.parent.name for p in self.skills_path.glob("*/SKILL.md"))
+        compiled = {}
+        for name in names:
+            try:
+                compiled[name] = self.compile(name)
+            except FileNotFoundError:
+                continue
+        self._swap(compiled)
+        return compiled
+
+    def get(self, name: str) -> CompiledSkill:
+        """
+        A compiled skill, compiling it on first use.
+
+        While the watcher isn't running, changed files are also picked up here.
+
+        Raises:
+            FileNotFoundError: If the skill has no SKILL.md
+        """
+        compiled = self._skills.get(name)
+        if compiled is not None and (self._task is not None or not self.index.stale(compiled.corpus)):
+            return compiled
+        compiled = self.compile(name)
+        self._swap({name: compiled})
+        return compiled
+
+    def refresh(self) -> list[str]:
+        """
+        Recompile skills whose files changed; drop skills whose SKILL.md is gone.
+
+        Returns:
+            Names of the skills that were recompiled or dropped
+        """
+        changed, removed = {}, []
+        for name, compiled in list(self._skills.items()):
+            if not self.index.stale(compiled.corpus):
+                continue
+            try:
+                changed[name] = self.compile(name)
+            except FileNotFoundError:
+                removed.append(name)
+            except Exception as e:
+                # A half-written file; keep serving the old version and retry next poll
+                logger.warning("Skill %s failed to recompile, keeping previous version: %s", name, e)
+        if changed or removed:
+            self._swap(changed, tuple(removed))
+            self.reloads += 1
+        return sorted([*changed, *removed])
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                changed = await asyncio.to_thread(self.refresh)
+            except Exception:
+                logger.exception("Skill reload failed")
+                continue
+            if changed:
+                logger.info("Reloaded skills: %s", ", ".join(changed))
+
+    def start(self) -> None:
+        """Start watching for changes; lookups then stop checking files themselves."""
+        if self._task is None:
+            self.index.revalidate = False
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.index.revalidate = True
+
+    def catalog(self) -> dict[str, Any]:
+        """The /skills response: descriptions by category, plus per-skill metadata."""
+        skills = self._skills
+        grouped: dict[str, dict[str, str]] = {}
+        listed = set()
+        for category, names in CATEGORIES.items():
+            entries = {name: skills[name].description for name in names if name in skills}
+            if entries:
+                grouped[category] = entries
+            listed.update(names)
+        other = {name: compiled.description for name, compiled in sorted(skills.items()) if name not in listed}
+        if other:
+            grouped["other"] = other
+        return {
+            "skills": grouped,
+            "total": len(skills),
+            "metadata": {name: compiled.summary() for name, compiled in sorted(skills.items())},
+        }
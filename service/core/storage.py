@@ -1,6 +1,8 @@
+import json
 import os
 from datetime import timedelta
 from typing import Optional
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
 from google.oauth2 import service_account
 
@@ -23,6 +25,18 @@ class CloudStorage:
         blob.upload_from_filename(local_path)
         return blob.public_url
 
+    def upload_json(self, blob_name: str, data: dict) -> None:
+        """Uploads a JSON document to the bucket."""
+        blob = self.bucket.blob(blob_name)
+        blob.upload_from_string(json.dumps(data), content_type="application/json")
+
+    def download_json(self, blob_name: str) -> Optional[dict]:
+        """Downloads a JSON document, or None if the blob doesn't exist."""
+        try:
+            return json.loads(self.bucket.blob(blob_name).download_as_bytes())
+        except NotFound:
+            return None
+
     def get_signed_url(self, blob_name: str, expiration_minutes: int = 60) -> str:
         """Generates a v4 signed URL for a blob."""
         blob = self.bucket.blob(blob_name)
@@ -0,0 +1,138 @@
+"""
+Structured output through forced tool use.
+
+A request's ``response_schema`` becomes the input schema of a single tool
+the model is required to call, so the reply arrives as parsed JSON in the
+tool call's input rather than as prose with JSON somewhere inside it.
+The input is validated against the schema before it reaches the caller.
+"""
+
+import json
+from typing import Any
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+TOOL_NAME = "respond"
+
+# Tool inputs must be objects; other schemas are wrapped in this property
+WRAPPED_PROPERTY = "result"
+
+_JSON_TYPES = {"object": dict, "array": list, "string": str, "null": type(None)}
+
+
+class StructuredOutputError(ValueError):
+    """The model's structured output didn't match the response schema."""
+
+
+def _wrapped(schema: dict[str, Any]) -> bool:
+    return schema.get("type") != "object"
+
+
+def tool_params(schema: dict[str, Any]) -> dict[str, Any]:
+    """The ``tools`` and ``tool_choice`` arguments forcing output to a schema."""
+    input_schema = schema
+    if _wrapped(schema):
+        input_schema = {
+            "type": "object",
+            "properties": {WRAPPED_PROPERTY: schema},
+            "required": [WRAPPED_PROPERTY],
+        }
+    return {
+        "tools": [{
+            "name": TOOL_NAME,
+            "description": "Submit the complete response to the task in the required structure.",
+            "input_schema": input_schema,
+        }],
+        "tool_choice": {"type": "tool", "name": TOOL_NAME},
+    }
+
+
+def _is_type(value: Any, name: str) -> bool:
+    if name == "boolean":
+        return isinstance(value, bool)
+    if isinstance(value, bool):
+        return False
+    if name == "integer":
+        return isinstance(value, int)
+    if name == "number":
+        return isinstance(value, (int, float))
+    return isinstance(value, _JSON_TYPES.get(name, object))
+
+
+def _check(value: Any, schema: dict[str, Any], path: str, defs: dict[str, Any]) -> None:
+    """Validate the common subset of JSON Schema when jsonschema isn't installed."""
+    if "$ref" in schema:
+        schema = defs.get(schema["$ref"].rsplit("/", 1)[-1], {})
+    if "anyOf" in schema:
+        for option in schema["anyOf"]:
+            try:
+                _check(value, option, path, defs)
+                return
+            except StructuredOutputError:
+                continue
+        raise StructuredOutputError(f"{path}: matches none of the allowed schemas")
+
+    expected = schema.get("type")
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_is_type(value, name) for name in types):
+            raise StructuredOutputError(f"{path}: expected {expected}, got {type(value).__name__}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise StructuredOutputError(f"{path}: {value!r} is not one of {schema['enum']}")
+
+    if isinstance(value, dict):
+        for name in schema.get("required", []):
+            if name not in value:
+                raise StructuredOutputError(f"{path}: missing required property '{name}'")
+        for name, subschema in schema.get("properties", {}).items():
+            if name in value:
+                _check(value[name], subschema, f"{path}.{name}", defs)
+    elif isinstance(value, list) and isinstance(schema.get("items"), dict):
+        for i, item in enumerate(value):
+            _check(item, schema["items"], f"{path}[{i}]", defs)
+
+
+def validate(value: Any, schema: dict[str, Any]) -> None:
+    """
+    Validate a value against a JSON Schema.
+
+    Raises:
+        StructuredOutputError: If it doesn't match
+    """
+    if jsonschema is not None:
+        try:
+            jsonschema.validate(value, schema)
+        except jsonschema.ValidationError as e:
+            location = "".join(f"[{part!r}]" for part in e.absolute_path)
+            raise StructuredOutputError(f"${location}: {e.message}") from e
+        return
+    _check(value, schema, "$", schema.get("$defs", {}))
+
+
+def extract(message, schema: dict[str, Any]) -> Any:
+    """
+    The validated structured output from a forced tool call.
+
+    Raises:
+        StructuredOutputError: If the model didn't call the tool or its
+            input doesn't match the schema
+    """
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == TOOL_NAME:
+            value = block.input
+            if isinstance(value, str):
+                # Some compatible providers send the input as a JSON string
+                try:
+                    value = json.loads(value)
+                except ValueError as e:
+                    raise StructuredOutputError(f"Tool input is not valid JSON: {e}") from e
+            if _wrapped(schema):
+                if not isinstance(value, dict) or WRAPPED_PROPERTY not in value:
+                    raise StructuredOutputError(f"$: missing required property '{WRAPPED_PROPERTY}'")
+                value = value[WRAPPED_PROPERTY]
+            validate(value, schema)
+            return value
+    raise StructuredOutputError("Model did not return structured output")
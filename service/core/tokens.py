@@ -0,0 +1,124 @@
+"""
+Token estimation and adaptive output limits.
+
+Input tokens are estimated before a call, either locally from the
+assembled prompt or with the provider's count endpoint, so billing can
+check the budget up front. Output lengths are tracked per skill and
+``max_tokens`` is chosen from the observed distribution instead of a
+fixed 4096.
+"""
+
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Any
+
+# Conservative average for English prose and markdown with Claude tokenizers
+CHARS_PER_TOKEN = 3.5
+
+# Upper bound for one image after the provider's default downscaling
+IMAGE_TOKENS = 1600
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Approximate the token count of a string."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _content_tokens(content: Any) -> int:
+    if isinstance(content, str):
+        return estimate_text_tokens(content)
+    total = 0
+    for block in content:
+        if block.get("type") == "image":
+            total += IMAGE_TOKENS
+        elif "text" in block:
+            total += estimate_text_tokens(block["text"])
+    return total
+
+
+def estimate_input_tokens(params: dict[str, Any]) -> int:
+    """
+    Approximate input tokens for Messages API call parameters.
+
+    Args:
+        params: Keyword arguments for ``messages.create``
+
+    Returns:
+        Estimated input tokens, including the system prompt and images
+    """
+    total = _content_tokens(params.get("system") or [])
+    for message in params["messages"]:
+        total += _content_tokens(message["content"])
+    return total
+
+
+class TokenEstimator:
+    """
+    Per-skill output-length statistics and adaptive ``max_tokens``.
+
+    Until a skill has ``min_samples`` observations it gets ``default``.
+    After that, ``max_tokens`` is the ``percentile`` of recent outputs times
+    ``headroom``, clamped to ``[floor, ceiling]``. Truncated outputs count
+    double so a skill that keeps hitting its limit grows out of it.
+    """
+
+    def __init__(
+        self,
+        default: int = 4096,
+        floor: int = 1024,
+        ceiling: int = 8192,
+        percentile: float = 0.99,
+        headroom: float = 1.25,
+        min_samples: int = 20,
+        window: int = 500,
+    ):
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self._samples: dict[str, deque[int]] = defaultdict(lambda: deque(maxlen=window))
+        self._truncations: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, skill: str, output_tokens: int, truncated: bool = False) -> None:
+        """Record one completion's output length."""
+        with self._lock:
+            if truncated:
+                self._truncations[skill] += 1
+                output_tokens *= 2
+            self._samples[skill].append(output_tokens)
+
+    def quantile(self, skill: str, q: float) -> int:
+        """The q-quantile of recent output lengths, or 0 with no samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(skill, ()))
+        if not samples:
+            return 0
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def max_tokens_for(self, skill: str) -> int:
+        """Choose ``max_tokens`` for the next call to a skill."""
+        with self._lock:
+            count = len(self._samples.get(skill, ()))
+        if count < self.min_samples:
+            return self.default
+        chosen = math.ceil(self.quantile(skill, self.percentile) * self.headroom)
+        return max(self.floor, min(self.ceiling, chosen))
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Per-skill sample counts, percentiles and current max_tokens."""
+        with self._lock:
+            skills = list(self._samples)
+        return {
+            skill: {
+                "samples": len(self._samples[skill]),
+                "p50": self.quantile(skill, 0.5),
+                "p95": self.quantile(skill, 0.95),
+                "truncations": self._truncations[skill],
+                "max_tokens": self.max_tokens_for(skill),
+            }
+            for skill in skills
+        }
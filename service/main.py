@@ -5,17 +5,27 @@ HTTP service that exposes marketing skills via REST API.
 Designed for deployment on Google Cloud Run.
 """
 
+import asyncio
+import json
+import logging
+import math
 import os
+import time
+import uuid
 from contextlib import asynccontextmanager
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Security, Depends, status
+from fastapi import FastAPI, HTTPException, Request, Response, Security, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 
 from service.api.schemas import (
     AssetRequest,
+    BatchJobResponse,
+    BatchWorkRequest,
     ErrorResponse,
     HealthResponse,
     SkillName,
@@ -28,15 +38,34 @@ from service.api.schemas import (
     LeadResponse,
     UserProfile
 )
+from service.core.admission import AdmissionRejected, Slot, get_admission, retry_after_header
 from service.core.executor import get_executor, SkillExecutor
+from service.core.routing import CircuitOpenError
+from service.core.structured import StructuredOutputError
+from service.core.images import ImageError
+from service.core.batch import get_batch_runner
+from service.core.browser import (
+    MAX_TEXT_CHARS_WITH_SCREENSHOT, BrowserPoolBusy, get_browser_pool, get_page_capturer,
+)
 from service.core.storage import get_storage
 from service.core.db import get_db
 from service.core.queue import get_queue
 from service.core.assets import get_asset_manager
-from service.core.auth import get_current_user
-from service.core.limiter import get_limiter
+from service.core.auth import get_current_user, get_optional_user, require_admin
+from service.core.limiter import get_limiter, get_rate_checker
+from service.core.log import configure_logging, request_id
 from service.core.models import ImageModels, VideoModels, AudioModels
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Billing depends on Stripe, which not every deployment installs
+try:
+    from service.billing.enforcement import get_enforcement
+except ImportError as e:
+    get_enforcement = None
+    logger.warning("Billing enforcement not available: %s", e)
+
 
 VERSION = "1.0.0"
 
@@ -61,21 +90,66 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     # Startup: warm up the executor and validate skills
     executor = get_executor()
-    print(f"Marketing Agency API v{VERSION} starting...")
-    print(f"Skills path: {executor.skills_path}")
-    print(f"Default Model: {executor.default_model}")
+    logger.info(
+        "Marketing Agency API v%s starting",
+        VERSION,
+        extra={"skills_path": str(executor.skills_path), "default_model": executor.default_model},
+    )
 
-    # Validate all skills are loadable
+    # Compile every skill up front, then watch for edits
+    registry = executor.skill_registry
+    compiled = registry.load([skill.value for skill in SkillName])
     for skill in SkillName:
-        try:
-            executor.load_skill(skill)
-        except FileNotFoundError:
-            print(f"Warning: Skill not found: {skill.value}")
+        if skill.value not in compiled:
+            logger.warning("Skill not found: %s", skill.value)
+
+    chunks = sum(len(skill.corpus.chunks) for skill in compiled.values())
+    logger.info("Compiled %d skills (%d indexed chunks)", len(compiled), chunks)
+    if os.getenv("SKILL_HOT_RELOAD", "true").lower() == "true":
+        registry.start()
+
+    # Warm the browser pool for /analyze-url; it starts lazily if this fails
+    browser_pool = get_browser_pool()
+    try:
+        await browser_pool.start()
+        logger.info("Browser pool ready (%d browsers)", browser_pool.size)
+    except Exception as e:
+        logger.warning("Browser pool not started: %s", e)
+
+    # Hand idle rate-limit leases back to the shared counters
+    try:
+        limiter = get_limiter()
+        limiter.start()
+    except Exception as e:
+        limiter = None
+        logger.warning("Rate limiter reconciliation not started: %s", e)
+
+    # With the in-process queue, this instance runs /work/async jobs itself,
+    # on the runner's own loop with its own executor
+    job_runner = subscription = None
+    queue = get_queue() if os.getenv("TASK_QUEUE_BACKEND", "pubsub").lower() == "memory" else None
+    if queue is not None:
+        from service.worker import JobRunner
+        job_runner = JobRunner(
+            executor=SkillExecutor(),
+            concurrency=int(os.getenv("WORKER_CONCURRENCY", "8")),
+        ).start()
+        subscription = queue.subscribe(job_runner.submit, max_messages=job_runner.concurrency)
+        logger.info("Running async jobs in process (concurrency %d)", job_runner.concurrency)
 
-    print(f"Loaded {len(executor._skill_cache)} skills")
     yield
     # Shutdown
-    print("Shutting down...")
+    logger.info("Shutting down")
+    if job_runner is not None:
+        await asyncio.to_thread(job_runner.drain, float(os.getenv("WORKER_DRAIN_TIMEOUT", "25")))
+        subscription.cancel()
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(job_runner.executor.aclose(), job_runner.loop))
+        job_runner.stop()
+    if limiter is not None:
+        await limiter.stop()
+    await registry.stop()
+    await browser_pool.close()
+    await executor.aclose()
 
 
 app = FastAPI(
@@ -124,15 +198,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tag every log line of a request with its ID, echoed in X-Request-ID."""
+    rid = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id.set(rid)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id.reset(token)
+    response.headers["X-Request-ID"] = rid
+    return response
+
 # Include swarm router for sprite management
 try:
     from service.api.swarm import router as swarm_router
     app.include_router(swarm_router)
-    print("Swarm API enabled")
+    logger.info("Swarm API enabled")
 except ImportError as e:
-    print(f"Swarm API not available: {e}")
+    logger.info("Swarm API not available: %s", e)
 
 
 @app.get("/", response_model=HealthResponse)
@@ -154,52 +242,18 @@ async def health():
 
 @app.get("/skills")
 async def list_skills():
-    """List all available skills with descriptions."""
-    skills = {
-        "writing": {
-            "copywriting": "Conversion-focused copy with strategic frameworks",
-            "copy-editing": "Three-pass editing: clarity, concision, power",
-            "email-sequence": "Complete email sequences: welcome, nurture, sales",
-            "social-content": "Platform-native content that converts",
-        },
-        "cro": {
-            "page-cro": "Landing page audits with prioritized recommendations",
-            "form-cro": "Form field optimization and friction reduction",
-            "signup-flow-cro": "Registration flow optimization",
-            "onboarding-cro": "User activation and aha-moment optimization",
-            "popup-cro": "Exit intent, timing, and trigger optimization",
-            "paywall-upgrade-cro": "Free-to-paid conversion paths",
-        },
-        "seo": {
-            "seo-audit": "Technical + content + competitive SEO analysis",
-            "programmatic-seo": "Template-based pages at scale",
-            "schema-markup": "JSON-LD structured data implementation",
-        },
-        "strategy": {
-            "marketing-ideas": "Structured brainstorming with prioritization",
-            "marketing-psychology": "Cialdini, cognitive biases, applied persuasion",
-            "pricing-strategy": "Models, anchoring, packaging",
-            "launch-strategy": "Product Hunt, soft launches, hard launches",
-            "competitor-alternatives": "Positioning that creates space",
-            "referral-program": "Viral loops that actually loop",
-            "free-tool-strategy": "Lead-gen tools worth building",
-        },
-        "measurement": {
-            "ab-test-setup": "Statistical validity and test design",
-            "analytics-tracking": "Events, funnels, attribution",
-            "paid-ads": "Google, Meta, LinkedIn structure and optimization",
-        },
-        "video": {
-            "remotion-script": "Dynamic video scripts",
-            "remotion-layout": "Video component design",
-            "manim-composer": "Mathematical animations",
-            "manim-best-practices": "Manim optimization",
-        }
-    }
-    return {"skills": skills, "total": len(SkillName)}
+    """
+    List all available skills with descriptions, grouped by category.
 
+    Descriptions, tags, content hashes, token counts and section headings
+    come from the compiled skill registry, so they reflect SKILL.md edits
+    as soon as the registry reloads them.
+    """
+    registry = get_executor().skill_registry
+    if not len(registry):
+        await run_in_threadpool(registry.load, [skill.value for skill in SkillName])
+    return registry.catalog()
 
-from starlette.concurrency import run_in_threadpool
 
 @app.get("/assets")
 async def list_assets(prefix: Optional[str] = None):
@@ -315,10 +369,23 @@ async def create_lead(lead: LeadCreate):
 
 
 @app.post("/generate-asset")
-async def generate_asset(request: AssetRequest):
+async def generate_asset(
+    request: AssetRequest,
+    user_info: Optional[tuple[str, bool]] = Depends(get_optional_user)
+):
     """Generate an AI asset via FAL and store in GCS."""
     manager = get_asset_manager()
-    
+    if request.type not in ("image", "video", "audio"):
+        raise HTTPException(status_code=400, detail="Invalid asset type. Use 'image', 'video', or 'audio'.")
+
+    # Unidentified callers share one anonymous tenant
+    user_id, is_anon = user_info or ("public", True)
+    async with admitted(user_id, is_anon):
+        return await run_asset(manager, request)
+
+
+async def run_asset(manager, request: AssetRequest) -> dict:
+    """Generate the requested image, video or audio."""
     if request.type == "image":
         if not request.model:
             # Smart default based on prompt content
@@ -335,28 +402,34 @@ async def generate_asset(request: AssetRequest):
         result = await manager.generate_video(request.prompt, model=request.model or VideoModels.KLING_V1_STANDARD)
     elif request.type == "audio":
         result = await manager.generate_audio(request.prompt, model=request.model or AudioModels.STABLE_AUDIO)
-    else:
-        raise HTTPException(status_code=400, detail="Invalid asset type. Use 'image', 'video', or 'audio'.")
-    
     return result
 
 
-from service.core.browser import capture_screenshot
-
 @app.post("/analyze-url", response_model=WorkResult)
 async def analyze_url(
     url: str,
+    response: Response,
     task: Optional[str] = "Audit this page for conversion optimization opportunities.",
+    include_screenshot: bool = True,
     user_info: tuple[str, bool] = Depends(get_current_user)
 ):
     """
-    Capture a screenshot of a URL and analyze it using AI vision.
+    Capture a URL and analyze it using its screenshot and extracted text.
+
+    The screenshot already shows the page's text, so alongside it only the
+    outline and the start of the visible text are sent. Set
+    include_screenshot=false to send the full text and outline instead,
+    which costs far fewer input tokens than vision.
     """
     user_id, _ = user_info
     
-    # 1. Capture Screenshot
+    # 1. Capture the page (cached while its HTML is unchanged)
     try:
-        image_base64 = await capture_screenshot(url)
+        capture, capture_status = await get_page_capturer().capture(url)
+    except BrowserPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Timed out capturing {url}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to capture screenshot: {str(e)}")
     
@@ -364,42 +437,271 @@ async def analyze_url(
     request = WorkRequest(
         skill=SkillName.PAGE_CRO, # Reuse CRO skill logic
         task=task,
-        image_data=image_base64,
+        image_data=capture.screenshot if include_screenshot else None,
+        page_text=capture.page_text(MAX_TEXT_CHARS_WITH_SCREENSHOT if include_screenshot else None),
         context={"url": url}
     )
+    response.headers["X-Capture-Cache"] = capture_status
     
-    return await execute_work(request, user_info)
+    return await execute_work(request, response, user_info)
+
+
+# Resolved plans by user, fallbacks included, as (expires_at, plan)
+_plans: dict[str, tuple[float, str]] = {}
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "60"))
+PLAN_CACHE_MAX_ENTRIES = 10_000
+
+
+def _lookup_plan(user_id: str) -> str:
+    try:
+        tenant = get_enforcement().load_tenant(user_id)
+    except Exception:
+        # Users without a tenant record, or billing unreachable
+        return "starter"
+    return tenant.get("plan", "starter")
+
+
+async def user_plan(user_id: str, is_anon: bool) -> str:
+    """The billing plan whose request rates apply to a user, cached for PLAN_CACHE_TTL."""
+    if is_anon:
+        return "anonymous"
+    if get_enforcement is None:
+        return "starter"
+    now = time.monotonic()
+    cached = _plans.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    plan = await run_in_threadpool(_lookup_plan, user_id)
+    if len(_plans) >= PLAN_CACHE_MAX_ENTRIES:
+        for key in [key for key, (expires_at, _) in _plans.items() if expires_at <= now]:
+            del _plans[key]
+        if len(_plans) >= PLAN_CACHE_MAX_ENTRIES:
+            _plans.clear()
+    _plans[user_id] = (now + PLAN_CACHE_TTL, plan)
+    return plan
+
+
+def admission_rejected(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": retry_after_header(e)})
+
+
+async def check_admission(user_id: str, is_anon: bool, calls: int = 1) -> None:
+    """Raise a 429 now if the request would be shed, before any quota is charged for it."""
+    try:
+        get_admission().check(user_id, await user_plan(user_id, is_anon), calls)
+    except AdmissionRejected as e:
+        raise admission_rejected(e)
+
+
+async def admit(user_id: str, is_anon: bool, calls: int = 1) -> Slot:
+    """Wait for slots for ``calls`` model calls in the user's fair share, or raise a 429."""
+    try:
+        return await get_admission().acquire(user_id, await user_plan(user_id, is_anon), calls)
+    except AdmissionRejected as e:
+        raise admission_rejected(e)
+
+
+@asynccontextmanager
+async def admitted(user_id: str, is_anon: bool, calls: int = 1):
+    """Hold model-call slots for the body of an ``async with`` block."""
+    slot = await admit(user_id, is_anon, calls)
+    try:
+        yield slot
+    finally:
+        slot.release()
+
+
+async def enforce_rate_limit(user_id: str, is_anon: bool, endpoint: str, cost: int = 1) -> None:
+    """Raise a 429 if the user is over their plan's request rates or daily requests."""
+    checker = get_rate_checker()
+    if checker is not None:
+        plan = await user_plan(user_id, is_anon)
+        try:
+            decision = await run_in_threadpool(checker.check_plan, plan, user_id, endpoint, cost)
+        except Exception as e:
+            # Fail open, like the daily limit
+            logger.warning("Rate check error: %s", e)
+        else:
+            if not decision.allowed:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Rate limit exceeded ({', '.join(decision.exceeded)}) on the {plan} plan.",
+                    headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+                )
+
+    limiter = get_limiter()
+    # Usually a local decrement; a thread keeps lease round trips off the loop
+    if not await run_in_threadpool(limiter.check_limit, user_id, is_anon):
+        limit = limiter.daily_limit_anon if is_anon else limiter.daily_limit_user
+        raise HTTPException(
+            status_code=429, 
+            detail=f"Daily limit exceeded ({limit} requests/day). {'Sign in for more.' if is_anon else 'Upgrade plan for more.'}"
+        )
+
+
+async def enforce_token_budget(
+    user_id: str, is_anon: bool, request: WorkRequest, params: Optional[dict] = None,
+) -> None:
+    """Check the user's token budget against the request's estimated cost."""
+    if is_anon or get_enforcement is None:
+        return
+    if os.getenv("ENFORCE_TOKEN_BUDGET", "true").lower() != "true":
+        return
+
+    estimate = await get_executor().estimate_tokens(request, params)
+    try:
+        await get_enforcement().check_can_use_tokens(user_id, estimate["total"])
+    except HTTPException as e:
+        # Users without a tenant record have no token plan to enforce
+        if e.status_code != 404:
+            raise
+    except Exception as e:
+        # Fail open, like the rate limiter, so billing glitches don't block work
+        logger.warning("Token budget check error: %s", e)
+
+
+def call_guard(user_id: str, is_anon: bool):
+    """
+    A call guard for requests that miss the cache: checks the token budget,
+    then holds admission slots for every model call the request makes.
+    """
+    @asynccontextmanager
+    async def guard(request: WorkRequest, params: Optional[dict]):
+        await enforce_token_budget(user_id, is_anon, request, params)
+        async with admitted(user_id, is_anon, get_executor().model_calls(request)):
+            yield
+
+    return guard
+
+
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @app.post("/work", response_model=WorkResult)
 async def execute_work(
     request: WorkRequest,
+    response: Response,
     user_info: tuple[str, bool] = Depends(get_current_user)
 ):
     """
     Execute a marketing skill synchronously.
+
+    Identical requests are served from the result cache or share an
+    in-flight call; the `X-Cache` response header reports HIT, SEMANTIC,
+    MISS, COALESCED or BYPASS. Set `use_cache: false`
+    to force a fresh generation.
     """
     user_id, is_anon = user_info
-    
-    # Rate Limit Check
-    limiter = get_limiter()
-    if not limiter.check_limit(user_id, is_anon):
-        limit = limiter.daily_limit_anon if is_anon else limiter.daily_limit_user
-        raise HTTPException(
-            status_code=429, 
-            detail=f"Daily limit exceeded ({limit} requests/day). {'Sign in for more.' if is_anon else 'Upgrade plan for more.'}"
-        )
+
+    executor = get_executor()
+    calls = executor.model_calls(request)
+    # Shed load before the rate limits and daily quota are charged
+    await check_admission(user_id, is_anon, calls)
+    # Rate Limit Check, charged for every model call the request fans out to
+    await enforce_rate_limit(user_id, is_anon, "work", cost=calls)
 
     try:
-        executor = get_executor()
-        result = executor.execute(request)
+        # Admission and the token budget apply only to requests that call the model
+        result, cache_status = await executor.execute_cached(request, guard=call_guard(user_id, is_anon))
+        response.headers["X-Cache"] = cache_status.upper()
         return result
+    except HTTPException:
+        raise
+    except ImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except StructuredOutputError as e:
+        raise HTTPException(status_code=502, detail=f"Response did not match response_schema: {e}")
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Execution failed: {str(e)}")
 
 
+@app.post("/work/stream")
+async def execute_work_stream(
+    request: WorkRequest,
+    user_info: tuple[str, bool] = Depends(get_current_user)
+):
+    """
+    Execute a marketing skill, streaming progress as server-sent events.
+
+    Events:
+    - `delta`: `{"text": ...}` for each generated text chunk
+    - `section`: `{"title": ..., "content": ...}` as each `## ` section completes
+    - `result`: the full WorkResult, including token metadata
+    - `error`: `{"detail": ...}` if execution fails mid-stream
+
+    A stream is one model call, so requests that fan out (`n_best`,
+    `cascade`, or content too long for one call) are rejected with a 400;
+    send those to `/work`.
+    """
+    user_id, is_anon = user_info
+
+    executor = get_executor()
+    calls = executor.model_calls(request)
+    if calls > 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Streaming runs a single model call; use /work for n_best, cascade or oversized content.",
+        )
+    await check_admission(user_id, is_anon, calls)
+    # Rate Limit Check
+    await enforce_rate_limit(user_id, is_anon, "work/stream", cost=calls)
+
+    try:
+        # Fail fast with a 404 or 400 before the stream starts
+        executor.load_skill(request.skill)
+        if request.image_data:
+            await executor.image_preprocessor.prepare_async(request.image_data)
+        await enforce_token_budget(user_id, is_anon, request)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Held until the stream ends; the background task covers clients that
+    # disconnect before it starts
+    slot = await admit(user_id, is_anon, calls)
+
+    async def events():
+        try:
+            async for event, data in executor.stream_async(request):
+                if event == "delta":
+                    yield sse_event("delta", {"text": data})
+                elif event == "section":
+                    title, content = data
+                    yield sse_event("section", {"title": title, "content": content})
+                else:
+                    yield sse_event("result", data.model_dump(mode="json"))
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Execution failed: {str(e)}"})
+        finally:
+            slot.release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot.release),
+    )
+
+
+def _publish_done(future, job_id: str) -> None:
+    """Mark a job failed if its message never reached the queue."""
+    error = future.exception()
+    if error is None:
+        return
+    logger.error("Failed to queue job %s: %s", job_id, error)
+    try:
+        get_db().save_brief({"id": job_id, "status": "failed", "error": f"Failed to queue job: {error}"})
+    except Exception:
+        logger.exception("Failed to record job failure")
+
+
 @app.post("/work/async")
 async def execute_work_async(
     request: WorkRequest,
@@ -412,13 +714,7 @@ async def execute_work_async(
     user_id, is_anon = user_info
     
     # Rate Limit Check
-    limiter = get_limiter()
-    if not limiter.check_limit(user_id, is_anon):
-        limit = limiter.daily_limit_anon if is_anon else limiter.daily_limit_user
-        raise HTTPException(
-            status_code=429, 
-            detail=f"Daily limit exceeded ({limit} requests/day). {'Sign in for more.' if is_anon else 'Upgrade plan for more.'}"
-        )
+    await enforce_rate_limit(user_id, is_anon, "work/async", cost=get_executor().model_calls(request))
 
     try:
         db = get_db()
@@ -435,19 +731,130 @@ async def execute_work_async(
             "type": "async_job",
             "user_id": user_id # Track ownership
         }
-        job_id = db.save_brief(brief_data)
-        
-        # Publish to queue
-        queue.publish_task(request, job_id)
-        
+        job_id = await run_in_threadpool(db.save_brief, brief_data)
+
+        # Hand off to the queue's batcher without waiting for the broker
+        published = queue.publish(request, job_id)
+        published.add_done_callback(lambda future: _publish_done(future, job_id))
+
         return {"job_id": job_id, "status": "queued"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to queue job: {str(e)}")
 
 
+@app.post("/work/batch", response_model=BatchJobResponse)
+async def execute_work_batch(
+    batch: BatchWorkRequest,
+    user_info: tuple[str, bool] = Depends(get_current_user)
+):
+    """
+    Submit many skill runs as one provider-side message batch.
+
+    Batches run at discounted pricing and usually finish within an hour.
+    Poll GET /work/batch/{job_id} for per-item results.
+    """
+    user_id, is_anon = user_info
+    if is_anon:
+        raise HTTPException(status_code=403, detail="Sign in to submit batch jobs.")
+
+    # Rate Limit Check
+    await enforce_rate_limit(user_id, is_anon, "work/batch")
+
+    runner = get_batch_runner()
+    db = get_db()
+    items = [
+        {
+            "skill": r.skill.value,
+            "model": r.model or runner.executor.default_model,
+            "response_schema": r.response_schema,
+        }
+        for r in batch.requests
+    ]
+    job_id = await run_in_threadpool(db.save_brief, {
+        "title": f"Batch of {len(batch.requests)} requests",
+        "product": "Unknown",
+        "audience": "Unknown",
+        "value": "N/A", # Placeholder
+        "description": ", ".join(sorted({item["skill"] for item in items})),
+        "status": "pending",
+        "type": "batch_job",
+        "items": items,
+        "user_id": user_id # Track ownership
+    })
+
+    try:
+        batch_id = await runner.submit(batch.requests)
+    except FileNotFoundError as e:
+        await run_in_threadpool(db.save_brief, {"id": job_id, "status": "failed", "error": str(e)})
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        await run_in_threadpool(db.save_brief, {"id": job_id, "status": "failed", "error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        await run_in_threadpool(db.save_brief, {"id": job_id, "status": "failed", "error": str(e)})
+        raise HTTPException(status_code=500, detail=f"Failed to submit batch: {str(e)}")
+
+    await run_in_threadpool(db.save_brief, {"id": job_id, "status": "processing", "batch_id": batch_id})
+    return BatchJobResponse(job_id=job_id, status="processing")
+
+
+@app.get("/work/batch/{job_id}", response_model=BatchJobResponse)
+async def get_work_batch(
+    job_id: str,
+    user_info: tuple[str, bool] = Depends(get_current_user)
+):
+    """Get a batch job's status, and its per-item WorkResults once complete."""
+    user_id, _ = user_info
+    db = get_db()
+    job = await run_in_threadpool(db.get_brief, job_id)
+
+    if not job or job.get("type") != "batch_job":
+        raise HTTPException(status_code=404, detail="Batch job not found")
+
+    if job.get("user_id") != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this batch job")
+
+    if job["status"] != "processing":
+        results = None
+        if job["status"] == "completed":
+            results = await run_in_threadpool(db.get_batch_results, job_id)
+        return BatchJobResponse(job_id=job_id, status=job["status"], counts=job.get("counts"), results=results)
+
+    try:
+        polled = await get_batch_runner().poll(job["batch_id"], job["items"])
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to check batch: {str(e)}")
+
+    if polled["status"] == "completed":
+        # Results first, so a completed brief always has them
+        await run_in_threadpool(db.save_batch_results, job_id, polled["results"])
+        await run_in_threadpool(db.save_brief, {"id": job_id, "status": "completed", "counts": polled["counts"]})
+    return BatchJobResponse(job_id=job_id, **polled)
+
+
+@app.get("/admin/cache")
+async def cache_stats(admin_id: str = Depends(require_admin)):
+    """Semantic cache hit rate, false-hit audits and index memory."""
+    semantic_cache = get_executor().semantic_cache
+    return {"semantic": semantic_cache.metrics() if semantic_cache is not None else None}
+
+
+@app.get("/admin/admission")
+async def admission_stats(admin_id: str = Depends(require_admin)):
+    """In-flight and queued model calls, rejections, and queue wait histograms by plan."""
+    return get_admission().metrics()
+
+
+@app.get("/admin/routing")
+async def routing_stats(admin_id: str = Depends(require_admin)):
+    """Live per-provider latency (p50/p95), error rates, breaker states and hedge counts."""
+    return get_executor().router.stats()
+
+
 @app.post("/copywriting", response_model=WorkResult)
 async def copywriting(
     task: str, 
+    response: Response,
     context: dict = None, 
     content: str = None,
     user_info: tuple[str, bool] = Depends(get_current_user)
@@ -463,13 +870,14 @@ async def copywriting(
         context=context,
         content=content,
     )
-    return await execute_work(request, user_info)
+    return await execute_work(request, response, user_info)
 
 
 @app.post("/page-cro", response_model=WorkResult)
 async def page_cro(
     task: str, 
     content: str, 
+    response: Response,
     context: dict = None,
     user_info: tuple[str, bool] = Depends(get_current_user)
 ):
@@ -484,12 +892,13 @@ async def page_cro(
         content=content,
         context=context,
     )
-    return await execute_work(request, user_info)
+    return await execute_work(request, response, user_info)
 
 
 @app.post("/email-sequence", response_model=WorkResult)
 async def email_sequence(
     task: str, 
+    response: Response,
     context: dict = None,
     user_info: tuple[str, bool] = Depends(get_current_user)
 ):
@@ -503,7 +912,7 @@ async def email_sequence(
         task=task,
         context=context,
     )
-    return await execute_work(request, user_info)
+    return await execute_work(request, response, user_info)
 
 
 @app.exception_handler(Exception)
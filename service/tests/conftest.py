@@ -6,11 +6,14 @@ from pathlib import Path
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from service.core.executor import get_executor
+from service.core.executor import get_executor, SkillExecutor
+from service.core.cache import MemoryResultCache
+from service.core.semantic_cache import SemanticCache
 from service.core.assets import get_asset_manager
 from service.core.quality import get_quality_guard
 from fastapi.testclient import TestClient
 from service.main import app
+from service.tests.fake_llm import create_app as create_fake_llm, async_client_for
 
 @pytest.fixture
 def api_client():
@@ -27,3 +30,17 @@ def asset_manager():
 @pytest.fixture
 def quality_guard():
     return get_quality_guard()
+
+@pytest.fixture
+def fake_llm():
+    """Offline stand-in for the Anthropic Messages API."""
+    return create_fake_llm()
+
+@pytest.fixture
+def fake_executor(fake_llm):
+    """A fresh executor whose async client talks to the fake LLM."""
+    executor = SkillExecutor()
+    executor.async_anthropic_client = async_client_for(fake_llm)
+    executor.result_cache = MemoryResultCache()
+    executor.semantic_cache = SemanticCache()
+    return executor
@@ -0,0 +1,240 @@
+"""
+Fake Anthropic Messages API backend.
+
+A small FastAPI app that speaks enough of the Messages API for the
+executor to run offline: tests mount it through ``httpx.ASGITransport``
+and the benchmarks under ``scripts/benchmarks`` serve it with uvicorn.
+"""
+
+import asyncio
+import itertools
+import json
+
+import anthropic
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+try:
+    # Newer SDK releases ship their own fork of httpx.
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+DEFAULT_OUTPUT = """## Headline Options
+
+1. Ship projects, not status updates
+2. The project tool your engineers won't ignore
+
+## Alternative Headline Options
+
+- Fewer meetings, more shipping
+- Know where every project stands
+
+## Recommendations
+
+1. Lead with the time saved
+2. Add a customer logo strip under the hero
+"""
+
+
+def create_app(output: str = DEFAULT_OUTPUT, latency: float = 0.0) -> FastAPI:
+    """
+    Build a fake Messages API app.
+
+    Args:
+        output: Text returned by every completion, or a callable taking
+            the request body and returning it
+        latency: Seconds to sleep before answering, to emulate the provider
+    """
+    app = FastAPI()
+    app.state.output = output
+    app.state.latency = latency
+    # Forced tool calls answer with this input (or a callable taking the
+    # request body); None builds an example from the tool's schema
+    app.state.tool_input = None
+    app.state.requests = []
+    app.state.cached_prefixes = set()
+    ids = itertools.count(1)
+
+    def usage_for(body: dict, text: str) -> dict:
+        """Token counts, emulating prompt caching of the system prefix."""
+        system = body.get("system") or []
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system}]
+        breakpoints = [i for i, block in enumerate(system) if block.get("cache_control")]
+        split = breakpoints[-1] + 1 if breakpoints else 0
+        cached = "".join(block["text"] for block in system[:split])
+        uncached = "".join(block["text"] for block in system[split:])
+
+        usage = {
+            "input_tokens": (len(uncached) + len(str(body["messages"]))) // 4,
+            "output_tokens": len(text) // 4,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        }
+        if cached:
+            if cached in app.state.cached_prefixes:
+                usage["cache_read_input_tokens"] = len(cached) // 4
+            else:
+                app.state.cached_prefixes.add(cached)
+                usage["cache_creation_input_tokens"] = len(cached) // 4
+        return usage
+
+    def make_message(body: dict) -> dict:
+        text = app.state.output
+        if callable(text):
+            text = text(body)
+        content = [{"type": "text", "text": text}]
+        stop_reason = "end_turn"
+        choice = body.get("tool_choice") or {}
+        if choice.get("type") == "tool":
+            tool = next(t for t in body["tools"] if t["name"] == choice["name"])
+            tool_input = app.state.tool_input
+            if callable(tool_input):
+                tool_input = tool_input(body)
+            if tool_input is None:
+                tool_input = example_for(tool["input_schema"])
+            text = json.dumps(tool_input)
+            content = [{"type": "tool_use", "id": f"toolu_fake_{next(ids)}", "name": tool["name"], "input": tool_input}]
+            stop_reason = "tool_use"
+        return {
+            "id": f"msg_fake_{next(ids)}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": usage_for(body, text),
+        }
+
+    @app.post("/v1/messages")
+    async def create_message(request: Request):
+        body = await request.json()
+        app.state.requests.append(body)
+        if app.state.latency:
+            await asyncio.sleep(app.state.latency)
+
+        message = make_message(body)
+        if body.get("stream"):
+            return StreamingResponse(_stream_events(message), media_type="text/event-stream")
+        return message
+
+    @app.post("/v1/messages/count_tokens")
+    async def count_tokens(request: Request):
+        body = await request.json()
+        system = body.get("system") or ""
+        if not isinstance(system, str):
+            system = "".join(block["text"] for block in system)
+        return {"input_tokens": (len(system) + len(str(body["messages"]))) // 4}
+
+    # Message Batches: a batch stays in_progress for ``batch_polls`` retrievals,
+    # then ends with every request succeeded.
+    app.state.batches = {}
+    app.state.batch_polls = 0
+
+    def batch_object(batch: dict, base_url: str) -> dict:
+        ended = batch["polls"] > app.state.batch_polls
+        total = len(batch["requests"])
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else total,
+                "succeeded": total if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": "2026-01-01T00:00:00Z",
+            "expires_at": "2026-01-02T00:00:00Z",
+            "ended_at": "2026-01-01T00:01:00Z" if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{base_url}v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    @app.post("/v1/messages/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        batch = {"id": f"msgbatch_fake_{next(ids)}", "requests": body["requests"], "polls": 0}
+        app.state.batches[batch["id"]] = batch
+        return batch_object(batch, str(request.base_url))
+
+    @app.get("/v1/messages/batches/{batch_id}")
+    async def retrieve_batch(batch_id: str, request: Request):
+        batch = app.state.batches[batch_id]
+        batch["polls"] += 1
+        return batch_object(batch, str(request.base_url))
+
+    @app.get("/v1/messages/batches/{batch_id}/results")
+    async def batch_results(batch_id: str):
+        lines = [
+            json.dumps({
+                "custom_id": item["custom_id"],
+                "result": {"type": "succeeded", "message": make_message(item["params"])},
+            })
+            for item in app.state.batches[batch_id]["requests"]
+        ]
+        return PlainTextResponse("\n".join(lines) + "\n", media_type="application/binary")
+
+    return app
+
+
+def example_for(schema: dict, defs: dict = None):
+    """A minimal value matching a JSON Schema, for forced tool calls."""
+    defs = schema.get("$defs", {}) if defs is None else defs
+    if "$ref" in schema:
+        return example_for(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "anyOf" in schema:
+        return example_for(schema["anyOf"][0], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "string")
+    if kind == "object":
+        return {name: example_for(sub, defs) for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [example_for(schema.get("items", {}), defs)]
+    return {"integer": 1, "number": 1.0, "boolean": True, "null": None}.get(kind, "example")
+
+
+async def _stream_events(message: dict):
+    """Replay a finished message as Messages API stream events."""
+    def event(name: str, data: dict) -> str:
+        return f"event: {name}\ndata: {json.dumps({'type': name, **data})}\n\n"
+
+    block = message["content"][0]
+    usage = message["usage"]
+    yield event("message_start", {"message": {
+        **message,
+        "content": [],
+        "stop_reason": None,
+        "usage": {**usage, "output_tokens": 0},
+    }})
+    if block["type"] == "tool_use":
+        text = json.dumps(block["input"])
+        yield event("content_block_start", {"index": 0, "content_block": {**block, "input": {}}})
+        delta = lambda chunk: {"type": "input_json_delta", "partial_json": chunk}
+    else:
+        text = block["text"]
+        yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        delta = lambda chunk: {"type": "text_delta", "text": chunk}
+    for start in range(0, len(text), 16):
+        yield event("content_block_delta", {"index": 0, "delta": delta(text[start:start + 16])})
+        await asyncio.sleep(0)
+    yield event("content_block_stop", {"index": 0})
+    yield event("message_delta", {
+        "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+        "usage": {"output_tokens": usage["output_tokens"]},
+    })
+    yield event("message_stop", {})
+
+
+def async_client_for(app: FastAPI) -> anthropic.AsyncAnthropic:
+    """An AsyncAnthropic client wired to the fake app without a network hop."""
+    return anthropic.AsyncAnthropic(
+        api_key="test-key",
+        base_url="http://fake-llm",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
@@ -0,0 +1,31 @@
+"""
+Static test pages for browser captures.
+
+Serves ``service/tests/pages`` over HTTP so tests and benchmarks can load
+real pages in Chromium without touching the network.
+"""
+
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PAGES_DIR = Path(__file__).parent / "pages"
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_pages() -> tuple[str, ThreadingHTTPServer]:
+    """
+    Start a static server for the test pages in a daemon thread.
+
+    Returns:
+        The base URL and the server; call ``server.shutdown()`` when done
+    """
+    handler = functools.partial(_QuietHandler, directory=str(PAGES_DIR))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server
@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+
+from service.api.schemas import WorkRequest, WorkResult
+from service.core.admission import AdmissionRejected, AdmissionScheduler
+from service.core.cache import MemoryResultCache
+
+
+async def run_order(scheduler, requests, hold=0.0):
+    """Queue requests behind one held slot, then record the order they're admitted."""
+    blocker = await scheduler.acquire("blocker", "starter")
+    order = []
+
+    async def request(tenant, plan):
+        async with scheduler.slot(tenant, plan):
+            order.append(tenant)
+            await asyncio.sleep(hold)
+
+    tasks = []
+    for tenant, plan in requests:
+        tasks.append(asyncio.create_task(request(tenant, plan)))
+        await asyncio.sleep(0)
+    blocker.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_caps_in_flight_requests():
+    scheduler = AdmissionScheduler(capacity=2)
+    peak = 0
+
+    async def request(i):
+        nonlocal peak
+        async with scheduler.slot(f"user-{i}", "starter"):
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(request(i) for i in range(8)))
+
+    assert peak == 2
+    assert scheduler.in_flight == 0
+    assert scheduler.metrics()["admitted"] == {"starter": 8}
+
+
+@pytest.mark.asyncio
+async def test_burst_from_one_tenant_does_not_starve_another():
+    scheduler = AdmissionScheduler(capacity=1, service_time=0.01)
+    requests = [("batch", "starter")] * 6 + [("interactive", "starter")] * 2
+
+    order = await run_order(scheduler, requests)
+
+    # The later tenant's requests interleave instead of waiting for the burst
+    assert order.index("interactive") <= 1
+    assert order[:4].count("interactive") == 2
+
+
+@pytest.mark.asyncio
+async def test_higher_plans_get_a_larger_share():
+    scheduler = AdmissionScheduler(capacity=1, service_time=0.01)
+    requests = [("small", "starter"), ("big", "enterprise")] * 6
+
+    order = await run_order(scheduler, requests)
+
+    # Enterprise weighs 4x starter, so it takes most of the first slots
+    assert order[:5].count("big") == 4
+
+
+@pytest.mark.asyncio
+async def test_sheds_load_past_the_deadline():
+    scheduler = AdmissionScheduler(capacity=1, max_wait=1.0, service_time=0.6)
+    held = await scheduler.acquire("a", "starter")
+    waiting = asyncio.create_task(scheduler.acquire("b", "starter"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await scheduler.acquire("c", "starter")
+
+    assert rejected.value.retry_after == pytest.approx(1.2)
+    assert scheduler.metrics()["rejected"] == {"starter": 1}
+    held.release()
+    (await waiting).release()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_give_up_their_place():
+    scheduler = AdmissionScheduler(capacity=1)
+    held = await scheduler.acquire("a", "starter")
+    waiting = asyncio.create_task(scheduler.acquire("b", "starter"))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.sleep(0)
+
+    assert scheduler.queued == 0
+    held.release()
+    assert scheduler.in_flight == 0
+
+    metrics = scheduler.metrics()
+    assert metrics["wait_seconds"]["starter"]["count"] == 1
+    assert metrics["queue_depth_at_arrival"]["count"] == 2
+
+
+def test_work_returns_429_when_the_queue_is_full(api_client, monkeypatch):
+    from service.main import app
+    from service.core import admission
+    from service.core.auth import get_current_user
+
+    scheduler = AdmissionScheduler(capacity=1, max_wait=0.0)
+    scheduler.in_flight = 1  # Every slot busy
+    monkeypatch.setattr(admission, "_scheduler", scheduler)
+    monkeypatch.setattr("service.main.enforce_rate_limit", lambda *args, **kwargs: asyncio.sleep(0))
+    app.dependency_overrides[get_current_user] = lambda: ("test-user", False)
+    try:
+        response = api_client.post("/work", json={"skill": "copywriting", "task": "Write a headline"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
+    assert scheduler.metrics()["rejected"] == {"starter": 1}
+
+
+@pytest.mark.asyncio
+async def test_fanned_out_requests_hold_a_slot_per_call():
+    scheduler = AdmissionScheduler(capacity=4, max_wait=100, service_time=1.0)
+    wide = await scheduler.acquire("a", "starter", cost=3)
+    assert scheduler.in_flight == 3
+
+    # Two more calls don't fit beside the three in flight
+    queued = asyncio.create_task(scheduler.acquire("b", "starter", cost=2))
+    await asyncio.sleep(0)
+    assert scheduler.queued == 1
+    assert scheduler.estimated_wait(2, 3) == pytest.approx(1.25)
+
+    wide.release()
+    narrow = await queued
+    assert scheduler.in_flight == 2
+    narrow.release()
+
+    # Wider than the instance still runs, alone
+    whole = await scheduler.acquire("c", "starter", cost=10)
+    assert scheduler.in_flight == 4
+    whole.release()
+
+
+def test_check_rejects_without_queuing():
+    scheduler = AdmissionScheduler(capacity=1, max_wait=1.0, service_time=5.0)
+    scheduler.check("a", "starter")  # A free slot
+
+    scheduler.in_flight = 1
+    with pytest.raises(AdmissionRejected):
+        scheduler.check("a", "starter")
+    assert scheduler.queued == 0
+    assert scheduler.metrics()["rejected"] == {"starter": 1}
+
+
+def test_cache_hits_do_not_take_a_slot(api_client, monkeypatch):
+    from service.main import app
+    from service.core import admission
+    from service.core.auth import get_current_user
+    from service.core.executor import get_executor
+
+    scheduler = AdmissionScheduler(capacity=1, max_wait=60)
+    monkeypatch.setattr(admission, "_scheduler", scheduler)
+    monkeypatch.setattr("service.main.enforce_rate_limit", lambda *args, **kwargs: asyncio.sleep(0))
+    app.dependency_overrides[get_current_user] = lambda: ("test-user", False)
+    executor = get_executor()
+    body = {"skill": "copywriting", "task": "Write a headline"}
+    cached = WorkResult(skill="copywriting", output="From the cache")
+    monkeypatch.setattr(executor, "result_cache", MemoryResultCache())
+    executor.result_cache.set(executor.cache_key(WorkRequest(**body)), cached)
+    try:
+        response = api_client.post("/work", json=body)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "HIT"
+    assert scheduler.metrics()["admitted"] == {}
@@ -0,0 +1,68 @@
+from service.core.analyzer import OutputAnalyzer, analyze_output
+
+OUTPUT = """Intro line
+### Lead
+text
+## Headlines
+### Primary
+Ship faster
+### Secondary
+Meet less
+
+## Alternative Headline Options
+1. One
+2. Two
+7. Seven
+12) Twelve
+- Dash
+
+## Comparison
+| Plan | Price |
+|------|-------|
+| Pro  | $10   |
+
+```python
+## not a heading
+print("hi")
+```
+
+## Next Steps
+1. First
+6. Sixth
+"""
+
+
+def test_sections_and_subsections():
+    analysis = analyze_output(OUTPUT)
+
+    assert list(analysis.sections) == ["Lead", "Headlines", "Alternative Headline Options", "Comparison", "Next Steps"]
+    assert analysis.sections["Lead"] == "text"
+    assert analysis.subsections["Headlines"] == {"Primary": "Ship faster", "Secondary": "Meet less"}
+    assert "## not a heading" in analysis.sections["Comparison"]
+
+
+def test_lists_beyond_five_items():
+    """Numbered items are recognised at any number, with . or ) markers."""
+    analysis = analyze_output(OUTPUT)
+
+    assert analysis.alternatives == ["One", "Two", "Seven", "Twelve", "Dash"]
+    assert analysis.recommendations == ["First", "Sixth"]
+
+
+def test_tables_and_code_blocks():
+    analysis = analyze_output(OUTPUT)
+
+    assert analysis.tables == [[["Plan", "Price"], ["Pro", "$10"]]]
+    assert analysis.code_blocks == [{"language": "python", "code": '## not a heading\nprint("hi")'}]
+
+
+def test_streamed_chunks_match_single_pass():
+    """Arbitrary chunking yields the same analysis and emits each section once."""
+    analyzer = OutputAnalyzer()
+    streamed = []
+    for start in range(0, len(OUTPUT), 7):
+        streamed.extend(analyzer.feed(OUTPUT[start:start + 7]))
+    streamed.extend(analyzer.finish())
+
+    assert analyzer.analysis == analyze_output(OUTPUT)
+    assert dict(streamed) == analyzer.analysis.sections
@@ -25,9 +25,63 @@ def test_skill_execution_mock_structure(executor):
         context={"product": "TestWidget"}
     )
     
+    system = executor.build_system(request.skill)
+    assert "## Skill Framework" in system[-1]["text"]
+    assert system[-1]["cache_control"] == {"type": "ephemeral"}
+
     prompt = executor.build_prompt(request)
-    assert "## Skill Framework" in prompt
+    assert "## Skill Framework" not in prompt
     assert "Write a headline" in prompt
     assert "**product**: TestWidget" in prompt
 
 # Note: Integration tests calling real LLMs should be marked or separate
+
+
+def test_work_stream_sse(api_client, fake_executor):
+    """POST /work/stream sends deltas, sections and a final result as SSE."""
+    from unittest.mock import patch
+    from service.main import app
+    from service.core.auth import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: ("test-user", False)
+    try:
+        with patch("service.main.get_limiter") as mock_limiter, \
+                patch("service.main.get_executor", return_value=fake_executor):
+            mock_limiter.return_value.check_limit.return_value = True
+            response = api_client.post("/work/stream", json={
+                "skill": "copywriting",
+                "task": "Write a headline for TaskFlow",
+            })
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events[0] == "event: delta"
+    assert "event: section" in events
+    assert events[-1] == "event: result"
+
+
+def test_work_stream_rejects_fanned_out_requests(api_client, fake_executor, fake_llm):
+    """n_best can't be streamed, so it is refused before any quota is charged."""
+    from unittest.mock import patch
+    from service.main import app
+    from service.core.auth import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: ("test-user", False)
+    try:
+        with patch("service.main.get_limiter") as mock_limiter, \
+                patch("service.main.get_executor", return_value=fake_executor):
+            response = api_client.post("/work/stream", json={
+                "skill": "copywriting",
+                "task": "Write a headline for TaskFlow",
+                "n_best": 3,
+            })
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 400
+    assert "/work" in response.json()["detail"]
+    mock_limiter.return_value.check_limit.assert_not_called()
+    assert fake_llm.state.requests == []
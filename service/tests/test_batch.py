@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import patch
+from service.api.schemas import SkillName, WorkRequest
+from service.core.batch import BatchRunner
+from service.core.db import loaded, storable
+
+
+class FakeDB:
+    """Dict-backed stand-in for the Firestore brief store, with its encoding."""
+
+    def __init__(self):
+        self.briefs = {}
+        self.results = {}
+
+    def save_brief(self, data):
+        job_id = data.get("id") or f"job{len(self.briefs) + 1}"
+        self.briefs.setdefault(job_id, {}).update(storable(data))
+        return job_id
+
+    def get_brief(self, job_id):
+        brief = self.briefs.get(job_id)
+        return {**loaded(brief), "id": job_id} if brief else None
+
+    def save_batch_results(self, job_id, results):
+        self.results.setdefault(job_id, {}).update({result["index"]: storable(result) for result in results})
+
+    def get_batch_results(self, job_id):
+        return [loaded(result) for _, result in sorted(self.results.get(job_id, {}).items())]
+
+
+def make_requests():
+    return [
+        WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow"),
+        WorkRequest(skill=SkillName.PAID_ADS, task="Write ad copy for TaskFlow"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_runner_submits_and_collects(fake_executor, fake_llm):
+    fake_llm.state.batch_polls = 1
+    runner = BatchRunner(fake_executor)
+    requests = make_requests()
+    items = [{"skill": r.skill.value, "model": "claude-test"} for r in requests]
+
+    batch_id = await runner.submit(requests)
+    pending = await runner.poll(batch_id, items)
+    done = await runner.poll(batch_id, items)
+
+    submitted = fake_llm.state.batches[batch_id]["requests"]
+    assert [r["custom_id"] for r in submitted] == ["0", "1"]
+    assert "system" in submitted[0]["params"]
+    assert pending["status"] == "processing" and pending["results"] is None
+    assert done["status"] == "completed"
+    assert [r["result"]["skill"] for r in done["results"]] == ["copywriting", "paid-ads"]
+    assert done["results"][0]["result"]["metadata"]["model"] == "claude-test"
+
+
+@pytest.mark.asyncio
+async def test_batch_runner_rejects_minimax(fake_executor):
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow", model="MiniMax-M2")
+    with pytest.raises(ValueError):
+        await BatchRunner(fake_executor).submit([request])
+
+
+def test_batch_endpoints_track_job(api_client, fake_executor, fake_llm):
+    from service.main import app
+    from service.core.auth import get_current_user
+
+    fake_llm.state.output = "## Budget\n\n| Channel | Spend |\n| --- | --- |\n| Search | $500 |\n"
+    db = FakeDB()
+    app.dependency_overrides[get_current_user] = lambda: ("test-user", False)
+    try:
+        with patch("service.main.get_limiter") as mock_limiter, \
+                patch("service.main.get_db", return_value=db), \
+                patch("service.main.get_batch_runner", return_value=BatchRunner(fake_executor)):
+            mock_limiter.return_value.check_limit.return_value = True
+            submitted = api_client.post("/work/batch", json={
+                "requests": [r.model_dump(mode="json") for r in make_requests()]
+            }).json()
+            status = api_client.get(f"/work/batch/{submitted['job_id']}").json()
+            stored = api_client.get(f"/work/batch/{submitted['job_id']}").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert submitted["status"] == "processing"
+    assert status["status"] == "completed"
+    assert [item["status"] for item in status["results"]] == ["succeeded", "succeeded"]
+    assert db.briefs[submitted["job_id"]]["status"] == "completed"
+    # Results live beside the brief, not in it
+    assert "results" not in db.briefs[submitted["job_id"]]
+    assert stored["results"] == status["results"]
+    # Tables survive the round trip through the stored encoding
+    assert stored["results"][0]["result"]["tables"] == [[["Channel", "Spend"], ["Search", "$500"]]]
+
+
+@pytest.mark.asyncio
+async def test_batch_results_honor_each_response_schema(fake_executor, fake_llm):
+    schema = {
+        "type": "object",
+        "properties": {"headline": {"type": "string"}},
+        "required": ["headline"],
+    }
+    requests = [
+        WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow", response_schema=schema),
+        WorkRequest(skill=SkillName.PAID_ADS, task="Write ad copy for TaskFlow"),
+    ]
+    items = [
+        {"skill": r.skill.value, "model": "claude-test", "response_schema": r.response_schema}
+        for r in requests
+    ]
+    runner = BatchRunner(fake_executor)
+
+    done = await runner.poll(await runner.submit(requests), items)
+
+    structured, plain = (item["result"] for item in done["results"])
+    assert structured["structured"] == {"headline": "example"}
+    assert plain["structured"] is None
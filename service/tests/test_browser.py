@@ -0,0 +1,262 @@
+import asyncio
+import base64
+import time
+
+import pytest
+
+from service.core.browser import BrowserPool, BrowserPoolBusy, CaptureCache, PageCapture, PageCapturer, html_fingerprint
+from service.tests.static_pages import serve_pages
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def close(self):
+        self.browser.open_contexts -= 1
+
+
+class FakeBrowser:
+    launched = 0
+
+    def __init__(self):
+        FakeBrowser.launched += 1
+        self.open_contexts = 0
+        self.peak_contexts = 0
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **options):
+        self.open_contexts += 1
+        self.peak_contexts = max(self.peak_contexts, self.open_contexts)
+        return FakeContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+async def launch_fake():
+    return FakeBrowser()
+
+
+@pytest.mark.asyncio
+async def test_pool_bounds_concurrent_contexts():
+    pool = BrowserPool(size=2, contexts_per_browser=2, launch=launch_fake)
+    await pool.start()
+    active = 0
+    peak = 0
+
+    async def use():
+        nonlocal active, peak
+        async with pool.context():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(use() for _ in range(10)))
+
+    assert peak == 4
+    assert all(p.browser.peak_contexts <= 2 for p in pool._browsers)
+
+
+@pytest.mark.asyncio
+async def test_pool_recycles_browsers_after_max_pages():
+    pool = BrowserPool(size=1, max_pages=3, launch=launch_fake)
+    await pool.start()
+    first = pool._browsers[0].browser
+
+    for _ in range(3):
+        async with pool.context():
+            pass
+    await asyncio.gather(*pool._recycling)
+
+    assert first.closed
+    assert pool._browsers[0].browser is not first
+    assert pool.recycled == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_replaces_crashed_browser():
+    pool = BrowserPool(size=1, launch=launch_fake)
+    await pool.start()
+    pool._browsers[0].browser.closed = True
+
+    async with pool.context() as ctx:
+        assert ctx.browser.is_connected()
+
+
+@pytest.mark.asyncio
+async def test_caller_leaving_during_a_relaunch_does_not_launch_another():
+    async def slow_launch():
+        await asyncio.sleep(0.05)
+        return FakeBrowser()
+
+    pool = BrowserPool(size=1, max_pages=1, launch=slow_launch)
+    await pool.start()
+    launched = FakeBrowser.launched
+
+    async def use():
+        async with pool.context():
+            pass
+
+    # The first caller retires the browser; the second queues behind the
+    # relaunch and gives up, which would retire the same browser again
+    first = asyncio.create_task(use())
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(use())
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    await asyncio.gather(first, waiter, return_exceptions=True)
+    await asyncio.gather(*pool._recycling)
+
+    assert FakeBrowser.launched == launched + 1
+    assert pool.recycled == 1
+    assert pool._browsers[0].browser.is_connected()
+
+
+@pytest.mark.asyncio
+async def test_failed_relaunch_keeps_capacity_and_the_finished_capture():
+    failing = True
+
+    async def flaky_launch():
+        if failing and pool.started:
+            raise RuntimeError("Chromium failed to start")
+        return FakeBrowser()
+
+    pool = BrowserPool(size=1, contexts_per_browser=1, max_pages=1, acquire_timeout=0.05, launch=flaky_launch)
+    await pool.start()
+
+    for _ in range(3):
+        # Each release retires the browser and the relaunch fails, off the request path
+        async with pool.context() as ctx:
+            assert ctx.browser.is_connected()
+        await asyncio.gather(*pool._recycling)
+
+    assert pool.recycled == 0
+    failing = False
+    async with pool.context():
+        pass
+    await asyncio.gather(*pool._recycling)
+    assert pool.recycled == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_rejects_when_queue_full_or_wait_times_out():
+    pool = BrowserPool(size=1, contexts_per_browser=1, max_waiters=1, acquire_timeout=0.05, launch=launch_fake)
+    await pool.start()
+    entered = asyncio.Event()
+    release = asyncio.Event()
+
+    async def hold():
+        async with pool.context():
+            entered.set()
+            await release.wait()
+
+    async def enter():
+        async with pool.context():
+            pass
+
+    holder = asyncio.create_task(hold())
+    await entered.wait()
+    waiter = asyncio.create_task(enter())
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(BrowserPoolBusy, match="queued"):
+        await enter()
+    with pytest.raises(BrowserPoolBusy, match="Timed out"):
+        await waiter
+
+    release.set()
+    await holder
+
+
+class FakeCapturePool:
+    def __init__(self):
+        self.renders = 0
+
+    async def capture(self, url, viewport=None, timeout=20.0):
+        self.renders += 1
+        now = time.time()
+        return PageCapture(
+            url=url, width=1280, height=800, title="TaskFlow", text="Ship projects on time",
+            outline="h1: Ship projects on time", screenshot="", captured_at=now, validated_at=now,
+        )
+
+
+def test_page_text_can_cut_the_visible_text():
+    capture = PageCapture(
+        url="https://taskflow.example", width=1280, height=800, title="TaskFlow",
+        text="Ship projects on time. " * 100, outline="h1: Ship projects on time", screenshot="",
+    )
+
+    full = capture.page_text()
+    cut = capture.page_text(max_text_chars=50)
+
+    assert capture.text in full
+    assert "h1: Ship projects on time" in cut
+    assert len(cut) < len(full) and "more chars]" in cut
+
+
+def make_capturer(html):
+    pool = FakeCapturePool()
+    capturer = PageCapturer(pool, CaptureCache(), revalidate_after=0)
+
+    async def fingerprint(url):
+        return html_fingerprint(html["value"])
+
+    capturer.fingerprint = fingerprint
+    return capturer, pool
+
+
+@pytest.mark.asyncio
+async def test_capture_reused_while_page_is_unchanged():
+    html = {"value": '<h1>TaskFlow</h1><script nonce="a">track()</script>'}
+    capturer, pool = make_capturer(html)
+
+    _, first = await capturer.capture("https://example.com")
+    html["value"] = '<h1>TaskFlow</h1>\n<script nonce="b">track(2)</script>'
+    _, second = await capturer.capture("https://example.com")
+    html["value"] = "<h1>TaskFlow 2.0</h1>"
+    _, third = await capturer.capture("https://example.com")
+
+    assert (first, second, third) == ("miss", "revalidated", "miss")
+    assert pool.renders == 2
+
+
+@pytest.mark.asyncio
+async def test_capture_cache_keys_on_viewport_and_expires():
+    capturer, pool = make_capturer({"value": "<h1>TaskFlow</h1>"})
+    capturer.revalidate_after = 3600
+
+    await capturer.capture("https://example.com")
+    _, hit = await capturer.capture("https://example.com")
+    _, mobile = await capturer.capture("https://example.com", {"width": 390, "height": 844})
+    capturer.cache.ttl = 0
+    _, expired = await capturer.capture("https://example.com")
+
+    assert (hit, mobile, expired) == ("hit", "miss", "miss")
+    assert pool.renders == 3
+
+
+@pytest.mark.asyncio
+async def test_screenshot_of_static_page():
+    pool = BrowserPool(size=1)
+    try:
+        await pool.start()
+    except Exception as e:
+        pytest.skip(f"Chromium not available: {e}")
+
+    base_url, server = serve_pages()
+    try:
+        capture = await pool.capture(f"{base_url}/landing.html")
+    finally:
+        server.shutdown()
+        await pool.close()
+
+    assert base64.b64decode(capture.screenshot)[:2] == b"\xff\xd8"  # JPEG
+    assert "Ship projects on time" in capture.text
+    assert "h1: Ship projects on time, without the chaos" in capture.outline
+    assert "button: Create account" in capture.outline
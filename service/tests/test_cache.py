@@ -0,0 +1,123 @@
+import time
+import pytest
+from service.api.schemas import SkillName, WorkRequest, WorkResult
+from service.core.cache import MemoryResultCache, SQLiteResultCache, request_key
+
+
+def make_result(output: str = "## Done\nok") -> WorkResult:
+    return WorkResult(skill=SkillName.COPYWRITING, output=output)
+
+
+def test_request_key_is_canonical():
+    """Context key order and surrounding whitespace don't change the key."""
+    a = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline ", context={"a": 1, "b": " x"})
+    b = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline", context={"b": "x", "a": 1})
+    c = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline", context={"b": "y", "a": 1})
+
+    assert request_key(a, "h1", "m") == request_key(b, "h1", "m")
+    assert request_key(a, "h1", "m") != request_key(c, "h1", "m")
+    assert request_key(a, "h1", "m") != request_key(a, "h2", "m")
+    assert request_key(a, "h1", "m") != request_key(a, "h1", "other-model")
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryResultCache(max_entries=2, ttl=60)
+    cache.set("a", make_result("a"))
+    cache.set("b", make_result("b"))
+    cache.get("a")  # a is now most recently used
+    cache.set("c", make_result("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").output == "a"
+
+    expiring = MemoryResultCache(ttl=0.01)
+    expiring.set("a", make_result())
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteResultCache(path).set("k", make_result("shared"))
+
+    assert SQLiteResultCache(path).get("k").output == "shared"
+    assert SQLiteResultCache(path).get("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_execute_cached_hits_and_bypasses(fake_executor, fake_llm):
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+
+    _, first = await fake_executor.execute_cached(request)
+    _, second = await fake_executor.execute_cached(request)
+    _, third = await fake_executor.execute_cached(request.model_copy(update={"use_cache": False}))
+
+    assert (first, second, third) == ("miss", "hit", "bypass")
+    assert len(fake_llm.state.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_skill_edit_invalidates_cache(fake_executor, fake_llm, tmp_path):
+    skill_file = tmp_path / "copywriting" / "SKILL.md"
+    skill_file.parent.mkdir()
+    skill_file.write_text("# Copywriting v1")
+    fake_executor.skills_path = tmp_path
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+
+    await fake_executor.execute_cached(request)
+    skill_file.write_text("# Copywriting v2, edited")
+    _, status = await fake_executor.execute_cached(request)
+
+    assert status == "miss"
+    assert "v2" in fake_llm.state.requests[-1]["system"][-1]["text"]
+
+
+@pytest.mark.asyncio
+async def test_guard_runs_only_on_misses_with_the_params_sent(fake_executor, fake_llm):
+    from contextlib import asynccontextmanager
+
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+    seen = []
+    built = 0
+    build = fake_executor._build_params_async
+
+    async def counting_build(*args):
+        nonlocal built
+        built += 1
+        return await build(*args)
+
+    fake_executor._build_params_async = counting_build
+
+    @asynccontextmanager
+    async def guard(guarded, params):
+        seen.append(params)
+        yield
+
+    _, first = await fake_executor.execute_cached(request, guard=guard)
+    _, second = await fake_executor.execute_cached(request, guard=guard)
+
+    assert (first, second) == ("miss", "hit")
+    assert len(seen) == 1
+    assert built == 1
+    assert seen[0]["messages"] == fake_llm.state.requests[0]["messages"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_async_and_pruning(tmp_path):
+    import sqlite3
+
+    cache = SQLiteResultCache(str(tmp_path / "cache.sqlite3"), ttl=0.2, prune_interval=3600)
+    await cache.set_async("old", make_result("old"))
+    time.sleep(0.25)
+    await cache.set_async("new", make_result("new"))
+
+    assert await cache.get_async("old") is None
+    rows = sqlite3.connect(cache.path).execute("SELECT key FROM results ORDER BY key").fetchall()
+    # Pruned on the first write only, not again until the interval passes
+    assert rows == [("new",), ("old",)]
+
+    cache.prune_interval = 0
+    time.sleep(0.25)
+    cache.set("newest", make_result("newest"))
+    rows = sqlite3.connect(cache.path).execute("SELECT key FROM results").fetchall()
+    assert rows == [("newest",)]
@@ -0,0 +1,64 @@
+import pytest
+
+from service.api.schemas import SkillName, WorkRequest, WorkResult
+from service.core.cascade import heuristic_score
+
+
+def test_heuristic_penalizes_truncated_unstructured_answers():
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write three headline options for TaskFlow")
+    good = WorkResult(
+        skill=SkillName.COPYWRITING,
+        output="## Headlines\n\n" + "Ship projects on time. " * 40,
+        sections={"Headlines": "..."},
+        alternatives=["Ship projects on time"],
+        metadata={"stop_reason": "end_turn"},
+    )
+    truncated = WorkResult(
+        skill=SkillName.COPYWRITING,
+        output="Ship projects",
+        metadata={"stop_reason": "max_tokens"},
+    )
+
+    assert heuristic_score(request, good) == 100
+    assert heuristic_score(request, truncated) < 30
+
+
+@pytest.mark.asyncio
+async def test_cascade_keeps_good_cheap_result(fake_executor, fake_llm):
+    request = WorkRequest(
+        skill=SkillName.COPYWRITING,
+        task="Write headline options for TaskFlow",
+        cascade=True,
+    )
+    fake_executor.cascade.thresholds["copywriting"] = 50
+
+    result = await fake_executor.execute_async(request)
+
+    assert [r["model"] for r in fake_llm.state.requests] == [fake_executor.cascade.cheap_model]
+    cascade = result.metadata["cascade"]
+    assert cascade["escalated"] is False
+    assert cascade["tiers"][0]["latency_ms"] >= 0
+    assert cascade["escalation_rate"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_cascade_escalates_below_threshold(fake_executor, fake_llm):
+    fake_llm.state.output = "Sorry, I can't help with that."
+    request = WorkRequest(
+        skill=SkillName.COPYWRITING,
+        task="Write headline options for TaskFlow",
+        model="claude-opus-4-1",
+        cascade=True,
+    )
+
+    result = await fake_executor.execute_async(request)
+
+    assert [r["model"] for r in fake_llm.state.requests] == [
+        fake_executor.cascade.cheap_model,
+        "claude-opus-4-1",
+    ]
+    cascade = result.metadata["cascade"]
+    assert cascade["escalated"] is True
+    assert len(cascade["tiers"]) == 2
+    assert cascade["escalation_rate"] == 1.0
+    assert result.metadata["model"] == "claude-opus-4-1"
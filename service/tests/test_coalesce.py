@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from service.api.schemas import SkillName, WorkRequest
+from service.core.coalesce import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call(fake_executor, fake_llm):
+    fake_llm.state.latency = 0.1
+    fake_executor.result_cache = None  # coalescing works without a cache
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+
+    outcomes = await asyncio.gather(*(fake_executor.execute_cached(request) for _ in range(5)))
+
+    assert len(fake_llm.state.requests) == 1
+    assert sorted(status for _, status in outcomes) == ["coalesced"] * 4 + ["miss"]
+    assert len({result.output for result, _ in outcomes}) == 1
+    assert len(fake_executor.inflight) == 0
+
+
+@pytest.mark.asyncio
+async def test_failures_propagate_to_every_waiter():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream down")
+
+    outcomes = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    assert calls == 1
+    assert all(isinstance(o, ValueError) for o in outcomes)
+
+
+@pytest.mark.asyncio
+async def test_waiter_cap_and_cancelled_waiter():
+    flight = SingleFlight(max_waiters=1)
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(flight.do("k", work))
+    overflow = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == ("done", True)
+    assert await overflow == ("done", False)
+    assert calls == 2
@@ -0,0 +1,103 @@
+import pytest
+
+from service.api.schemas import SkillName, WorkRequest
+from service.core.content import ContentReducer, looks_like_html, reduce_html, split_content
+from service.core.tokens import estimate_text_tokens
+from service.tests.static_pages import PAGES_DIR
+
+NOISE = (
+    "<script>window.dataLayer = [];</script>"
+    "<style>.hero { color: red; }</style>"
+    '<svg viewBox="0 0 24 24"><path d="M12 2L2 7l10 5 10-5-10-5z"/></svg>'
+    '<img src="https://www.facebook.com/tr?id=123&ev=PageView" width="1" height="1">'
+    '<div class="wrapper"><div class="inner"><span></span></div></div>'
+)
+
+
+def landing_page() -> str:
+    return (PAGES_DIR / "landing.html").read_text().replace("</body>", NOISE + "</body>")
+
+
+def test_reduce_html_keeps_structure_and_drops_noise():
+    reduced = reduce_html(landing_page())
+
+    assert "<title>TaskFlow - Project management for small teams</title>" in reduced
+    assert "<h1>Ship projects on time, without the chaos</h1>" in reduced
+    assert '<a href="#signup">Start free trial</a>' in reduced
+    assert '<input type="email" placeholder="Work email">' in reduced
+    assert '<button type="submit">Create account</button>' in reduced
+    for noise in ("dataLayer", "color: red", "<path", "facebook.com", "<div", "<span"):
+        assert noise not in reduced
+
+
+def test_reduce_html_is_idempotent():
+    reduced = reduce_html(landing_page())
+
+    assert reduce_html(reduced) == reduced
+
+
+def test_reducer_passes_plain_text_through():
+    reduced = ContentReducer().reduce("Ship projects on time. Start your free trial today.")
+
+    assert not reduced.reduced
+    assert reduced.compression_ratio == 1.0
+
+
+def test_markdown_that_quotes_a_tag_is_not_treated_as_html():
+    markdown = (
+        "### Findings\n\n- The <h1> headline is vague\n- The CTA <button> is below the fold\n\n"
+        "| Issue | Fix |\n|---|---|\n| Headline | Lead with the outcome |\n"
+    )
+
+    assert not looks_like_html(markdown)
+    assert ContentReducer().reduce(markdown).text == markdown
+    assert looks_like_html("<div><h1>Ship faster</h1><p>Plan sprints in minutes.</p><a href='/signup'>Start</a></div>")
+
+
+def test_split_content_prefers_section_boundaries():
+    content = "\n".join(f"<section>\n<h2>Section {i}</h2>\n<p>{'copy ' * 40}</p></section>" for i in range(6))
+
+    pieces = split_content(content, max_tokens=200)
+
+    assert len(pieces) > 1
+    assert all(piece.startswith("<section>") for piece in pieces)
+    assert "".join(pieces).count("<h2>") == 6
+
+
+@pytest.mark.asyncio
+async def test_prompt_uses_reduced_content_and_reports_ratio(fake_executor, fake_llm):
+    request = WorkRequest(skill=SkillName.PAGE_CRO, task="Audit this landing page", content=landing_page())
+
+    result = await fake_executor.execute_async(request)
+
+    prompt = fake_llm.state.requests[-1]["messages"][0]["content"]
+    assert "dataLayer" not in prompt
+    assert "Start free trial" in prompt
+    assert result.metadata["content_compression_ratio"] > 1.5
+
+
+@pytest.mark.asyncio
+async def test_oversized_content_is_mapped_and_reduced(fake_executor, fake_llm):
+    fake_executor.content_token_budget = 200
+    content = "\n".join(f"<section>\n<h2>Section {i}</h2>\n<p>{'copy ' * 100}</p></section>" for i in range(4))
+    request = WorkRequest(skill=SkillName.PAGE_CRO, task="Audit this landing page", content=content)
+
+    result = await fake_executor.execute_async(request)
+
+    chunks = result.metadata["map_reduce_chunks"]
+    assert chunks > 1
+    assert len(fake_llm.state.requests) == chunks + 1
+    merge_prompt = fake_llm.state.requests[-1]["messages"][0]["content"]
+    assert f"## Part {chunks} of {chunks}" in merge_prompt
+
+
+@pytest.mark.asyncio
+async def test_merge_keeps_partial_markdown_and_fits_the_budget(fake_executor, fake_llm):
+    fake_executor.content_token_budget = 200
+    partials = ["### Findings\n\n- The <h1> headline is vague\n- Weak CTA\n" + "detail " * 400] * 3
+
+    merged = fake_executor._merge_input(partials)
+
+    assert "- The <h1> headline is vague\n- Weak CTA" in merged
+    assert merged.count("more chars]") == 3
+    assert estimate_text_tokens(merged) < 200 * 1.2
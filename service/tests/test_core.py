@@ -40,10 +40,15 @@ async def test_evaluator_structure(quality_guard):
     # Mocking the executor response for the unit test
     class MockResult:
         output = '{"score": 95, "status": "approved", "critique": "Great work", "issues": [], "refined_prompt": null}'
+        structured = {"score": 95, "status": "approved", "critique": "Great work", "issues": [], "refined_prompt": None}
     
-    # Monkeypatch the executor.execute method temporarily
-    original_execute = quality_guard.executor.execute
-    quality_guard.executor.execute = lambda req: MockResult()
+    async def mock_execute_async(req):
+        assert req.response_schema["properties"]["status"]["enum"] == ["approved", "rejected", "needs_revision"]
+        return MockResult()
+
+    # Monkeypatch the executor.execute_async method temporarily
+    original_execute = quality_guard.executor.execute_async
+    quality_guard.executor.execute_async = mock_execute_async
     
     result = await quality_guard.evaluate_asset(
         "image", 
@@ -55,4 +60,4 @@ async def test_evaluator_structure(quality_guard):
     assert result["score"] == 95
     
     # Restore
-    quality_guard.executor.execute = original_execute
+    quality_guard.executor.execute_async = original_execute
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from service.api.schemas import SkillName, WorkRequest
+
+
+@pytest.mark.asyncio
+async def test_execute_async_parses_output(fake_executor, fake_llm):
+    """execute_async goes through the async client and parses the response."""
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+
+    result = await fake_executor.execute_async(request)
+
+    assert result.skill == SkillName.COPYWRITING
+    assert "Headline Options" in result.sections
+    assert result.alternatives == ["Fewer meetings, more shipping", "Know where every project stands"]
+    assert result.metadata["output_tokens"] > 0
+    assert len(fake_llm.state.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_async_runs_concurrently(fake_executor, fake_llm):
+    """Concurrent calls overlap instead of queueing behind each other."""
+    fake_llm.state.latency = 0.2
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    results = await asyncio.gather(*(fake_executor.execute_async(request) for _ in range(10)))
+    elapsed = loop.time() - started
+
+    assert len(results) == 10
+    assert elapsed < 1.0
+
+
+def test_minimax_requires_key(fake_executor):
+    """Selecting a MiniMax model without a key is a configuration error."""
+    fake_executor.async_minimax_client = None
+    with pytest.raises(ValueError):
+        fake_executor._select_client("MiniMax-M2.1-lightning", use_async=True)
+
+
+@pytest.mark.asyncio
+async def test_stream_async_emits_sections_before_result(fake_executor, fake_llm):
+    """Sections are emitted as they complete, and the result comes last."""
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+
+    events = [event async for event in fake_executor.stream_async(request)]
+    kinds = [kind for kind, _ in events]
+
+    assert kinds[0] == "delta"
+    assert kinds[-1] == "result"
+    assert "".join(data for kind, data in events if kind == "delta") == fake_llm.state.output
+
+    sections = [data for kind, data in events if kind == "section"]
+    result = events[-1][1]
+    assert [title for title, _ in sections] == list(result.sections)
+    assert dict(sections) == result.sections
+    assert result.metadata["output_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_skill_prefix_is_cached_across_requests(fake_executor, fake_llm):
+    """The skill framework is sent as a cached system block, reported in metadata."""
+    first = await fake_executor.execute_async(
+        WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+    )
+    second = await fake_executor.execute_async(
+        WorkRequest(skill=SkillName.COPYWRITING, task="Write a subheadline for TaskFlow")
+    )
+
+    system = fake_llm.state.requests[0]["system"]
+    assert system == fake_llm.state.requests[1]["system"]
+    assert first.metadata["cache_creation_input_tokens"] > 0
+    assert first.metadata["cache_read_input_tokens"] == 0
+    assert second.metadata["cache_read_input_tokens"] == first.metadata["cache_creation_input_tokens"]
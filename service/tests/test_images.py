@@ -0,0 +1,98 @@
+import asyncio
+import base64
+import io
+
+import pytest
+
+from service.api.schemas import SkillName, WorkRequest
+from service.core.images import ImageError, ImagePreprocessor, detect_media_type
+
+# 1x1 transparent PNG
+PNG_1PX = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+
+def encode(image, format="PNG") -> str:
+    buffer = io.BytesIO()
+    image.save(buffer, format=format)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def test_detect_media_type():
+    assert detect_media_type(base64.b64decode(PNG_1PX)) == "image/png"
+    assert detect_media_type(b"\xff\xd8\xff\xe0rest") == "image/jpeg"
+    assert detect_media_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    with pytest.raises(ImageError):
+        detect_media_type(b"<html>")
+
+
+def test_prepare_rejects_invalid_base64():
+    with pytest.raises(ImageError):
+        ImagePreprocessor().prepare("not base64!")
+
+
+def test_prepare_is_memoized_and_accepts_data_urls():
+    preprocessor = ImagePreprocessor()
+
+    first = preprocessor.prepare(PNG_1PX)
+    second = preprocessor.prepare(f"data:image/png;base64,{PNG_1PX}")
+
+    assert first is second
+    assert first[0].media_type == "image/png"
+
+
+def test_executor_sends_detected_media_type(fake_executor):
+    request = WorkRequest(skill=SkillName.PAGE_CRO, task="Audit this landing page", image_data=PNG_1PX)
+
+    content = fake_executor._build_params(request, "claude-sonnet-4-5-20250929")["messages"][0]["content"]
+
+    assert content[0]["source"]["media_type"] == "image/png"
+    assert content[-1]["type"] == "text"
+
+
+def test_large_image_is_downscaled_and_reencoded():
+    Image = pytest.importorskip("PIL.Image")
+    image = Image.new("RGB", (3000, 2000), "white")
+
+    [prepared] = ImagePreprocessor().prepare(encode(image))
+
+    assert prepared.media_type == "image/jpeg"
+    assert max(prepared.width, prepared.height) <= 1568
+    assert prepared.width * prepared.height <= 1_150_000
+
+
+def test_full_page_capture_is_tiled_without_duplicates():
+    Image = pytest.importorskip("PIL.Image")
+    image = Image.new("RGB", (1000, 4000), "white")
+    for y in range(1000, 2000):
+        for x in range(0, 1000, 50):
+            image.putpixel((x, y), (0, 0, 0))
+
+    tiles = ImagePreprocessor(max_tiles=4).prepare(encode(image))
+
+    # Four 1000px tiles; the three blank ones are identical
+    assert len(tiles) == 2
+    assert all(tile.height <= tile.width for tile in tiles)
+
+
+def test_very_tall_capture_is_covered_by_taller_tiles():
+    Image = pytest.importorskip("PIL.Image")
+    image = Image.new("RGB", (1280, 10000), "white")
+    for y in range(9000, 10000):
+        image.putpixel((640, y), (0, 0, 0))
+
+    tiles = ImagePreprocessor(max_tiles=4).prepare(encode(image))
+
+    # The bottom of the page survives as its own tile
+    assert len(tiles) == 2
+    assert all(tile.width * tile.height <= 1_150_000 for tile in tiles)
+
+
+def test_prepare_async_reuses_prepared_images():
+    preprocessor = ImagePreprocessor()
+
+    first = asyncio.run(preprocessor.prepare_async(PNG_1PX))
+
+    assert preprocessor.prepare(PNG_1PX) is first
+    assert asyncio.run(preprocessor.prepare_async(PNG_1PX)) is first
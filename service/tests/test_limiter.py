@@ -1,5 +1,7 @@
-import pytest
+import asyncio
 import os
+
+import pytest
 from unittest.mock import Mock, patch, MagicMock
 
 # Skip tests that require GCP credentials if not available
@@ -115,3 +117,288 @@ class TestRateLimiterIntegration:
         # This test would require actual Firestore
         # and would verify that counts persist across requests
         assert limiter.db is not None
+
+
+class SlowBackend:
+    """A shared MemoryBackend with a round-trip delay, to widen race windows."""
+
+    def __init__(self, delay=0.001):
+        from service.core.limiter import MemoryBackend
+        self.inner = MemoryBackend()
+        self.delay = delay
+        self.leases = 0
+
+    def lease(self, key, window, units, limit):
+        import time
+        time.sleep(self.delay)
+        self.leases += 1
+        return self.inner.lease(key, window, units, limit)
+
+    def release(self, key, window, units):
+        self.inner.release(key, window, units)
+
+
+class TestLeasedQuota:
+    """Local buckets leasing from a shared counter."""
+
+    def test_lease_serves_requests_locally(self):
+        from service.core.limiter import RateLimiter
+
+        backend = SlowBackend(delay=0)
+        limiter = RateLimiter(backend=backend, lease_size=10)
+
+        assert all(limiter.take("user", 40, "day") for _ in range(10))
+        assert backend.leases == 1
+        assert backend.inner.used("user", "day") == 10
+
+    def test_idle_leases_are_handed_back(self):
+        from service.core.limiter import RateLimiter
+
+        backend = SlowBackend(delay=0)
+        first = RateLimiter(backend=backend, lease_size=10)
+        second = RateLimiter(backend=backend, lease_size=10)
+
+        assert first.take("user", 40, "day")
+        assert second.take("user", 40, "day")
+        assert backend.inner.used("user", "day") == 20
+
+        assert first.reconcile(idle_after=0) == 9
+        assert backend.inner.used("user", "day") == 11
+
+    def test_refusal_is_cached_locally(self):
+        from service.core.limiter import RateLimiter
+
+        backend = SlowBackend(delay=0)
+        limiter = RateLimiter(backend=backend, deny_for=60)
+
+        assert limiter.take("anon", 1, "day")
+        assert not limiter.take("anon", 1, "day")
+        leases = backend.leases
+        assert not limiter.take("anon", 1, "day")
+        assert backend.leases == leases
+
+    def test_no_over_admission_at_1k_rps(self):
+        """Four instances share 20 users' quota under 1,000 requests in about a second."""
+        import time
+        from collections import Counter
+        from concurrent.futures import ThreadPoolExecutor
+        from threading import Lock
+        from service.core.limiter import RateLimiter
+
+        backend = SlowBackend(delay=0.001)
+        instances = [RateLimiter(backend=backend, lease_size=8, deny_for=0) for _ in range(4)]
+        limit, users, total = 40, 20, 1000
+        admitted = Counter()
+        counted = Lock()
+        started = time.perf_counter()
+
+        def request(i):
+            # Arrivals spread evenly over one second
+            time.sleep(max(0.0, started + i / total - time.perf_counter()))
+            user = f"user-{i % users}"
+            # Each user's requests rotate across the instances
+            if instances[(i // users) % len(instances)].take(user, limit, "day"):
+                with counted:
+                    admitted[user] += 1
+
+        with ThreadPoolExecutor(max_workers=64) as pool:
+            list(pool.map(request, range(total)))
+
+        assert max(admitted.values()) <= limit
+        assert backend.leases < total / 2
+        for limiter in instances:
+            limiter.reconcile(idle_after=0)
+        for user in admitted:
+            assert backend.inner.used(user, "day") == admitted[user]
+
+
+def redis_client():
+    """fakeredis with Lua support, else the redis-server at REDIS_URL, else None."""
+    try:
+        import fakeredis
+        import lupa  # noqa: F401 - fakeredis needs it to run scripts
+        return fakeredis.FakeRedis()
+    except ImportError:
+        pass
+    try:
+        import redis
+        client = redis.Redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379"))
+        client.ping()
+        return client
+    except Exception:
+        return None
+
+
+@pytest.fixture(params=["memory", "redis"])
+def rate_checker(request):
+    from service.core.limiter import MemoryRateChecker, RedisRateChecker
+
+    if request.param == "memory":
+        return MemoryRateChecker()
+    client = redis_client()
+    if client is None:
+        pytest.skip("Neither fakeredis (with lupa) nor a redis-server is available")
+    for key in client.scan_iter("rate:{test-*"):
+        client.delete(key)
+    return RedisRateChecker(client)
+
+
+def test_redis_release_leaves_an_expired_counter_alone():
+    from service.core.limiter import RedisBackend
+
+    client = redis_client()
+    if client is None:
+        pytest.skip("Neither fakeredis (with lupa) nor a redis-server is available")
+    backend = RedisBackend(client=client)
+    key = backend._key("test-release", "day")
+    client.delete(key)
+
+    assert backend.lease("test-release", "day", 4, 10) == 4
+    backend.release("test-release", "day", 3)
+    assert int(client.get(key)) == 1
+
+    client.delete(key)  # Expired while the units were leased
+    backend.release("test-release", "day", 3)
+    assert client.get(key) is None
+
+
+class TestRateChecks:
+    """Sliding-window and GCRA checks, against memory and Redis."""
+
+    def test_gcra_allows_burst_then_denies(self, rate_checker):
+        from service.core.limiter import Rate
+
+        rate = Rate("minute", 60, 60, "gcra", burst=3)
+        decisions = [rate_checker.check([("rate:{test-gcra}:work:minute", rate)]) for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert decisions[0].remaining["minute"] == 2
+        assert decisions[3].exceeded == ["minute"]
+        assert 0 < decisions[3].retry_after <= 1.0
+
+    def test_window_caps_requests(self, rate_checker):
+        from service.core.limiter import Rate
+
+        rate = Rate("hour", 3, 3600)
+        decisions = [rate_checker.check([("rate:{test-window}:work:hour", rate)]) for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert decisions[2].remaining["hour"] == 0
+        assert decisions[3].retry_after > 0
+
+    def test_denied_batch_records_nothing(self, rate_checker):
+        from service.core.limiter import Rate
+
+        minute = Rate("minute", 60, 60, "gcra", burst=5)
+        day = Rate("day", 1, 86400)
+        checks = [("rate:{test-batch}:work:minute", minute), ("rate:{test-batch}:work:day", day)]
+
+        assert rate_checker.check(checks).allowed
+        denied = rate_checker.check(checks)
+        assert not denied.allowed and denied.exceeded == ["day"]
+        # The minute limit wasn't charged for the denied request
+        assert denied.remaining["minute"] == 3
+        assert rate_checker.check(checks[:1]).remaining["minute"] == 3
+
+
+class TestRateWindowsOverTime:
+    """Time-dependent behaviour, with the memory checker's clock."""
+
+    def make_checker(self):
+        from service.core.limiter import MemoryRateChecker
+
+        clock = {"now": 1_000_000.0}
+        return MemoryRateChecker(clock=lambda: clock["now"]), clock
+
+    def test_gcra_refills_at_the_emission_rate(self):
+        from service.core.limiter import Rate
+
+        checker, clock = self.make_checker()
+        rate = Rate("minute", 60, 60, "gcra", burst=1)
+        key = "rate:{u}:work:minute"
+
+        assert checker.check([(key, rate)]).allowed
+        denied = checker.check([(key, rate)])
+        assert not denied.allowed and denied.retry_after == pytest.approx(1.0)
+        clock["now"] += 1.0
+        assert checker.check([(key, rate)]).allowed
+
+    def test_sliding_window_weights_previous_window(self):
+        from service.core.limiter import Rate
+
+        checker, clock = self.make_checker()
+        rate = Rate("hour", 10, 3600)
+        key = "rate:{u}:work:hour"
+        clock["now"] = 3600 * 500  # Start of a window
+
+        for _ in range(10):
+            assert checker.check([(key, rate)]).allowed
+        # Halfway into the next window, half the previous count still applies
+        clock["now"] += 3600 * 1.5
+        results = [checker.check([(key, rate)]).allowed for _ in range(6)]
+        assert results == [True] * 5 + [False]
+
+    def test_plan_rates_are_per_endpoint(self):
+        checker, _ = self.make_checker()
+
+        # Anonymous users get one request at a time per endpoint
+        assert checker.check_plan("anonymous", "anon-1", "work").allowed
+        assert not checker.check_plan("anonymous", "anon-1", "work").allowed
+        assert checker.check_plan("anonymous", "anon-1", "work/stream").allowed
+
+
+def test_rate_limited_request_gets_retry_after(api_client, monkeypatch):
+    from service.main import app
+    from service.core.auth import get_current_user
+    from service.core import limiter
+
+    checker = limiter.MemoryRateChecker()
+    monkeypatch.setattr(limiter, "_rate_checker", checker)
+    monkeypatch.setattr(limiter, "_rate_checker_loaded", True)
+    checker.check_plan("anonymous", "anon-429", "work")
+    app.dependency_overrides[get_current_user] = lambda: ("anon-429", True)
+    try:
+        response = api_client.post("/work", json={"skill": "copywriting", "task": "Write a headline"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert "minute" in response.json()["detail"]
+
+
+def test_plan_lookup_is_cached_including_the_fallback(monkeypatch):
+    from service import main
+
+    class Enforcement:
+        lookups = 0
+
+        def load_tenant(self, user_id):
+            Enforcement.lookups += 1
+            if user_id == "no-tenant":
+                raise LookupError(user_id)
+            return {"plan": "growth"}
+
+    enforcement = Enforcement()
+    monkeypatch.setattr(main, "get_enforcement", lambda: enforcement)
+    monkeypatch.setattr(main, "_plans", {})
+
+    async def resolve():
+        return [await main.user_plan(user, False) for user in ("paid", "paid", "no-tenant", "no-tenant")]
+
+    assert asyncio.run(resolve()) == ["growth", "growth", "starter", "starter"]
+    assert Enforcement.lookups == 2
+
+
+def test_cost_beyond_the_burst_is_charged_as_the_whole_burst():
+    from service.core import limiter
+
+    now = [1000.0]
+    checker = limiter.MemoryRateChecker(clock=lambda: now[0])
+
+    first = checker.check_plan("starter", "fan-out", "work", cost=9)
+    second = checker.check_plan("starter", "fan-out", "work", cost=1)
+
+    assert first.allowed
+    assert first.remaining["hour"] == 300 - 9
+    assert not second.allowed and second.exceeded == ["minute"]
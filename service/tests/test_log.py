@@ -0,0 +1,83 @@
+import io
+import json
+import logging
+import threading
+
+from service.core import log
+from service.core.log import JsonFormatter, configure_logging, log_payload, request_id, shutdown_logging
+
+
+def make_record(message="hello", **extra):
+    record = logging.makeLogRecord({"name": "test", "levelno": logging.INFO, "levelname": "INFO", "msg": message})
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_adds_request_id_and_fields():
+    entry = json.loads(JsonFormatter().format(make_record(request_id="abc", skill="copywriting", tokens=12)))
+
+    assert entry["severity"] == "INFO"
+    assert entry["message"] == "hello"
+    assert entry["request_id"] == "abc"
+    assert entry["skill"] == "copywriting"
+    assert entry["tokens"] == 12
+
+
+def test_json_formatter_truncates_long_fields():
+    formatter = JsonFormatter(max_field_chars=50)
+    entry = json.loads(formatter.format(make_record("x" * 80, payload=[{"text": "y" * 200}])))
+
+    assert entry["message"].startswith("x" * 50)
+    assert entry["message"].endswith("[30 more chars]")
+    assert isinstance(entry["payload"], str)
+    assert "more chars]" in entry["payload"]
+
+
+def test_records_are_formatted_off_thread_with_caller_request_id():
+    stream = io.StringIO()
+    threads = []
+
+    class Recording(JsonFormatter):
+        def format(self, record):
+            threads.append(threading.current_thread())
+            return super().format(record)
+
+    handler = configure_logging(level="INFO", stream=stream)
+    handler_output = log._listener.handlers[0]
+    handler_output.setFormatter(Recording())
+    logger = logging.getLogger("service.tests.log")
+    token = request_id.set("req-1")
+    try:
+        logger.info("work done", extra={"skill": "page-cro"})
+    finally:
+        request_id.reset(token)
+        shutdown_logging()
+        logging.getLogger().removeHandler(handler)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["request_id"] == "req-1"
+    assert entry["skill"] == "page-cro"
+    assert threads and threads[0] is not threading.current_thread()
+
+
+def test_log_payload_respects_level_and_sampling(monkeypatch):
+    logger = logging.getLogger("service.tests.payload")
+    logger.setLevel(logging.INFO)
+    try:
+        assert not log_payload(logger, "response", {"big": "payload"})
+
+        logger.setLevel(logging.DEBUG)
+        monkeypatch.setattr(log, "_payload_sample_rate", 0.0)
+        assert not log_payload(logger, "response", {"big": "payload"})
+
+        monkeypatch.setattr(log, "_payload_sample_rate", 1.0)
+        assert log_payload(logger, "response", {"big": "payload"})
+    finally:
+        logger.setLevel(logging.NOTSET)
+
+
+def test_api_echoes_request_id(api_client):
+    response = api_client.get("/", headers={"X-Request-ID": "trace-123"})
+
+    assert response.headers["X-Request-ID"] == "trace-123"
+    assert api_client.get("/").headers["X-Request-ID"]
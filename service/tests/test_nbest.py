@@ -0,0 +1,73 @@
+import pytest
+
+from service.api.schemas import SkillName, WorkRequest
+from service.core.nbest import ANGLES, dedupe, variants
+
+
+def test_dedupe_merges_near_identical_options_and_counts_votes():
+    merged = dedupe([
+        ["Ship projects, not status updates", "Fewer meetings, more shipping"],
+        ["Ship projects not status updates!", "Know where every project stands"],
+    ])
+
+    assert merged == [
+        ("Ship projects, not status updates", 2),
+        ("Fewer meetings, more shipping", 1),
+        ("Know where every project stands", 1),
+    ]
+
+
+def test_variants_keep_the_task_first_then_add_angles():
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write headline options for TaskFlow", n_best=3)
+
+    tasks = [variant.task for variant in variants(request)]
+
+    assert tasks[0] == request.task
+    assert ANGLES[0] in tasks[1] and ANGLES[1] in tasks[2]
+
+
+def completion_for_angle(body):
+    """Different alternatives per angle."""
+    prompt = body["messages"][0]["content"]
+    angle = next((i + 1 for i, angle in enumerate(ANGLES) if angle in prompt), 0)
+    return (
+        "## Alternative Headline Options\n\n"
+        "- Ship projects, not status updates\n"
+        f"- Headline written from angle {angle}\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_n_best_runs_concurrently_and_ranks_merged_alternatives(fake_executor, fake_llm):
+    fake_llm.state.output = completion_for_angle
+    fake_llm.state.tool_input = {"ranking": [3, 1]}
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write headline options for TaskFlow", n_best=3)
+
+    result = await fake_executor.execute_async(request)
+
+    assert len(fake_llm.state.requests) == 4
+    # Judge put option 3 first, then 1; the unranked one keeps its place after
+    assert result.alternatives == [
+        "Headline written from angle 1",
+        "Ship projects, not status updates",
+        "Headline written from angle 0",
+        "Headline written from angle 2",
+    ]
+    assert result.metadata["n_best"] == {
+        "completions": 3,
+        "failed": 0,
+        "candidates": 6,
+        "unique": 4,
+        "ranked_by": "judge",
+    }
+
+
+@pytest.mark.asyncio
+async def test_n_best_falls_back_to_frequency_order(fake_executor, fake_llm):
+    fake_llm.state.tool_input = {"ranking": []}
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write headline options for TaskFlow", n_best=2)
+
+    result = await fake_executor.execute_async(request)
+
+    assert result.metadata["n_best"]["ranked_by"] == "frequency"
+    assert result.alternatives == ["Fewer meetings, more shipping", "Know where every project stands"]
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from service.api.schemas import WorkRequest, WorkResult
+from service.core.queue import MemoryTaskQueue, SQLiteTaskQueue
+from service.worker import JobRunner
+
+
+def work_request():
+    return WorkRequest(skill="copywriting", task="Write a headline")
+
+
+class Collector:
+    """A subscriber callback that keeps every message it is handed."""
+
+    def __init__(self):
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def __call__(self, message):
+        with self.lock:
+            self.messages.append(message)
+        return message
+
+    def job_ids(self):
+        return [json.loads(message.data)["job_id"] for message in self.messages]
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.messages) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.messages) >= count
+
+
+@pytest.fixture
+def sqlite_queue(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "tasks.sqlite3"), poll_interval=0.01, ack_deadline=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_memory_queue_delivers_in_order_under_flow_control():
+    async def run():
+        queue = MemoryTaskQueue()
+        for i in range(5):
+            assert queue.publish(work_request(), f"job-{i}").result()
+        collector = Collector()
+        subscription = queue.subscribe(collector, max_messages=2)
+        await asyncio.sleep(0.05)
+        # Only two outstanding until one is settled
+        assert collector.job_ids() == ["job-0", "job-1"]
+
+        collector.messages[0].ack()
+        collector.messages[1].nack()
+        await asyncio.sleep(0.05)
+        subscription.cancel()
+        return collector.job_ids()
+
+    assert asyncio.run(run()) == ["job-0", "job-1", "job-2", "job-3"]
+
+
+def test_memory_queue_drops_messages_after_max_attempts():
+    async def run():
+        queue = MemoryTaskQueue(max_attempts=2)
+        queue.publish(work_request(), "job-bad")
+        collector = Collector()
+        subscription = queue.subscribe(lambda message: (collector(message), message.nack()))
+        await asyncio.sleep(0.05)
+        subscription.cancel()
+        return collector, queue
+
+    collector, queue = asyncio.run(run())
+    assert collector.job_ids() == ["job-bad", "job-bad"]
+    assert queue.dead == 1
+
+
+def test_sqlite_publishes_a_burst_in_batches(sqlite_queue):
+    futures = [sqlite_queue.publish(work_request(), f"job-{i}") for i in range(250)]
+    message_ids = [future.result(5) for future in futures]
+
+    assert len(set(message_ids)) == 250
+    assert sqlite_queue.counts() == {"ready": 250}
+
+
+def test_sqlite_ack_removes_and_nack_redelivers(sqlite_queue):
+    for job_id in ("job-a", "job-b"):
+        sqlite_queue.publish(work_request(), job_id).result(5)
+
+    collector = Collector()
+    subscription = sqlite_queue.subscribe(collector, max_messages=1)
+    assert collector.wait_for(1)
+    collector.messages[0].ack()
+    assert collector.wait_for(2)
+    collector.messages[1].nack()
+    assert collector.wait_for(3)
+    subscription.cancel()
+
+    assert collector.job_ids() == ["job-a", "job-b", "job-b"]
+    # Second delivery hits max_attempts, so its nack sets it aside
+    collector.messages[2].nack()
+    assert sqlite_queue.counts() == {"dead": 1}
+
+
+def test_sqlite_expired_lease_is_claimed_again(sqlite_queue):
+    sqlite_queue.publish(work_request(), "job-crash").result(5)
+    sqlite_queue.ack_deadline = 0.05
+
+    first = sqlite_queue.claim()
+    assert sqlite_queue.claim() is None
+    time.sleep(0.06)
+    second = sqlite_queue.claim()
+
+    assert second[0] == first[0]
+    assert second[2] == 2
+
+
+def test_sqlite_queue_is_shared_across_connections(sqlite_queue, tmp_path):
+    other = SQLiteTaskQueue(sqlite_queue.path)
+    try:
+        other.publish(work_request(), "job-elsewhere").result(5)
+    finally:
+        other.close()
+
+    row = sqlite_queue.claim()
+    assert json.loads(row[1])["job_id"] == "job-elsewhere"
+
+
+class InstantExecutor:
+    async def execute_async(self, request):
+        return WorkResult(skill=request.skill.value, output="Ship faster", metadata={})
+
+
+class RecordingDB:
+    def __init__(self):
+        self.writes = []
+
+    def save_brief(self, brief):
+        self.writes.append(dict(brief))
+        return brief["id"]
+
+
+def test_sqlite_draining_runner_hands_jobs_back_without_an_attempt(sqlite_queue):
+    sqlite_queue.publish(work_request(), "job-waiting").result(5)
+    runner = JobRunner(executor=InstantExecutor(), db=RecordingDB()).start()
+    runner.closing = True
+    try:
+        subscription = sqlite_queue.subscribe(runner.submit, max_messages=4)
+        time.sleep(0.5)
+        subscription.cancel()
+    finally:
+        runner.stop()
+
+    assert sqlite_queue.counts() == {"ready": 1}
+    row = sqlite_queue.claim()
+    assert json.loads(row[1])["job_id"] == "job-waiting"
+    assert row[2] == 1
+
+
+def test_memory_draining_runner_leaves_jobs_queued():
+    async def run():
+        queue = MemoryTaskQueue(max_attempts=2)
+        for i in range(3):
+            queue.publish(work_request(), f"job-{i}")
+        runner = JobRunner(executor=InstantExecutor(), db=RecordingDB()).start()
+        runner.closing = True
+        try:
+            subscription = queue.subscribe(runner.submit)
+            await asyncio.sleep(0.1)
+            subscription.cancel()
+        finally:
+            runner.stop()
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.depth == 3
+    assert queue.dead == 0
+
+
+def test_worker_runs_jobs_from_the_sqlite_queue(sqlite_queue):
+    runner = JobRunner(executor=InstantExecutor(), db=RecordingDB(), concurrency=4).start()
+    try:
+        for i in range(10):
+            sqlite_queue.publish(work_request(), f"job-{i}")
+        subscription = sqlite_queue.subscribe(runner.submit, max_messages=4)
+        deadline = time.monotonic() + 5
+        while runner.completed < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        runner.drain(timeout=5)
+        subscription.cancel()
+    finally:
+        runner.stop()
+
+    assert runner.completed == 10
+    assert sqlite_queue.counts() == {}
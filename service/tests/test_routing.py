@@ -0,0 +1,156 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from service.api.schemas import SkillName, WorkRequest
+from service.core.routing import CircuitBreaker, CircuitOpenError, ProviderRouter, Route, RouteStats
+
+
+class FakeClient:
+    """Async client whose messages.create sleeps, then returns or raises."""
+
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+        self.messages = SimpleNamespace(create=self.create)
+
+    async def create(self, **params):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return SimpleNamespace(provider=self.name, model=params["model"])
+
+
+def make_router(clients, **kwargs):
+    return ProviderRouter(
+        clients.get,
+        alternates={"claude-sonnet-4-5": ["minimax:MiniMax-M2"]},
+        **kwargs,
+    )
+
+
+def test_route_stats_quantiles_and_error_rate():
+    stats = RouteStats()
+    for ms in range(1, 101):
+        stats.record(ms / 1000, True)
+    stats.record(5.0, False)
+
+    assert stats.quantile(0.5) == pytest.approx(0.051)
+    assert stats.quantile(0.95) == pytest.approx(0.096)
+    assert stats.error_rate == pytest.approx(1 / 101)
+
+
+def test_breaker_opens_then_allows_one_trial():
+    breaker = CircuitBreaker(failures=2, cooldown=0.05)
+    breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_rejects_calls():
+    failing = FakeClient("anthropic", error=RuntimeError("overloaded"))
+    router = make_router({"anthropic": failing}, breaker_failures=2)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await router.create({"model": "claude-sonnet-4-5"})
+    with pytest.raises(CircuitOpenError):
+        await router.create({"model": "claude-sonnet-4-5"})
+
+    assert failing.calls == 2
+    assert router.stats()["routes"]["anthropic:claude-sonnet-4-5"]["breaker"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_when_primary_is_slow_and_loser_is_cancelled():
+    slow = FakeClient("anthropic", delay=1.0)
+    fast = FakeClient("minimax", delay=0.01)
+    router = make_router({"anthropic": slow, "minimax": fast}, policy="hedge", hedge_delay=0.05)
+
+    started = time.perf_counter()
+    message, route, hedged = await router.create({"model": "claude-sonnet-4-5"})
+
+    assert time.perf_counter() - started < 0.5
+    assert hedged and route == Route("minimax", "MiniMax-M2")
+    assert message.model == "MiniMax-M2"
+    await asyncio.sleep(0)
+    assert slow.cancelled == 1
+    assert router.stats()["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_cancels_the_primary_before_the_hedge():
+    slow = FakeClient("anthropic", delay=1.0)
+    fast = FakeClient("minimax", delay=0.01)
+    router = make_router({"anthropic": slow, "minimax": fast}, policy="hedge", hedge_delay=0.5)
+
+    caller = asyncio.create_task(router.create({"model": "claude-sonnet-4-5"}))
+    await asyncio.sleep(0.05)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    await asyncio.sleep(0)
+
+    assert slow.cancelled == 1
+    assert fast.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_fastest_policy_prefers_lower_p50():
+    router = make_router(
+        {"anthropic": FakeClient("anthropic"), "minimax": FakeClient("minimax")},
+        policy="fastest",
+        min_samples=3,
+    )
+    for _ in range(3):
+        router._stats_for(Route("anthropic", "claude-sonnet-4-5")).record(0.8, True)
+        router._stats_for(Route("minimax", "MiniMax-M2")).record(0.2, True)
+
+    assert router.candidates("claude-sonnet-4-5")[0] == Route("minimax", "MiniMax-M2")
+
+
+@pytest.mark.asyncio
+async def test_executor_reports_provider(fake_executor):
+    result = await fake_executor.execute_async(
+        WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+    )
+
+    assert result.metadata["provider"] == "anthropic"
+    assert fake_executor.router.stats()["routes"]
+
+
+def test_routing_stats_require_admin(api_client, monkeypatch):
+    from service.main import app
+    from service.core.auth import get_current_user
+
+    monkeypatch.setenv("ADMIN_USER_IDS", "ops-user")
+    app.dependency_overrides[get_current_user] = lambda: ("test-user", False)
+    try:
+        assert api_client.get("/admin/routing").status_code == 403
+        app.dependency_overrides[get_current_user] = lambda: ("ops-user", False)
+        response = api_client.get("/admin/routing")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["policy"] == "primary"
@@ -0,0 +1,73 @@
+import pytest
+
+from service.api.schemas import SkillName, WorkRequest, WorkResult
+from service.core.semantic_cache import SemanticCache, cosine, embed, partition_key
+
+
+def request(task: str, **kwargs) -> WorkRequest:
+    return WorkRequest(skill=SkillName.COPYWRITING, task=task, semantic_cache=True, **kwargs)
+
+
+def test_rewording_is_similar_but_a_new_brief_is_not():
+    headline = embed("Write a headline for TaskFlow, a project management tool")
+
+    assert cosine(headline, embed("Give me headlines for TaskFlow, a project management tool")) > 0.95
+    assert cosine(headline, embed("Write an onboarding email sequence for TaskFlow")) < 0.5
+
+
+def test_lookup_requires_same_numbers_and_names():
+    cache = SemanticCache()
+    original = request("Write three headline options for TaskFlow")
+    partition = partition_key(original, "h", "m")
+    cache.add("k1", original, partition, WorkResult(skill=SkillName.COPYWRITING, output="cached"))
+
+    assert cache.lookup(request("Give me three headline options for TaskFlow"), partition).output == "cached"
+    assert cache.lookup(request("Write five headline options for TaskFlow"), partition) is None
+    assert cache.lookup(request("Write three headline options for ShipIt"), partition) is None
+    assert cache.lookup(request("Give me three headline options for TaskFlow"), "other-partition") is None
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1 and metrics["lookups"] == 4
+    assert metrics["index_bytes"] > 0
+
+
+def test_per_skill_threshold_and_eviction():
+    cache = SemanticCache(thresholds={"copywriting": 0.99}, max_entries=1)
+    first = request("Write a landing page headline for TaskFlow")
+    partition = partition_key(first, "h", "m")
+    cache.add("k1", first, partition, WorkResult(skill=SkillName.COPYWRITING, output="first"))
+
+    assert cache.lookup(request("Write a landing page hero headline for TaskFlow"), partition) is None
+
+    cache.add("k2", request("Write a pricing page headline for TaskFlow"), partition, WorkResult(skill=SkillName.COPYWRITING, output="second"))
+    assert cache.metrics()["entries"] == 1
+    assert cache.lookup(first, partition) is None
+
+
+@pytest.mark.asyncio
+async def test_execute_cached_serves_reworded_request(fake_executor, fake_llm):
+    first, status = await fake_executor.execute_cached(request("Write a headline for TaskFlow"))
+    assert status == "miss"
+
+    reworded, status = await fake_executor.execute_cached(request("Give me headlines for TaskFlow"))
+    assert status == "semantic"
+    assert reworded.output == first.output
+    assert len(fake_llm.state.requests) == 1
+
+    # Without opting in the reworded request runs fresh
+    _, status = await fake_executor.execute_cached(
+        WorkRequest(skill=SkillName.COPYWRITING, task="Please give me headlines for TaskFlow")
+    )
+    assert status == "miss"
+
+
+@pytest.mark.asyncio
+async def test_audited_hit_runs_fresh_and_is_compared(fake_executor, fake_llm):
+    fake_executor.semantic_cache.audit_rate = 1.0
+    await fake_executor.execute_cached(request("Write a headline for TaskFlow"))
+
+    _, status = await fake_executor.execute_cached(request("Give me headlines for TaskFlow"))
+
+    assert status == "miss"
+    metrics = fake_executor.semantic_cache.metrics()
+    assert metrics["audits"] == 1
+    assert metrics["false_hits"] == 0
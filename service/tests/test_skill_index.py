@@ -0,0 +1,70 @@
+from service.api.schemas import SkillName, WorkRequest
+from service.core.skill_index import SkillIndex, chunk_markdown
+
+
+def make_skill(root, name="copywriting"):
+    skill_dir = root / name
+    (skill_dir / "rules").mkdir(parents=True)
+    (skill_dir / "SKILL.md").write_text(
+        "---\nname: test\n---\n\n# Skill\n\nIntro.\n\n"
+        "## Headlines\n\nWrite benefit-driven headlines.\n\n"
+        "## Pricing Pages\n\nAnchor plans against each other.\n"
+    )
+    (skill_dir / "rules" / "email.md").write_text(
+        "# Email\n\n## Subject Lines\n\nKeep subject lines under fifty characters.\n"
+    )
+    (skill_dir / "rules" / "ads.md").write_text(
+        "# Ads\n\n## Targeting\n\nNarrow audiences by intent.\n"
+    )
+    return skill_dir
+
+
+def test_chunk_markdown_splits_on_headings_outside_fences():
+    chunks = chunk_markdown("# A\n\ntext\n\n## B\n\n```\n# not a heading\n```\n", "SKILL.md")
+
+    assert [c.heading for c in chunks] == ["A", "A > B"]
+    assert "# not a heading" in chunks[1].text
+
+
+def test_assemble_adds_only_relevant_support_chunks(tmp_path):
+    skill_dir = make_skill(tmp_path)
+    index = SkillIndex(budget=6000)
+
+    framework, references = index.assemble(skill_dir, "Write email subject lines")
+
+    assert framework == (skill_dir / "SKILL.md").read_text()
+    assert "fifty characters" in references
+    assert "Targeting" not in references
+
+
+def test_assemble_slices_skill_md_over_budget(tmp_path):
+    skill_dir = make_skill(tmp_path)
+    index = SkillIndex(budget=30)
+
+    framework, _ = index.assemble(skill_dir, "pricing page plans")
+
+    assert "name: test" in framework  # first chunk is always kept
+    assert "Anchor plans" in framework
+    assert "Headlines" not in framework
+
+
+def test_support_file_edit_changes_fingerprint(tmp_path):
+    skill_dir = make_skill(tmp_path)
+    index = SkillIndex()
+    before = index.get(skill_dir).fingerprint
+
+    (skill_dir / "rules" / "new.md").write_text("# New rule\n")
+
+    assert index.get(skill_dir).fingerprint != before
+
+
+def test_executor_system_includes_references(fake_executor, tmp_path):
+    make_skill(tmp_path)
+    fake_executor.skills_path = tmp_path
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Draft email subject lines")
+
+    system = fake_executor._build_params(request, "claude-sonnet-4-5-20250929")["system"]
+
+    assert system[1]["cache_control"] == {"type": "ephemeral"}
+    assert system[2]["text"].startswith("## Skill References")
+    assert "rules/email.md" in system[2]["text"]
@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+import pytest
+
+from service.core.skill_index import SkillIndex
+from service.core.skill_registry import SkillRegistry, parse_front_matter
+
+
+def write_skill(root, name="copywriting", description="Write copy", body="## Headlines\n\nLead with the benefit.\n"):
+    skill_dir = root / name
+    skill_dir.mkdir(exist_ok=True)
+    path = skill_dir / "SKILL.md"
+    path.write_text(f"---\nname: {name}\ndescription: {description}\ntags: [content, writing]\n---\n\n# Skill\n\n{body}")
+    return path
+
+
+def bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_parse_front_matter_handles_lists_and_blocks():
+    meta = parse_front_matter("---\nname: x\ntags: [a, b]\ndescription: |\n  Two\n  lines\n---\n# X\n")
+
+    assert meta == {"name": "x", "tags": ["a", "b"], "description": "Two\nlines"}
+
+
+def test_compile_builds_prefix_hash_and_headings(tmp_path):
+    write_skill(tmp_path)
+    registry = SkillRegistry(tmp_path, SkillIndex())
+
+    compiled = registry.get("copywriting")
+
+    assert compiled.description == "Write copy"
+    assert compiled.tags == ("content", "writing")
+    assert compiled.framework_block["text"].startswith("## Skill Framework")
+    assert [heading for heading, _ in compiled.headings] == ["Skill", "Skill > Headlines"]
+    assert compiled.tokens > 0
+
+
+def test_refresh_swaps_changed_skills_only(tmp_path):
+    path = write_skill(tmp_path)
+    write_skill(tmp_path, "page-cro", "Audit pages")
+    registry = SkillRegistry(tmp_path, SkillIndex())
+    registry.load()
+    before = registry.get("copywriting")
+    untouched = registry.get("page-cro")
+
+    write_skill(tmp_path, description="Write conversion copy")
+    bump_mtime(path)
+
+    assert registry.refresh() == ["copywriting"]
+    assert registry.get("copywriting").description == "Write conversion copy"
+    assert registry.get("copywriting").hash != before.hash
+    assert registry.get("page-cro") is untouched
+    # Callers that already held the old entry keep a consistent view of it
+    assert before.description == "Write copy"
+
+
+def test_catalog_groups_by_category(tmp_path):
+    write_skill(tmp_path)
+    write_skill(tmp_path, "brand-voice", "Define a voice")
+    registry = SkillRegistry(tmp_path, SkillIndex())
+    registry.load()
+
+    catalog = registry.catalog()
+
+    assert catalog["skills"]["writing"] == {"copywriting": "Write copy"}
+    assert catalog["skills"]["other"] == {"brand-voice": "Define a voice"}
+    assert catalog["metadata"]["copywriting"]["headings"] == ["Skill", "Skill > Headlines"]
+
+
+@pytest.mark.asyncio
+async def test_watcher_reloads_edits(tmp_path):
+    path = write_skill(tmp_path)
+    index = SkillIndex()
+    registry = SkillRegistry(tmp_path, index, poll_interval=0.01)
+    registry.load()
+    registry.start()
+    try:
+        assert not index.revalidate
+        write_skill(tmp_path, description="Edited")
+        bump_mtime(path)
+        for _ in range(200):
+            if registry.get("copywriting").description == "Edited":
+                break
+            await asyncio.sleep(0.01)
+        assert registry.get("copywriting").description == "Edited"
+        assert registry.reloads == 1
+    finally:
+        await registry.stop()
+    assert index.revalidate
@@ -0,0 +1,64 @@
+from typing import Literal
+
+import pytest
+from pydantic import BaseModel
+
+from service.api.schemas import SkillName, WorkRequest
+from service.core.structured import StructuredOutputError, validate
+
+
+class Headlines(BaseModel):
+    headlines: list[str]
+    tone: Literal["bold", "calm"]
+
+
+def test_request_accepts_a_pydantic_model():
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write headlines for TaskFlow", response_schema=Headlines)
+
+    assert request.response_schema == Headlines.model_json_schema()
+
+
+def test_validate_reports_where_output_is_wrong():
+    schema = Headlines.model_json_schema()
+    validate({"headlines": ["Ship faster"], "tone": "bold"}, schema)
+
+    with pytest.raises(StructuredOutputError, match="tone"):
+        validate({"headlines": ["Ship faster"]}, schema)
+    with pytest.raises(StructuredOutputError):
+        validate({"headlines": "Ship faster", "tone": "bold"}, schema)
+
+
+@pytest.mark.asyncio
+async def test_executor_forces_tool_call_and_returns_structured(fake_executor, fake_llm):
+    fake_llm.state.tool_input = {"headlines": ["Ship projects, not status updates"], "tone": "bold"}
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write headlines for TaskFlow", response_schema=Headlines)
+
+    result = await fake_executor.execute_async(request)
+
+    sent = fake_llm.state.requests[-1]
+    assert sent["tool_choice"] == {"type": "tool", "name": "respond"}
+    assert Headlines.model_validate(result.structured).tone == "bold"
+    assert result.metadata["stop_reason"] == "tool_use"
+
+
+@pytest.mark.asyncio
+async def test_non_object_schema_is_wrapped_and_unwrapped(fake_executor, fake_llm):
+    fake_llm.state.tool_input = {"result": ["Maritime welders", "Organ restorers"]}
+    request = WorkRequest(
+        skill=SkillName.MARKETING_IDEAS,
+        task="List niche audiences for TaskFlow",
+        response_schema={"type": "array", "items": {"type": "string"}},
+    )
+
+    result = await fake_executor.execute_async(request)
+
+    assert result.structured == ["Maritime welders", "Organ restorers"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_tool_input_raises(fake_executor, fake_llm):
+    fake_llm.state.tool_input = {"headlines": ["Ship faster"], "tone": "loud"}
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write headlines for TaskFlow", response_schema=Headlines)
+
+    with pytest.raises(StructuredOutputError):
+        await fake_executor.execute_async(request)
@@ -0,0 +1,64 @@
+import pytest
+from service.api.schemas import SkillName, WorkRequest
+from service.core.tokens import IMAGE_TOKENS, TokenEstimator, estimate_input_tokens
+
+
+def test_estimate_input_tokens_counts_system_text_and_images():
+    params = {
+        "system": [{"type": "text", "text": "x" * 700}],
+        "messages": [{"role": "user", "content": [
+            {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": "..."}},
+            {"type": "text", "text": "y" * 350},
+        ]}],
+    }
+    assert estimate_input_tokens(params) == 200 + 100 + IMAGE_TOKENS
+
+
+def test_max_tokens_adapts_to_observed_outputs():
+    estimator = TokenEstimator(default=4096, floor=256, ceiling=8192, min_samples=5, headroom=1.25)
+    assert estimator.max_tokens_for("copywriting") == 4096
+
+    for tokens in (400, 500, 600, 700, 800):
+        estimator.record("copywriting", tokens)
+    assert estimator.max_tokens_for("copywriting") == 1000  # p99 800 * 1.25
+
+    for _ in range(5):
+        estimator.record("page-cro", 4096, truncated=True)
+    assert estimator.max_tokens_for("page-cro") == 8192
+    assert estimator.stats()["page-cro"]["truncations"] == 5
+
+
+@pytest.mark.asyncio
+async def test_estimate_tokens_local_and_provider(fake_executor, fake_llm):
+    request = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+
+    local = await fake_executor.estimate_tokens(request)
+    fake_executor.token_count_mode = "provider"
+    provider = await fake_executor.estimate_tokens(request)
+
+    assert local["max_output_tokens"] == 4096
+    assert local["total"] == local["input_tokens"] + 4096
+    assert local["input_tokens"] > 1000  # includes the skill framework
+    assert provider["input_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_estimate_tokens_covers_every_fanned_out_call(fake_executor, fake_llm):
+    single = WorkRequest(skill=SkillName.COPYWRITING, task="Write a headline for TaskFlow")
+    n_best = single.model_copy(update={"n_best": 8})
+
+    one = await fake_executor.estimate_tokens(single)
+    many = await fake_executor.estimate_tokens(n_best)
+
+    # Eight completions plus the judge
+    assert fake_executor.model_calls(n_best) == many["model_calls"] == 9
+    assert many["input_tokens"] == one["input_tokens"] * 9
+    assert many["max_output_tokens"] == one["max_output_tokens"] * 9
+
+
+def test_model_calls_counts_map_reduce_chunks_and_merge(fake_executor):
+    fake_executor.content_token_budget = 200
+    request = WorkRequest(skill=SkillName.PAGE_CRO, task="Audit this landing page", content="copy " * 2000)
+
+    # Capped at MAP_REDUCE_MAX_CHUNKS chunks, plus the merge
+    assert fake_executor.model_calls(request) == fake_executor.map_reduce_max_chunks + 1
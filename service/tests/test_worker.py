@@ -0,0 +1,192 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from service.api.schemas import WorkResult
+from service.worker import JobRunner
+
+
+class FakeMessage:
+    """A Pub/Sub message stand-in that records how it was settled."""
+
+    def __init__(self, job_id, payload=None):
+        self.message_id = f"msg-{job_id}"
+        body = payload if payload is not None else {
+            "job_id": job_id,
+            "request": {"skill": "copywriting", "task": "Write a headline"},
+        }
+        self.data = json.dumps(body).encode("utf-8")
+        self.outcome = None
+        self.extensions = 0
+        self.settled = threading.Event()
+
+    def ack(self):
+        self.outcome = "ack"
+        self.settled.set()
+
+    def nack(self):
+        self.outcome = "nack"
+        self.settled.set()
+
+    def modify_ack_deadline(self, seconds):
+        self.extensions += 1
+
+
+class FakeDB:
+    def __init__(self):
+        self.writes = []
+        self.lock = threading.Lock()
+
+    def save_brief(self, brief):
+        with self.lock:
+            self.writes.append(dict(brief))
+        return brief["id"]
+
+    def statuses(self, job_id):
+        return [write["status"] for write in self.writes if write["id"] == job_id]
+
+
+class SlowExecutor:
+    """Sleeps like an LLM call and tracks peak concurrency."""
+
+    def __init__(self, delay=0.05, error=None):
+        self.delay = delay
+        self.error = error
+        self.running = 0
+        self.peak = 0
+
+    async def execute_async(self, request):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        if self.error:
+            raise self.error
+        return WorkResult(skill=request.skill.value, output="## Headline\n\nShip faster", metadata={})
+
+
+@pytest.fixture
+def runner_for():
+    runners = []
+
+    def make(executor, **kwargs):
+        runner = JobRunner(executor=executor, db=FakeDB(), **kwargs).start()
+        runners.append(runner)
+        return runner
+
+    yield make
+    for runner in runners:
+        runner.stop()
+
+
+def test_jobs_run_concurrently_up_to_the_limit(runner_for):
+    executor = SlowExecutor(delay=0.05)
+    runner = runner_for(executor, concurrency=4)
+    messages = [FakeMessage(f"job-{i}") for i in range(12)]
+
+    started = time.perf_counter()
+    for message in messages:
+        runner.submit(message)
+    for message in messages:
+        assert message.settled.wait(5)
+
+    assert executor.peak == 4
+    assert time.perf_counter() - started < 12 * 0.05
+    assert all(message.outcome == "ack" for message in messages)
+    assert runner.db.statuses("job-0") == ["processing", "completed"]
+
+
+def test_failed_job_is_recorded_and_nacked(runner_for):
+    runner = runner_for(SlowExecutor(delay=0, error=RuntimeError("overloaded")))
+    message = FakeMessage("job-fail")
+
+    runner.submit(message).result(5)
+
+    assert message.outcome == "nack"
+    assert runner.db.statuses("job-fail") == ["processing", "failed"]
+    assert runner.failed == 1
+
+
+def test_malformed_message_is_acked(runner_for):
+    runner = runner_for(SlowExecutor(delay=0))
+    message = FakeMessage("bad", payload={"job_id": "bad"})
+
+    runner.submit(message).result(5)
+
+    assert message.outcome == "ack"
+    assert runner.db.writes == []
+
+
+def test_long_jobs_extend_their_ack_deadline(runner_for):
+    runner = runner_for(SlowExecutor(delay=0.25), ack_deadline=0.1)
+    message = FakeMessage("job-long")
+
+    runner.submit(message).result(5)
+
+    assert message.outcome == "ack"
+    assert message.extensions >= 3
+
+
+def test_drain_finishes_running_jobs_and_refuses_new_ones(runner_for):
+    runner = runner_for(SlowExecutor(delay=0.1), concurrency=2)
+    running = [FakeMessage(f"job-{i}") for i in range(2)]
+    for message in running:
+        runner.submit(message)
+
+    assert runner.drain(timeout=5) == 0
+    assert all(message.outcome == "ack" for message in running)
+
+    late = FakeMessage("job-late")
+    assert runner.submit(late) is None
+    assert late.outcome == "nack"
+
+
+def test_drain_deadline_returns_jobs_to_the_queue(runner_for):
+    runner = runner_for(SlowExecutor(delay=5), concurrency=1)
+    message = FakeMessage("job-stuck")
+    runner.submit(message)
+    time.sleep(0.05)
+
+    assert runner.drain(timeout=0.05) == 1
+    assert message.outcome == "nack"
+
+
+class RichExecutor:
+    async def execute_async(self, request):
+        return WorkResult(
+            skill=request.skill.value,
+            output="## Plan\n\n### Week 1\n\nLaunch",
+            subsections={"Plan": {"Week 1": "Launch"}},
+            tables=[[["Channel", "Budget"], ["Search", "$500"]]],
+            code_blocks=[{"language": "html", "code": "<h1>Ship faster</h1>"}],
+            structured={"headline": "Ship faster"},
+            metadata={},
+        )
+
+
+def test_completed_brief_keeps_the_full_result(runner_for):
+    runner = runner_for(RichExecutor())
+
+    runner.submit(FakeMessage("job-rich")).result(5)
+
+    completed = next(write for write in runner.db.writes if write["status"] == "completed")
+    assert completed["subsections"] == {"Plan": {"Week 1": "Launch"}}
+    assert completed["tables"] == [[["Channel", "Budget"], ["Search", "$500"]]]
+    assert completed["code_blocks"] == [{"language": "html", "code": "<h1>Ship faster</h1>"}]
+    assert completed["structured"] == {"headline": "Ship faster"}
+
+
+def test_briefs_wrap_nested_arrays_for_firestore():
+    from service.core.db import NESTED_ARRAY_KEY, loaded, storable
+
+    brief = {"tables": [[["a", "b"]]], "tags": ["x"], "structured": {"grid": [[1, [2]], []]}}
+    stored = storable(brief)
+
+    assert stored["tables"] == [{NESTED_ARRAY_KEY: [{NESTED_ARRAY_KEY: ["a", "b"]}]}]
+    assert stored["tags"] == ["x"]
+    assert loaded(stored) == brief
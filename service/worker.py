@@ -1,94 +1,278 @@
-import os
+"""
+Background worker for /work/async jobs.
+
+Messages are pulled from the configured task queue (Pub/Sub, or a SQLite
+file for single-host runs) under explicit flow control and handed to
+a JobRunner, which executes up to WORKER_CONCURRENCY jobs at once with the
+async executor on its own event loop, so the subscriber's callback threads
+are never tied up for a whole generation. Ack deadlines are extended while
+a job runs, and on SIGTERM the worker stops taking messages and drains the
+jobs in flight before exiting.
+"""
+
+import asyncio
+import concurrent.futures
 import json
-import time
-from google.cloud import pubsub_v1
-from google.oauth2 import service_account
-from service.core.executor import get_executor
+import logging
+import os
+import signal
+import threading
+from typing import Optional
+
+from service.api.schemas import WorkRequest
 from service.core.db import get_db
-from service.api.schemas import WorkRequest, WorkResult
+from service.core.executor import SkillExecutor, get_executor
+from service.core.log import configure_logging, request_id
+from service.core.queue import get_queue
 
-def callback(message):
-    print(f"Received message: {message.message_id}")
-    try:
-        data = json.loads(message.data.decode("utf-8"))
-        job_id = data.get("job_id")
-        request_data = data.get("request")
-        
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """
+    Runs queued skill jobs on an asyncio loop in a background thread.
+
+    Messages need ``data``, ``message_id``, ``ack()``, ``nack()`` and
+    ``modify_ack_deadline(seconds)``, as every TaskQueue backend's have.
+    Messages the runner gives up on during shutdown are released rather
+    than nacked where the backend supports it, so they don't count as a
+    failed attempt.
+
+    Args:
+        executor: Runs the skills; defaults to the shared executor
+        db: Where job status is written; defaults to Firestore
+        concurrency: Jobs executed at once
+        ack_deadline: Seconds each ack deadline extension asks for; the
+            deadline is extended at half this interval while a job runs
+    """
+
+    def __init__(
+        self,
+        executor: Optional[SkillExecutor] = None,
+        db=None,
+        concurrency: int = 8,
+        ack_deadline: int = 60,
+    ):
+        self.executor = executor or get_executor()
+        self.db = db or get_db()
+        self.concurrency = concurrency
+        self.ack_deadline = ack_deadline
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="job-runner", daemon=True)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._jobs: set[concurrent.futures.Future] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self.closing = False
+        self.completed = 0
+        self.failed = 0
+
+    def start(self) -> "JobRunner":
+        self._thread.start()
+        return self
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._jobs)
+
+    def submit(self, message) -> Optional[concurrent.futures.Future]:
+        """
+        Schedule a message's job; safe to call from any thread.
+
+        Returns:
+            The job's future, or None if the runner is draining and the
+            message was handed back to the queue
+        """
+        if self.closing:
+            self._hand_back(message)
+            return None
+        future = asyncio.run_coroutine_threadsafe(self.handle(message), self.loop)
+        with self._lock:
+            self._jobs.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    @staticmethod
+    def _hand_back(message) -> None:
+        release = getattr(message, "release", None)
+        if release is not None:
+            release()
+        else:
+            message.nack()
+
+    def _done(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._jobs.discard(future)
+
+    async def _keep_leased(self, message) -> None:
+        while True:
+            await asyncio.sleep(self.ack_deadline / 2)
+            try:
+                message.modify_ack_deadline(self.ack_deadline)
+            except Exception as e:
+                logger.warning("Ack deadline extension failed: %s", e)
+
+    async def handle(self, message) -> None:
+        """Run one message's job, acking it when done and nacking on failure."""
+        token = request_id.set(message.message_id)
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        lease = asyncio.create_task(self._keep_leased(message))
+        try:
+            async with self._slots:
+                ok = await self.process(message)
+            if ok:
+                message.ack()
+            else:
+                message.nack()
+        except asyncio.CancelledError:
+            # Drain deadline passed; another worker will pick it up
+            self._hand_back(message)
+            raise
+        finally:
+            lease.cancel()
+            self._tasks.discard(task)
+            request_id.reset(token)
+
+    async def _cancel_all(self) -> int:
+        tasks = set(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return len(tasks)
+
+    async def process(self, message) -> bool:
+        """
+        Execute a job and record its outcome.
+
+        Returns:
+            False if the job failed and should be retried
+        """
+        logger.info("Received message")
+        try:
+            data = json.loads(message.data.decode("utf-8"))
+            job_id = data.get("job_id")
+            request_data = data.get("request")
+        except (ValueError, AttributeError):
+            job_id = request_data = None
         if not job_id or not request_data:
-            print("Invalid message format")
-            message.ack()
-            return
-
-        request = WorkRequest(**request_data)
-        
-        # Update DB status to Processing
-        db = get_db()
-        db.save_brief({
-            "id": job_id, 
-            "status": "processing",
-            "skill": request.skill.value # Store skill for reference
-        })
-
-        # Execute
-        print(f"Executing skill: {request.skill}")
-        executor = get_executor()
-        result = executor.execute(request)
-        
-        # Update DB with result
-        db.save_brief({
-            "id": job_id,
-            "status": "completed",
-            "output": result.output,
-            "sections": result.sections,
-            "alternatives": result.alternatives,
-            "recommendations": result.recommendations,
-            "metadata": result.metadata
-        })
-        
-        print(f"Job {job_id} completed.")
-        message.ack()
-        
-    except Exception as e:
-        print(f"Error processing message: {e}")
-        # Update DB with error
-        if 'job_id' in locals() and job_id:
-             try:
-                db = get_db()
-                db.save_brief({"id": job_id, "status": "failed", "error": str(e)})
-             except:
-                 pass
-        message.nack()
+            # Retrying can't fix a malformed message
+            logger.warning("Invalid message format")
+            return True
+
+        request_id.set(job_id)
+        try:
+            request = WorkRequest(**request_data)
+            # Write the status while the skill runs rather than before it
+            processing = asyncio.create_task(asyncio.to_thread(self.db.save_brief, {
+                "id": job_id,
+                "status": "processing",
+                "skill": request.skill.value,
+            }))
+            logger.info("Executing skill", extra={"skill": request.skill.value})
+            try:
+                result = await self.executor.execute_async(request)
+            finally:
+                await processing
+
+            await asyncio.to_thread(self.db.save_brief, {
+                "id": job_id,
+                "status": "completed",
+                "output": result.output,
+                "sections": result.sections,
+                "subsections": result.subsections,
+                "alternatives": result.alternatives,
+                "recommendations": result.recommendations,
+                "tables": result.tables,
+                "code_blocks": result.code_blocks,
+                "structured": result.structured,
+                "metadata": result.metadata,
+            })
+        except Exception as e:
+            logger.exception("Error processing message")
+            self.failed += 1
+            try:
+                await asyncio.to_thread(self.db.save_brief, {"id": job_id, "status": "failed", "error": str(e)})
+            except Exception:
+                logger.exception("Failed to record job failure")
+            return False
+
+        logger.info("Job completed")
+        self.completed += 1
+        return True
+
+    def drain(self, timeout: float) -> int:
+        """
+        Stop taking jobs and wait up to ``timeout`` seconds for those in flight.
+
+        Jobs still running at the deadline are cancelled and their messages
+        nacked for redelivery.
+
+        Returns:
+            How many jobs were cancelled
+        """
+        self.closing = True
+        with self._lock:
+            jobs = set(self._jobs)
+        _, pending = concurrent.futures.wait(jobs, timeout=timeout)
+        if not pending:
+            return 0
+        # Cancel on the loop and wait, so every message is nacked before returning
+        return asyncio.run_coroutine_threadsafe(self._cancel_all(), self.loop).result(timeout=10)
+
+    def stop(self) -> None:
+        """Stop the runner's event loop."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
 
 def main():
-    project_id = os.getenv("GCP_PROJECT_ID") or os.getenv("GOOGLE_CLOUD_PROJECT")
-    subscription_name = "agency-worker-sub"
-    
-    if os.path.exists("service.json"):
-        credentials = service_account.Credentials.from_service_account_file("service.json")
-        subscriber = pubsub_v1.SubscriberClient(credentials=credentials)
-        if not project_id:
-            project_id = credentials.project_id
-    else:
-        subscriber = pubsub_v1.SubscriberClient()
-
-    if not project_id:
-        print("Error: No Project ID found.")
+    queue = get_queue()
+    if queue.in_process:
+        logger.error("TASK_QUEUE_BACKEND=memory jobs run inside the API process; use pubsub or sqlite for a worker.")
+        return
+    concurrency = int(os.getenv("WORKER_CONCURRENCY", "8"))
+    runner = JobRunner(
+        concurrency=concurrency,
+        ack_deadline=int(os.getenv("WORKER_ACK_DEADLINE", "60")),
+    ).start()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    try:
+        subscription = queue.subscribe(
+            runner.submit,
+            max_messages=concurrency,
+            max_lease=int(os.getenv("WORKER_MAX_LEASE", "3600")),
+        )
+    except ValueError as e:
+        logger.error("Could not subscribe: %s", e)
+        runner.stop()
         return
+    logger.info("Worker started (concurrency %d)", concurrency)
+    subscription.add_done_callback(lambda _: stop.set())
+    stop.wait()
 
-    subscription_path = subscriber.subscription_path(project_id, subscription_name)
-    
-    print(f"Listening for messages on {subscription_path}...")
-    streaming_pull_future = subscriber.subscribe(subscription_path, callback=callback)
-    
+    # Drain while the subscription is still open so acks and lease extensions go through
+    logger.info("Shutting down, draining %d jobs", runner.in_flight)
+    cancelled = runner.drain(float(os.getenv("WORKER_DRAIN_TIMEOUT", "25")))
+    if cancelled:
+        logger.warning("Drain timed out; %d jobs returned to the queue", cancelled)
+    subscription.cancel()
     try:
-        streaming_pull_future.result()
-    except KeyboardInterrupt:
-        streaming_pull_future.cancel()
+        subscription.result(timeout=10)
+    except Exception:
+        pass
+    queue.close()
+    asyncio.run_coroutine_threadsafe(runner.executor.aclose(), runner.loop).result(timeout=10)
+    runner.stop()
+
 
 def start_health_server():
     """Start a dummy HTTP server to satisfy Cloud Run health checks."""
     from http.server import HTTPServer, BaseHTTPRequestHandler
-    import threading
 
     class HealthHandler(BaseHTTPRequestHandler):
         def do_GET(self):
@@ -98,10 +282,11 @@ def start_health_server():
 
     port = int(os.getenv("PORT", 8080))
     server = HTTPServer(('0.0.0.0', port), HealthHandler)
-    print(f"Health server listening on port {port}")
+    logger.info("Health server listening on port %s", port)
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
 
 if __name__ == "__main__":
+    configure_logging()
     start_health_server()
     main()